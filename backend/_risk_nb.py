@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+风险评估、止损止盈与仓位计算数值内核（Numba JIT 加速）
+输入为固定结构的 float64 数组（NaN 表示缺失），未安装 numba 时退化为普通 Python 函数
+"""
+
+import numpy as np
+
+from .indicators._indicators_nb import njit
+
+
+# 风险评估输入结构：(指标键, 缺失时的默认值)
+RISK_SCHEMA = (
+    ('volatility_20', np.nan),
+    ('rsi', np.nan),
+    ('consecutive_up_days', np.nan),
+    ('consecutive_down_days', np.nan),
+    ('current_price', np.nan),
+    ('support_20d_low', np.nan),
+    ('resistance_20d_high', np.nan),
+    ('trend_strength', np.nan),
+    ('obv_trend', np.nan),
+    ('price_change_pct', 0.0),
+    ('adx', np.nan),
+)
+
+# obv_trend 为字符串，按方向编码为数值
+_TREND_CODES = {'up': 1.0, 'down': -1.0}
+
+# 风险因子位：(位序号对应的指标键, 因子描述模板)，顺序即输出顺序
+RISK_FACTOR_BITS = (
+    ('volatility_20', '极高波动率(%(value).1f%%)'),
+    ('volatility_20', '高波动率(%(value).1f%%)'),
+    ('volatility_20', '中等波动率(%(value).1f%%)'),
+    ('rsi', 'RSI极端值(%(value).1f)'),
+    ('consecutive_up_days', '连续上涨%(value)s天(回调风险)'),
+    ('consecutive_up_days', '连续上涨%(value)s天'),
+    ('consecutive_down_days', '连续下跌%(value)s天(继续下跌风险)'),
+    ('consecutive_down_days', '连续下跌%(value)s天'),
+    (None, '接近重要支撑位'),
+    (None, '接近重要压力位'),
+    (None, '趋势不明确'),
+    (None, '量价背离'),
+    ('adx', 'ADX(%(value).1f)趋势不明确'),
+    ('adx', 'ADX(%(value).1f)趋势过强可能反转'),
+)
+
+
+def pack_risk_inputs(indicators: dict) -> np.ndarray:
+    """
+    按 RISK_SCHEMA 将指标字典打包为 float64 数组
+    """
+    arr = np.empty(len(RISK_SCHEMA), dtype=np.float64)
+    for i, (key, default) in enumerate(RISK_SCHEMA):
+        value = indicators.get(key)
+        if value is None:
+            arr[i] = default
+        elif key == 'obv_trend':
+            arr[i] = _TREND_CODES.get(value, 0.0)
+        else:
+            arr[i] = value
+    return arr
+
+
+@njit(cache=True)
+def assess_risk_core(arr):
+    """
+    风险评分内核，返回 (风险得分, 因子位掩码)
+    位顺序与 RISK_FACTOR_BITS 一致
+    """
+    vol = arr[0]
+    rsi = arr[1]
+    up_days = arr[2]
+    down_days = arr[3]
+    current_price = arr[4]
+    support = arr[5]
+    resistance = arr[6]
+    strength = arr[7]
+    obv_trend = arr[8]
+    price_change = arr[9]
+    adx = arr[10]
+    
+    score = 0
+    flags = 0
+    
+    # 1. 波动率风险
+    if vol > 5:
+        score += 30
+        flags |= 1 << 0
+    elif vol > 3:
+        score += 20
+        flags |= 1 << 1
+    elif vol > 2:
+        score += 10
+        flags |= 1 << 2
+        
+    # 2. RSI极端值
+    if rsi > 85 or rsi < 15:
+        score += 20
+        flags |= 1 << 3
+        
+    # 3. 连续涨跌风险
+    if up_days >= 7:
+        score += 25
+        flags |= 1 << 4
+    elif up_days >= 5:
+        score += 15
+        flags |= 1 << 5
+        
+    if down_days >= 7:
+        score += 25
+        flags |= 1 << 6
+    elif down_days >= 5:
+        score += 15
+        flags |= 1 << 7
+        
+    # 4. 距离支撑/压力位（current_price 为 0 或缺失时跳过）
+    if current_price == current_price and current_price != 0:
+        if ((current_price - support) / current_price) * 100 < 2:
+            score += 15
+            flags |= 1 << 8
+        if ((resistance - current_price) / current_price) * 100 < 2:
+            score += 15
+            flags |= 1 << 9
+            
+    # 5. 趋势不明确
+    if strength < 15:
+        score += 10
+        flags |= 1 << 10
+        
+    # 6. 量价背离
+    if (obv_trend == 1.0 and price_change < -1) or (obv_trend == -1.0 and price_change > 1):
+        score += 15
+        flags |= 1 << 11
+        
+    # 7. ADX趋势强度风险
+    if adx < 20:
+        score += 10
+        flags |= 1 << 12
+    elif adx > 60:
+        score += 15
+        flags |= 1 << 13
+        
+    return score, flags
+
+
+@njit(cache=True)
+def stop_loss_core(current_price, volatility, atr, support, resistance, is_buy):
+    """
+    止损止盈内核，返回 (止损价, 止盈价)
+    atr 为 NaN 时使用20日支撑压力位，二者也缺失时使用固定百分比
+    """
+    # 根据波动率动态调整ATR倍数
+    if volatility > 4:  # 高波动
+        atr_stop_multiplier = 2.5
+        atr_profit_multiplier = 4.0
+    elif volatility > 2.5:  # 中等波动
+        atr_stop_multiplier = 2.0
+        atr_profit_multiplier = 3.5
+    else:  # 低波动
+        atr_stop_multiplier = 1.5
+        atr_profit_multiplier = 3.0
+        
+    if atr == atr:
+        if is_buy:
+            return (current_price - atr_stop_multiplier * atr,
+                    current_price + atr_profit_multiplier * atr)
+        return (current_price + atr_stop_multiplier * atr,
+                current_price - atr_profit_multiplier * atr)
+                
+    if support == support and resistance == resistance:
+        if is_buy:
+            return support * 0.98, resistance
+        return resistance * 1.02, support
+        
+    if is_buy:
+        return current_price * 0.95, current_price * 1.10
+    return current_price * 1.05, current_price * 0.90
+
+
+@njit(cache=True)
+def position_sizing_core(current_price, stop_loss, account_value, risk_percent, risk_multiplier):
+    """
+    仓位计算内核，返回 (每股风险, 建议股数, 风险金额, 仓位市值, 仓位占比, 调整后股数)
+    每股风险不为正（为 0 或 NaN）时其余各项均为 0
+    """
+    risk_per_share = abs(current_price - stop_loss)
+    if not risk_per_share > 0:
+        return risk_per_share, 0, 0.0, 0.0, 0.0, 0
+        
+    max_risk_amount = account_value * (risk_percent / 100.0)
+    suggested_size = int(max_risk_amount / risk_per_share)
+    position_value = suggested_size * current_price
+    position_ratio = (position_value / account_value) * 100
+    # 根据风险等级系数调整仓位
+    adjusted_size = int(suggested_size * risk_multiplier)
+    return (risk_per_share, suggested_size, suggested_size * risk_per_share,
+            position_value, position_ratio, adjusted_size)
+
+
+def warm_up_kernels():
+    """
+    用缺失值输入触发风险/止损/仓位内核编译（或加载磁盘缓存），避免首个请求承担编译耗时
+    """
+    assess_risk_core(np.full(len(RISK_SCHEMA), np.nan))
+    stop_loss_core(100.0, 2.0, np.nan, np.nan, np.nan, True)
+    position_sizing_core(100.0, 95.0, 100000.0, 2.0, 1.0)
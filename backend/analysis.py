@@ -5,9 +5,22 @@
 分析模块 - 技术指标计算、交易信号生成和AI分析
 """
 
+import bisect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from datetime import datetime, timedelta
 import os
+import string
+from types import MappingProxyType
+import requests
+from requests.adapters import HTTPAdapter
+from cachetools import LRUCache
+try:
+    import ollama
+except ImportError:
+    ollama = None
 from .settings import logger, OLLAMA_HOST, DEFAULT_AI_MODEL
 from .yfinance import get_historical_data, get_fundamental_data
 
@@ -17,159 +30,218 @@ from .indicators import (
     calculate_volume, calculate_price_change, calculate_volatility,
     calculate_support_resistance, calculate_kdj, calculate_atr,
     calculate_williams_r, calculate_obv, analyze_trend_strength,
-    calculate_fibonacci_retracement, get_trend,
+    calculate_fibonacci_retracement, get_trend, get_window_extrema,
     calculate_cci, calculate_adx, calculate_sar,
     calculate_supertrend, calculate_stoch_rsi, calculate_volume_profile,
     calculate_ichimoku
 )
 from .indicators.ml_predictions import calculate_ml_predictions
 from .scoring import calculate_comprehensive_score, get_recommendation
+from ._risk_nb import (
+    RISK_FACTOR_BITS, pack_risk_inputs, assess_risk_core, stop_loss_core, position_sizing_core
+)
 from .signal_generators import (
-    add_ma_signals, add_rsi_signals, add_bollinger_signals,
-    add_macd_signals, add_volume_signals, add_trend_signals,
-    add_advanced_indicator_signals, calculate_risk_level,
-    calculate_stop_loss_take_profit
+    SIGNAL_GENERATORS, calculate_risk_level, calculate_stop_loss_take_profit
 )
 
 
-def calculate_technical_indicators(symbol: str, duration: str = '1 M', bar_size: str = '1 day'):
+# 技术指标并行计算线程池
+# 注意：JIT 内核未声明 nogil，多数指标为纯 Python 循环，仅 numpy 向量运算期间释放 GIL，并行收益有限
+_INDICATOR_EXECUTOR = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1),
+                                         thread_name_prefix='indicator')
+
+# 技术指标计算结果缓存：键为 (股票代码, K线条数, 最新收盘价, 各数组内容哈希)，新K线到达或数据修订时自然失效
+_INDICATOR_CACHE = LRUCache(maxsize=256)
+_INDICATOR_CACHE_LOCK = threading.Lock()
+
+
+def _extract_ohlcv(hist_data):
+    """
+    一次性将K线数据转换为连续的 (4, N) float64 数组
+    返回 closes, highs, lows, volumes 四个行视图，后续切片均为零拷贝
+    """
+    # 单次遍历K线字典，一次性取出 (close, high, low, volume)
+    ohlcv = np.ascontiguousarray(
+        np.array([(bar['close'], bar['high'], bar['low'], bar['volume']) for bar in hist_data],
+                 dtype=np.float64).T
+    )
+    return ohlcv[0], ohlcv[1], ohlcv[2], ohlcv[3]
+
+
+def _extract_ohlcv_columns(frame):
+    """
+    从列式K线数据（pandas/polars DataFrame，或列名到数组的字典）按列直接取出数组，无需逐条遍历K线
+    列名与K线字典字段一致（close/high/low/volume），返回值与 _extract_ohlcv 相同
+    """
+    volumes = np.asarray(frame['volume'], dtype=np.float64)
+    ohlcv = np.empty((4, len(volumes)), dtype=np.float64)
+    for row, column in enumerate(('close', 'high', 'low')):
+        ohlcv[row] = np.asarray(frame[column], dtype=np.float64)
+    ohlcv[3] = volumes
+    return ohlcv[0], ohlcv[1], ohlcv[2], ohlcv[3]
+
+
+def _atr_values(closes, highs, lows):
+    """
+    ATR（平均真实波幅）及其占现价百分比
+    """
+    atr = calculate_atr(closes, highs, lows)
+    return {'atr': atr, 'atr_percent': float((atr / closes[-1]) * 100)}
+
+
+def _williams_r_values(closes, highs, lows):
+    """
+    威廉指标（Williams %R）
+    """
+    return {'williams_r': calculate_williams_r(closes, highs, lows)}
+
+
+def _obv_values(closes, volumes):
+    """
+    OBV（能量潮指标）最新值及趋势
+    """
+    obv = calculate_obv(closes, volumes)
+    return {
+        'obv_current': float(obv[-1]) if len(obv) > 0 else 0.0,
+        'obv_trend': get_trend(obv[-10:]) if len(obv) >= 10 else 'neutral',
+    }
+
+
+# 技术指标计算表：(最少K线条数, 计算函数, 位置参数名, 关键字参数名)，顺序即结果合并顺序
+# 参数名对应 _calculate_indicator_values 中准备好的共享输入
+_INDICATOR_JOBS = (
+    (0, calculate_ma, ('closes',), ()),                                            # 1. 移动平均线
+    (0, calculate_rsi, ('closes',), ('deltas',)),                                  # 2. RSI
+    (0, calculate_bollinger, ('closes',), ()),                                     # 3. 布林带
+    (0, calculate_macd, ('closes',), ()),                                          # 4. MACD
+    (0, calculate_volume, ('volumes',), ()),                                       # 5. 成交量分析
+    (0, calculate_price_change, ('closes',), ()),                                  # 6. 价格变化
+    (0, calculate_volatility, ('closes',), ('deltas',)),                           # 7. 波动率
+    (0, calculate_support_resistance, ('closes', 'highs', 'lows'), ('extrema',)),  # 8. 支撑位和压力位
+    (9, calculate_kdj, ('closes', 'highs', 'lows'), ()),                           # 9. KDJ
+    (14, _atr_values, ('closes', 'highs', 'lows'), ()),                            # 10. ATR
+    (14, _williams_r_values, ('closes', 'highs', 'lows'), ()),                     # 11. 威廉指标
+    (20, _obv_values, ('closes', 'volumes'), ()),                                  # 12. OBV
+    (0, analyze_trend_strength, ('closes', 'highs', 'lows'), ()),                  # 13. 趋势强度
+    (0, calculate_fibonacci_retracement, ('highs', 'lows'), ('extrema',)),         # 14. 斐波那契回撤位
+    (14, calculate_cci, ('closes', 'highs', 'lows'), ()),                          # 16. CCI
+    (28, calculate_adx, ('closes', 'highs', 'lows'), ()),                          # 17. ADX（需要period*2的数据）
+    (10, calculate_sar, ('closes', 'highs', 'lows'), ()),                          # 18. SAR
+    (11, calculate_supertrend, ('closes', 'highs', 'lows'), ()),                   # 21. SuperTrend
+    (28, calculate_stoch_rsi, ('closes',), ('deltas',)),                           # 22. StochRSI
+    (20, calculate_volume_profile, ('closes', 'highs', 'lows', 'volumes'), ()),    # 23. Volume Profile
+    (52, calculate_ichimoku, ('closes', 'highs', 'lows'), ('extrema',)),           # 24. 一目均衡表
+    # 25. ML预测（成交量全为 0 时函数内部返回空结果）
+    (20, calculate_ml_predictions, ('closes', 'highs', 'lows', 'volumes'), ('deltas',)),
+)
+
+
+def _calculate_indicator_values(closes, highs, lows, volumes):
+    """
+    基于K线数组计算全部技术指标（不含基本面数据）
+    各指标只读共享输入数组、互不依赖，按 _INDICATOR_JOBS 提交到线程池并行计算，按固定顺序合并结果
+    """
+    inputs = {
+        'closes': closes,
+        'highs': highs,
+        'lows': lows,
+        'volumes': volumes,
+        # 收盘价逐日差分只计算一次，供RSI、StochRSI、波动率、ML预测共用
+        'deltas': np.diff(closes),
+        # 最近N期高低点只计算一次，供支撑压力、斐波那契、一目均衡表共用
+        'extrema': get_window_extrema(highs, lows, periods=(20, 50, 52)),
+    }
+    
+    n = len(closes)
+    futures = [
+        _INDICATOR_EXECUTOR.submit(func, *[inputs[name] for name in arg_names],
+                                   **{name: inputs[name] for name in kwarg_names})
+        for min_len, func, arg_names, kwarg_names in _INDICATOR_JOBS if n >= min_len
+    ]
+    
+    result = {}
+    for future in futures:
+        result.update(future.result())
+    return result
+
+
+def calculate_technical_indicators(symbol: str, duration: str = '1 M', bar_size: str = '1 day',
+                                   hist_data=None):
     """
     计算技术指标（基于历史数据）
     返回：移动平均线、RSI、MACD等
     如果证券不存在，返回(None, error_info)
+    hist_data: 调用方已获取的K线数据，传入时不再重复获取
     """
-    hist_data, error = get_historical_data(symbol, duration, bar_size)
-    
-    if error:
-        return None, error
+    if hist_data is None:
+        hist_data, error = get_historical_data(symbol, duration, bar_size)
+        
+        if error:
+            return None, error
     
     if not hist_data or len(hist_data) < 20:
         logger.warning(f"数据不足，无法计算技术指标: {symbol}")
         return None, None
     
-    closes = np.array([bar['close'] for bar in hist_data])
-    highs = np.array([bar['high'] for bar in hist_data])
-    lows = np.array([bar['low'] for bar in hist_data])
-    volumes = np.array([bar['volume'] for bar in hist_data])
+    closes, highs, lows, volumes = _extract_ohlcv(hist_data)
+    return _indicators_from_ohlcv(symbol, closes, highs, lows, volumes,
+                                  float(hist_data[-1]['close']))
+
+
+def calculate_technical_indicators_from_frame(symbol: str, frame):
+    """
+    基于列式K线数据计算技术指标，结果与 calculate_technical_indicators 相同
+    frame: pandas/polars DataFrame 或列名到数组的字典，需包含 close、high、low、volume 列
+    """
+    try:
+        closes, highs, lows, volumes = _extract_ohlcv_columns(frame)
+    except (KeyError, TypeError, ValueError) as e:
+        logger.warning(f"列式K线数据格式错误: {symbol}, 错误: {e}")
+        return None, {'code': 400, 'message': f'K线数据格式错误: {e}'}
+    
+    if len(closes) < 20:
+        logger.warning(f"数据不足，无法计算技术指标: {symbol}")
+        return None, None
     
+    current_price = float(np.asarray(frame['close'], dtype=np.float64)[-1])
+    return _indicators_from_ohlcv(symbol, closes, highs, lows, volumes, current_price)
+
+
+def _indicators_from_ohlcv(symbol: str, closes, highs, lows, volumes, current_price: float):
+    """
+    基于K线数组计算技术指标并补充基本面数据（两种K线输入形式共用）
+    current_price: 最新收盘价（原始精度）
+    """
     valid_volumes = volumes[volumes > 0]
     if len(valid_volumes) == 0:
         logger.warning(f"警告: {symbol} 所有成交量数据为 0，成交量相关指标将无法正常计算")
     
-    result = {
-        'symbol': symbol,
-        'current_price': float(closes[-1]),
-        'data_points': int(len(closes)),
-    }
-    
-    # 1. 移动平均线 (MA)
-    ma_data = calculate_ma(closes)
-    result.update(ma_data)
-        
-    # 2. RSI (相对强弱指标)
-    rsi_data = calculate_rsi(closes)
-    result.update(rsi_data)
-            
-    # 3. 布林带 (Bollinger Bands)
-    bb_data = calculate_bollinger(closes)
-    result.update(bb_data)
-        
-    # 4. MACD
-    macd_data = calculate_macd(closes)
-    result.update(macd_data)
-                
-    # 5. 成交量分析
-    volume_data = calculate_volume(volumes)
-    result.update(volume_data)
-        
-    # 6. 价格变化
-    price_change_data = calculate_price_change(closes)
-    result.update(price_change_data)
-        
-    # 7. 波动率
-    volatility_data = calculate_volatility(closes)
-    result.update(volatility_data)
+    # 同一股票K线未变化时直接复用上次的指标计算结果（K线内容指纹作为缓存键）
+    cache_key = (symbol, len(closes), current_price,
+                 hash(closes.tobytes()), hash(highs.tobytes()),
+                 hash(lows.tobytes()), hash(volumes.tobytes()))
+    with _INDICATOR_CACHE_LOCK:
+        cached = _INDICATOR_CACHE.get(cache_key)
+    if cached is not None:
+        # 浅拷贝：下面会在顶层补充基本面数据
+        result = dict(cached)
+    else:
+        result = {
+            'symbol': symbol,
+            'current_price': current_price,
+            'data_points': int(len(closes)),
+        }
         
-    # 8. 支持位和压力位
-    support_resistance = calculate_support_resistance(closes, highs, lows)
-    result.update(support_resistance)
-    
-    # 9. KDJ指标（随机指标）
-    if len(closes) >= 9:
-        kdj = calculate_kdj(closes, highs, lows)
-        result.update(kdj)
-    
-    # 10. ATR（平均真实波幅）
-    if len(closes) >= 14:
-        atr = calculate_atr(closes, highs, lows)
-        result['atr'] = atr
-        result['atr_percent'] = float((atr / closes[-1]) * 100)
-    
-    # 11. 威廉指标（Williams %R）
-    if len(closes) >= 14:
-        wr = calculate_williams_r(closes, highs, lows)
-        result['williams_r'] = wr
+        result.update(_calculate_indicator_values(closes, highs, lows, volumes))
+        with _INDICATOR_CACHE_LOCK:
+            _INDICATOR_CACHE[cache_key] = dict(result)
     
-    # 12. OBV（能量潮指标）
-    if len(volumes) >= 20:
-        obv = calculate_obv(closes, volumes)
-        result['obv_current'] = float(obv[-1]) if len(obv) > 0 else 0.0
-        result['obv_trend'] = get_trend(obv[-10:]) if len(obv) >= 10 else 'neutral'
-    
-    # 13. 趋势强度
-    trend_info = analyze_trend_strength(closes, highs, lows)
-    result.update(trend_info)
-
-    # 14. 斐波那契回撤位
-    fibonacci_levels = calculate_fibonacci_retracement(highs, lows)
-    result.update(fibonacci_levels)
-
-    # 16. CCI（顺势指标）
-    if len(closes) >= 14:
-        cci_data = calculate_cci(closes, highs, lows)
-        result.update(cci_data)
-    
-    # 17. ADX（平均趋向指标）
-    if len(closes) >= 28:  # ADX需要period*2的数据
-        adx_data = calculate_adx(closes, highs, lows)
-        result.update(adx_data)
-    
-    # 18. SAR（抛物线转向指标）
-    if len(closes) >= 10:
-        sar_data = calculate_sar(closes, highs, lows)
-        result.update(sar_data)
-
-    # 21. SuperTrend (超级趋势)
-    if len(closes) >= 11:
-        st_data = calculate_supertrend(closes, highs, lows)
-        result.update(st_data)
-        
-    # 22. StochRSI (随机相对强弱指标)
-    if len(closes) >= 28:
-        stoch_rsi_data = calculate_stoch_rsi(closes)
-        result.update(stoch_rsi_data)
-        
-    # 23. Volume Profile (成交量分布)
-    if len(closes) >= 20:
-        vp_data = calculate_volume_profile(closes, highs, lows, volumes)
-        result.update(vp_data)
-
-    # 24. Ichimoku Cloud (一目均衡表)
-    if len(closes) >= 52:
-        ichimoku_data = calculate_ichimoku(closes, highs, lows)
-        result.update(ichimoku_data)
-
-    # 25. ML预测（机器学习预测，包含成交量分析）
-    if len(closes) >= 20 and len(valid_volumes) > 0:
-        ml_data = calculate_ml_predictions(closes, highs, lows, volumes)
-        result.update(ml_data)
-
     # 26. 获取基本面数据
     try:
         fundamental_data = get_fundamental_data(symbol)
         if fundamental_data:
             result['fundamental_data'] = fundamental_data
-            logger.info(f"已获取基本面数据: {symbol}")
+            logger.info("已获取基本面数据: %s", symbol)
     except Exception as e:
         logger.warning(f"获取基本面数据失败: {symbol}, 错误: {e}")
         result['fundamental_data'] = None
@@ -192,100 +264,11 @@ def generate_signals(indicators: dict, account_value: float = 100000, risk_perce
         'score': 0,
     }
     
+    # 按规则表依次生成各类信号
     signals_list = signals['signals']
+    for add_signals in SIGNAL_GENERATORS:
+        add_signals(signals_list, indicators)
     
-    # 生成各类信号
-    add_ma_signals(signals_list, indicators)
-    add_rsi_signals(signals_list, indicators)
-    add_bollinger_signals(signals_list, indicators)
-    add_macd_signals(signals_list, indicators)
-    add_volume_signals(signals_list, indicators)
-    add_trend_signals(signals_list, indicators)
-    add_advanced_indicator_signals(signals_list, indicators)
-    
-    # 支撑位和压力位分析
-    current_price = indicators.get('current_price')
-    if current_price:
-        # 检查是否接近关键支撑位
-        support_keys = [k for k in indicators.keys() if 'support' in k.lower()]
-        resistance_keys = [k for k in indicators.keys() if 'resistance' in k.lower()]
-        
-        # 找最近的支撑位
-        nearest_support = None
-        nearest_support_dist = float('inf')
-        for key in support_keys:
-            support = indicators[key]
-            if support < current_price:
-                dist = current_price - support
-                dist_pct = (dist / current_price) * 100
-                if dist_pct < nearest_support_dist:
-                    nearest_support = support
-                    nearest_support_dist = dist_pct
-        
-        # 找最近的压力位
-        nearest_resistance = None
-        nearest_resistance_dist = float('inf')
-        for key in resistance_keys:
-            resistance = indicators[key]
-            if resistance > current_price:
-                dist = resistance - current_price
-                dist_pct = (dist / current_price) * 100
-                if dist_pct < nearest_resistance_dist:
-                    nearest_resistance = resistance
-                    nearest_resistance_dist = dist_pct
-        
-        # 根据支撑压力位置给出信号
-        if nearest_support and nearest_support_dist < 2:
-            signals['signals'].append(f'🟢 接近支撑位${nearest_support:.2f} (距离{nearest_support_dist:.1f}%) - 可能反弹')
-        
-        if nearest_resistance and nearest_resistance_dist < 2:
-            signals['signals'].append(f'🔴 接近压力位${nearest_resistance:.2f} (距离{nearest_resistance_dist:.1f}%) - 可能回调')
-        
-        # 突破信号
-        if 'resistance_20d_high' in indicators:
-            high_20 = indicators['resistance_20d_high']
-            if current_price >= high_20 * 0.99:  # 接近或突破20日高点
-                signals['signals'].append(f'🚀 突破20日高点${high_20:.2f} - 强势信号')
-        
-        if 'support_20d_low' in indicators:
-            low_20 = indicators['support_20d_low']
-            if current_price <= low_20 * 1.01:  # 接近或跌破20日低点
-                signals['signals'].append(f'⚠️ 跌破20日低点${low_20:.2f} - 弱势信号')
-    
-    # Volume Profile信号
-    if 'vp_poc' in indicators:
-        poc = indicators['vp_poc']
-        current_price = indicators.get('current_price', 0)
-        vp_status = indicators.get('vp_status', 'inside_va')
-        
-        dist_pct = (current_price - poc) / poc * 100
-        
-        if abs(dist_pct) < 0.5:
-            signals['signals'].append(f'⚖️ 价格在POC(${poc:.2f})附近 - 筹码密集区平衡')
-        elif vp_status == 'above_va':
-            signals['signals'].append(f'📈 价格在价值区域上方(POC ${poc:.2f}) - 强势失衡')
-        elif vp_status == 'below_va':
-            signals['signals'].append(f'📉 价格在价值区域下方(POC ${poc:.2f}) - 弱势失衡')
-    
-    # 21. ML预测信号
-    if 'ml_trend' in indicators:
-        ml_trend = indicators['ml_trend']
-        ml_confidence = indicators.get('ml_confidence', 0)
-        ml_prediction = indicators.get('ml_prediction', 0)
-        
-        if ml_confidence > 50:
-            if ml_trend == 'up':
-                signals['signals'].append(f'🤖 ML预测: 看涨趋势(置信度{ml_confidence:.1f}%, 预期涨幅{ml_prediction*100:.2f}%) - AI看多')
-            elif ml_trend == 'down':
-                signals['signals'].append(f'🤖 ML预测: 看跌趋势(置信度{ml_confidence:.1f}%, 预期跌幅{ml_prediction*100:.2f}%) - AI看空')
-            else:
-                signals['signals'].append(f'🤖 ML预测: 横盘整理(置信度{ml_confidence:.1f}%) - AI中性')
-        elif ml_confidence > 30:
-            if ml_trend == 'up':
-                signals['signals'].append(f'🤖 ML预测: 轻微看涨(置信度{ml_confidence:.1f}%) - 谨慎乐观')
-            elif ml_trend == 'down':
-                signals['signals'].append(f'🤖 ML预测: 轻微看跌(置信度{ml_confidence:.1f}%) - 谨慎悲观')
-            
     # 使用新的多维度加权评分系统计算综合评分
     score, score_details = calculate_comprehensive_score(indicators)
     signals['score'] = score
@@ -318,107 +301,34 @@ def generate_signals(indicators: dict, account_value: float = 100000, risk_perce
     return signals
 
 
+# 风险等级阈值（返回英文标识符，前端负责显示）
+_RISK_LEVEL_THRESHOLDS = (15, 30, 50, 70)
+_RISK_LEVELS = ('very_low', 'low', 'medium', 'high', 'very_high')
+
+# 各风险等级对应的仓位调整系数
+RISK_MULTIPLIER = MappingProxyType({
+    'very_low': 1.5,
+    'low': 1.2,
+    'medium': 1.0,
+    'high': 0.7,
+    'very_high': 0.5
+})
+
+
 def assess_risk(indicators: dict):
     """
     评估投资风险等级
+    评分在 assess_risk_core 中完成，这里根据位掩码还原因子描述
     """
-    risk_score = 0
-    risk_factors = []
+    risk_score, flags = assess_risk_core(pack_risk_inputs(indicators))
     
-    # 1. 波动率风险
-    if 'volatility_20' in indicators:
-        vol = indicators['volatility_20']
-        if vol > 5:
-            risk_score += 30
-            risk_factors.append(f'极高波动率({vol:.1f}%)')
-        elif vol > 3:
-            risk_score += 20
-            risk_factors.append(f'高波动率({vol:.1f}%)')
-        elif vol > 2:
-            risk_score += 10
-            risk_factors.append(f'中等波动率({vol:.1f}%)')
-    
-    # 2. RSI极端值
-    if 'rsi' in indicators:
-        rsi = indicators['rsi']
-        if rsi > 85 or rsi < 15:
-            risk_score += 20
-            risk_factors.append(f'RSI极端值({rsi:.1f})')
-    
-    # 3. 连续涨跌风险
-    if 'consecutive_up_days' in indicators:
-        up_days = indicators['consecutive_up_days']
-        if up_days >= 7:
-            risk_score += 25
-            risk_factors.append(f'连续上涨{up_days}天(回调风险)')
-        elif up_days >= 5:
-            risk_score += 15
-            risk_factors.append(f'连续上涨{up_days}天')
-    
-    if 'consecutive_down_days' in indicators:
-        down_days = indicators['consecutive_down_days']
-        if down_days >= 7:
-            risk_score += 25
-            risk_factors.append(f'连续下跌{down_days}天(继续下跌风险)')
-        elif down_days >= 5:
-            risk_score += 15
-            risk_factors.append(f'连续下跌{down_days}天')
-    
-    # 4. 距离支撑/压力位
-    current_price = indicators.get('current_price')
-    if current_price and 'support_20d_low' in indicators:
-        support = indicators['support_20d_low']
-        dist_to_support = ((current_price - support) / current_price) * 100
-        if dist_to_support < 2:
-            risk_score += 15
-            risk_factors.append('接近重要支撑位')
-    
-    if current_price and 'resistance_20d_high' in indicators:
-        resistance = indicators['resistance_20d_high']
-        dist_to_resistance = ((resistance - current_price) / current_price) * 100
-        if dist_to_resistance < 2:
-            risk_score += 15
-            risk_factors.append('接近重要压力位')
-    
-    # 5. 趋势不明确
-    if 'trend_strength' in indicators:
-        strength = indicators['trend_strength']
-        if strength < 15:
-            risk_score += 10
-            risk_factors.append('趋势不明确')
-    
-    # 6. 量价背离
-    if 'obv_trend' in indicators:
-        obv_trend = indicators['obv_trend']
-        price_change = indicators.get('price_change_pct', 0)
-        
-        if (obv_trend == 'up' and price_change < -1) or (obv_trend == 'down' and price_change > 1):
-            risk_score += 15
-            risk_factors.append('量价背离')
-    
-    # 7. ADX趋势强度风险
-    if 'adx' in indicators:
-        adx = indicators['adx']
-        # ADX低于20表示趋势不明确，增加交易风险
-        if adx < 20:
-            risk_score += 10
-            risk_factors.append(f'ADX({adx:.1f})趋势不明确')
-        # ADX高于60表示趋势过强，可能反转
-        elif adx > 60:
-            risk_score += 15
-            risk_factors.append(f'ADX({adx:.1f})趋势过强可能反转')
+    risk_factors = []
+    for bit, (key, template) in enumerate(RISK_FACTOR_BITS):
+        if flags & (1 << bit):
+            risk_factors.append(template % {'value': indicators[key]} if key else template)
     
-    # 判断风险等级（返回英文标识符，前端负责显示）
-    if risk_score >= 70:
-        level = 'very_high'
-    elif risk_score >= 50:
-        level = 'high'
-    elif risk_score >= 30:
-        level = 'medium'
-    elif risk_score >= 15:
-        level = 'low'
-    else:
-        level = 'very_low'
+    # 判断风险等级
+    level = _RISK_LEVELS[bisect.bisect_right(_RISK_LEVEL_THRESHOLDS, risk_score)]
     
     return {
         'level': level,
@@ -441,576 +351,242 @@ def calculate_stop_loss_profit(indicators: dict, action: str = 'buy', account_va
     if not current_price:
         return {}
     
-    result = {}
-    volatility = indicators.get('volatility_20', 2.0)
-    
-    # 根据波动率动态调整ATR倍数
-    if volatility > 4:  # 高波动
-        atr_stop_multiplier = 2.5
-        atr_profit_multiplier = 4.0
-    elif volatility > 2.5:  # 中等波动
-        atr_stop_multiplier = 2.0
-        atr_profit_multiplier = 3.5
-    else:  # 低波动
-        atr_stop_multiplier = 1.5
-        atr_profit_multiplier = 3.0
-    
-    # 计算止损止盈价位
-    if 'atr' in indicators:
-        atr = indicators['atr']
-        if action == 'buy':
-            result['stop_loss'] = float(current_price - atr_stop_multiplier * atr)
-            result['take_profit'] = float(current_price + atr_profit_multiplier * atr)
-        else:  # sell
-            result['stop_loss'] = float(current_price + atr_stop_multiplier * atr)
-            result['take_profit'] = float(current_price - atr_profit_multiplier * atr)
-    elif 'support_20d_low' in indicators and 'resistance_20d_high' in indicators:
-        support = indicators['support_20d_low']
-        resistance = indicators['resistance_20d_high']
-        if action == 'buy':
-            result['stop_loss'] = float(support * 0.98)
-            result['take_profit'] = float(resistance)
-        else:  # sell
-            result['stop_loss'] = float(resistance * 1.02)
-            result['take_profit'] = float(support)
-    else:
-        if action == 'buy':
-            result['stop_loss'] = float(current_price * 0.95)
-            result['take_profit'] = float(current_price * 1.10)
-        else:  # sell
-            result['stop_loss'] = float(current_price * 1.05)
-            result['take_profit'] = float(current_price * 0.90)
+    # 计算止损止盈价位（缺失的指标以 NaN 传入内核）
+    stop_loss, take_profit = stop_loss_core(
+        float(current_price),
+        float(indicators.get('volatility_20', 2.0)),
+        float(indicators.get('atr', np.nan)),
+        float(indicators.get('support_20d_low', np.nan)),
+        float(indicators.get('resistance_20d_high', np.nan)),
+        action == 'buy'
+    )
+    # 内核返回原生 float；当前价等可能为 numpy 标量，由 orjson 的 OPT_SERIALIZE_NUMPY 直接序列化
+    result = {'stop_loss': stop_loss, 'take_profit': take_profit}
     
     # 计算风险收益比
     if action == 'buy':
-        risk = current_price - result['stop_loss']
-        reward = result['take_profit'] - current_price
+        risk = current_price - stop_loss
+        reward = take_profit - current_price
     else:  # sell
-        risk = result['stop_loss'] - current_price
-        reward = current_price - result['take_profit']
+        risk = stop_loss - current_price
+        reward = current_price - take_profit
     
     if risk > 0:
-        result['risk_reward_ratio'] = float(reward / risk)
+        result['risk_reward_ratio'] = reward / risk
     
-    position_sizing = calculate_position_sizing(indicators, result, account_value, risk_percent)
+    position_sizing = calculate_position_sizing(indicators, current_price, stop_loss, account_value, risk_percent)
     result.update(position_sizing)
     
     return result
 
 
-def calculate_position_sizing(indicators: dict, stop_loss_data: dict, account_value: float = 100000, risk_percent: float = 2.0):
+def calculate_position_sizing(indicators: dict, current_price: float, stop_loss: float,
+                              account_value: float = 100000, risk_percent: float = 2.0):
     """
     计算建议的仓位大小和风险管理
     
     Args:
-        indicators: 技术指标字典
-        stop_loss_data: 止损数据（包含 stop_loss）
+        indicators: 技术指标字典（读取 risk_level）
+        current_price: 当前价格
+        stop_loss: 止损价
         account_value: 账户金额（美元）
         risk_percent: 单笔交易风险百分比
     """
     result = {}
     
-    current_price = indicators.get('current_price')
-    stop_loss = stop_loss_data.get('stop_loss')
-    
     if not current_price or not stop_loss:
         return result
         
-    risk_per_share = abs(current_price - stop_loss)
-    max_risk_amount = account_value * (risk_percent / 100.0)
+    # 仓位数值计算在 position_sizing_core 中完成，风险等级系数按 risk_level 查表传入
+    risk_level = indicators.get('risk_level', 'medium')
+    (risk_per_share, suggested_position_size, position_risk_amount,
+     position_value, position_ratio, adjusted_position_size) = position_sizing_core(
+        float(current_price), float(stop_loss), float(account_value), float(risk_percent),
+        RISK_MULTIPLIER.get(risk_level, 1.0)
+    )
     
     if risk_per_share > 0:
-        suggested_position_size = int(max_risk_amount / risk_per_share)
         result['suggested_position_size'] = suggested_position_size
-        result['position_risk_amount'] = float(suggested_position_size * risk_per_share)
-        
-        position_value = suggested_position_size * current_price
-        result['position_value'] = float(position_value)
-        
-        position_ratio = (position_value / account_value) * 100
-        result['position_ratio'] = float(position_ratio)
-        
-        # 根据风险等级调整仓位
-        risk_level = indicators.get('risk_level', 'medium')
-        risk_multiplier = {
-            'very_low': 1.5,
-            'low': 1.2,
-            'medium': 1.0,
-            'high': 0.7,
-            'very_high': 0.5
-        }
-        
-        adjusted_position_size = int(suggested_position_size * risk_multiplier.get(risk_level, 1.0))
+        result['position_risk_amount'] = position_risk_amount
+        result['position_value'] = position_value
+        result['position_ratio'] = position_ratio
         result['adjusted_position_size'] = adjusted_position_size
         
         result['position_sizing_advice'] = {
             'max_risk_percent': float(risk_percent),
-            'risk_per_share': float(risk_per_share),
+            'risk_per_share': risk_per_share,
             'suggested_size': suggested_position_size,
             'adjusted_size': adjusted_position_size,
-            'position_value': float(position_value),
+            'position_value': position_value,
             'account_value': float(account_value)
         }
     
     return result
 
 
+_http_session = None
+
+
+def _get_http_session():
+    """
+    获取复用连接池的 HTTP 会话（惰性初始化，避免每次探测都重新建立连接）
+    仅用于 Ollama 存活探测，不做重试：服务未启动时应立即失败
+    """
+    global _http_session
+    if _http_session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _http_session = session
+    return _http_session
+
+
+_ollama_client = None
+
+
+def _get_ollama_client():
+    """
+    获取复用连接池的 Ollama 客户端（惰性初始化，避免每次分析都重新创建客户端）
+    """
+    global _ollama_client
+    if _ollama_client is None:
+        if ollama is None:
+            raise ImportError('未安装 ollama 客户端')
+        _ollama_client = ollama.Client(host=os.getenv('OLLAMA_HOST', OLLAMA_HOST), timeout=120)
+    return _ollama_client
+
+
+# Ollama 可用性探测结果缓存：(过期时间, 是否可用)，有效期内不再发起探测请求
+_OLLAMA_STATUS_TTL = 30
+_ollama_status = (0.0, False)
+
+
 def check_ollama_available():
     """
-    检查 Ollama 是否可用
+    检查 Ollama 是否可用（结果缓存 _OLLAMA_STATUS_TTL 秒）
     """
+    global _ollama_status
+    now = time.monotonic()
+    expiry, available = _ollama_status
+    if now < expiry:
+        return available
+    
+    available = _probe_ollama()
+    _ollama_status = (now + _OLLAMA_STATUS_TTL, available)
+    return available
+
+
+def _probe_ollama():
+    """
+    探测 Ollama 服务：/api/tags 返回 200 即视为可用
+    """
+    # 未安装 ollama 客户端时无法调用分析，视为不可用
+    if ollama is None:
+        return False
+    
+    ollama_host = os.getenv('OLLAMA_HOST', OLLAMA_HOST)
     try:
-        import ollama
-        import requests
-        
-        ollama_host = os.getenv('OLLAMA_HOST', OLLAMA_HOST)
-        
-        try:
-            response = requests.get(f'{ollama_host}/api/tags', timeout=2)
-            if response.status_code == 200:
-                try:
-                    client = ollama.Client(host=ollama_host)
-                    client.list()
-                    return True
-                except Exception:
-                    return True
-            return False
-        except Exception:
-            return False
-    except ImportError:
+        response = _get_http_session().get(f'{ollama_host}/api/tags', timeout=2)
+        return response.status_code == 200
+    except Exception:
         return False
 
 
-def perform_ai_analysis(symbol, indicators, signals, duration, model=DEFAULT_AI_MODEL, extra_data=None):
+class _ZeroDefault(dict):
     """
-    执行AI分析的辅助函数
+    format_map 使用的字段字典，缺失字段返回 0（与 indicators.get(key, 0) 一致）
     """
-    try:
-        import ollama
-        
-        fundamental_data = indicators.get('fundamental_data', {})
-        has_fundamental = (fundamental_data and 
-                          isinstance(fundamental_data, dict) and 
-                          'raw_xml' not in fundamental_data and
-                          len(fundamental_data) > 0)
-        
-        if has_fundamental:
-            fundamental_sections = []
-            
-            if 'CompanyName' in fundamental_data:
-                info_parts = [f"公司名称: {fundamental_data['CompanyName']}"]
-                if 'Exchange' in fundamental_data:
-                    info_parts.append(f"交易所: {fundamental_data['Exchange']}")
-                if 'Employees' in fundamental_data:
-                    info_parts.append(f"员工数: {fundamental_data['Employees']}人")
-                if 'SharesOutstanding' in fundamental_data:
-                    shares = fundamental_data['SharesOutstanding']
-                    try:
-                        shares_val = float(shares)
-                        if shares_val >= 1e9:
-                            shares_str = f"{shares_val/1e9:.2f}B股"
-                        elif shares_val >= 1e6:
-                            shares_str = f"{shares_val/1e6:.2f}M股"
-                        else:
-                            shares_str = f"{int(shares_val):,}股"
-                        info_parts.append(f"流通股数: {shares_str}")
-                    except:
-                        info_parts.append(f"流通股数: {shares}")
-                if info_parts:
-                    fundamental_sections.append("基本信息:\n" + "\n".join([f"   - {p}" for p in info_parts]))
-            
-            # 市值和价格
-            price_parts = []
-            if 'MarketCap' in fundamental_data:
-                try:
-                    mcap = float(fundamental_data['MarketCap'])
-                    if mcap >= 1e9:
-                        price_parts.append(f"市值: ${mcap/1e9:.2f}B")
-                    elif mcap >= 1e6:
-                        price_parts.append(f"市值: ${mcap/1e6:.2f}M")
-                    else:
-                        price_parts.append(f"市值: ${mcap:.2f}")
-                except:
-                    price_parts.append(f"市值: {fundamental_data['MarketCap']}")
-            if 'Price' in fundamental_data:
-                price_parts.append(f"当前价: ${fundamental_data['Price']}")
-            if '52WeekHigh' in fundamental_data and '52WeekLow' in fundamental_data:
-                price_parts.append(f"52周区间: ${fundamental_data['52WeekLow']} - ${fundamental_data['52WeekHigh']}")
-            if price_parts:
-                fundamental_sections.append("市值与价格:\n" + "\n".join([f"   - {p}" for p in price_parts]))
-            
-            # 财务指标
-            financial_parts = []
-            for key, label in [('RevenueTTM', '营收(TTM)'), ('NetIncomeTTM', '净利润(TTM)'), 
-                              ('EBITDATTM', 'EBITDA(TTM)'), ('ProfitMargin', '利润率'), 
-                              ('GrossMargin', '毛利率')]:
-                if key in fundamental_data:
-                    value = fundamental_data[key]
-                    try:
-                        val = float(value)
-                        if 'Margin' in key:
-                            financial_parts.append(f"{label}: {val:.2f}%")
-                        elif val >= 1e9:
-                            financial_parts.append(f"{label}: ${val/1e9:.2f}B")
-                        elif val >= 1e6:
-                            financial_parts.append(f"{label}: ${val/1e6:.2f}M")
-                        else:
-                            financial_parts.append(f"{label}: {val:.2f}")
-                    except:
-                        financial_parts.append(f"{label}: {value}")
-            if financial_parts:
-                fundamental_sections.append("财务指标:\n" + "\n".join([f"   - {p}" for p in financial_parts]))
-            
-            # 每股数据
-            per_share_parts = []
-            for key, label in [('EPS', '每股收益(EPS)'), ('BookValuePerShare', '每股净资产'), 
-                              ('CashPerShare', '每股现金'), ('DividendPerShare', '每股股息')]:
-                if key in fundamental_data:
-                    value = fundamental_data[key]
-                    try:
-                        val = float(value)
-                        per_share_parts.append(f"{label}: ${val:.2f}")
-                    except:
-                        per_share_parts.append(f"{label}: {value}")
-            if per_share_parts:
-                fundamental_sections.append("每股数据:\n" + "\n".join([f"   - {p}" for p in per_share_parts]))
-            
-            # 估值指标
-            valuation_parts = []
-            for key, label in [('PE', '市盈率(PE)'), ('PriceToBook', '市净率(PB)'), ('ROE', '净资产收益率(ROE)')]:
-                if key in fundamental_data:
-                    value = fundamental_data[key]
-                    try:
-                        val = float(value)
-                        if key == 'ROE':
-                            valuation_parts.append(f"{label}: {val:.2f}%")
-                        else:
-                            valuation_parts.append(f"{label}: {val:.2f}")
-                    except:
-                        valuation_parts.append(f"{label}: {value}")
-            if valuation_parts:
-                fundamental_sections.append("估值指标:\n" + "\n".join([f"   - {p}" for p in valuation_parts]))
-            
-            # 预测数据
-            forecast_parts = []
-            if 'TargetPrice' in fundamental_data:
-                try:
-                    target = float(fundamental_data['TargetPrice'])
-                    forecast_parts.append(f"目标价: ${target:.2f}")
-                except:
-                    forecast_parts.append(f"目标价: {fundamental_data['TargetPrice']}")
-            if 'ConsensusRecommendation' in fundamental_data:
-                try:
-                    consensus = float(fundamental_data['ConsensusRecommendation'])
-                    if consensus <= 1.5:
-                        rec = "强烈买入"
-                    elif consensus <= 2.5:
-                        rec = "买入"
-                    elif consensus <= 3.5:
-                        rec = "持有"
-                    elif consensus <= 4.5:
-                        rec = "卖出"
-                    else:
-                        rec = "强烈卖出"
-                    forecast_parts.append(f"共识评级: {rec} ({consensus:.2f})")
-                except:
-                    forecast_parts.append(f"共识评级: {fundamental_data['ConsensusRecommendation']}")
-            if 'ProjectedEPS' in fundamental_data:
-                try:
-                    proj_eps = float(fundamental_data['ProjectedEPS'])
-                    forecast_parts.append(f"预测EPS: ${proj_eps:.2f}")
-                except:
-                    forecast_parts.append(f"预测EPS: {fundamental_data['ProjectedEPS']}")
-            if 'ProjectedGrowthRate' in fundamental_data:
-                try:
-                    growth = float(fundamental_data['ProjectedGrowthRate'])
-                    forecast_parts.append(f"预测增长率: {growth:.2f}%")
-                except:
-                    forecast_parts.append(f"预测增长率: {fundamental_data['ProjectedGrowthRate']}")
-            if forecast_parts:
-                fundamental_sections.append("分析师预测:\n" + "\n".join([f"   - {p}" for p in forecast_parts]))
-            
-            # 详细财务报表数据
-            if fundamental_data.get('Financials'):
-                try:
-                    financials = fundamental_data['Financials']
-                    if isinstance(financials, list) and len(financials) > 0:
-                        financials_text = "年度财务报表:\n"
-                        for record in financials[:5]:  # 最近5年
-                            if isinstance(record, dict):
-                                date = record.get('index', record.get('Date', 'N/A'))
-                                financials_text += f"   {date}:\n"
-                                for key, value in record.items():
-                                    if key not in ['index', 'Date'] and value:
-                                        try:
-                                            val = float(value)
-                                            if abs(val) >= 1e9:
-                                                financials_text += f"     - {key}: ${val/1e9:.2f}B\n"
-                                            elif abs(val) >= 1e6:
-                                                financials_text += f"     - {key}: ${val/1e6:.2f}M\n"
-                                            else:
-                                                financials_text += f"     - {key}: ${val:.2f}\n"
-                                        except:
-                                            financials_text += f"     - {key}: {value}\n"
-                        fundamental_sections.append(financials_text)
-                except Exception as e:
-                    logger.warning(f"格式化年度财务报表失败: {e}")
-            
-            if fundamental_data.get('QuarterlyFinancials'):
-                try:
-                    quarterly = fundamental_data['QuarterlyFinancials']
-                    if isinstance(quarterly, list) and len(quarterly) > 0:
-                        quarterly_text = "季度财务报表:\n"
-                        for record in quarterly[:4]:  # 最近4个季度
-                            if isinstance(record, dict):
-                                date = record.get('index', record.get('Date', 'N/A'))
-                                quarterly_text += f"   {date}:\n"
-                                for key, value in record.items():
-                                    if key not in ['index', 'Date'] and value:
-                                        try:
-                                            val = float(value)
-                                            if abs(val) >= 1e9:
-                                                quarterly_text += f"     - {key}: ${val/1e9:.2f}B\n"
-                                            elif abs(val) >= 1e6:
-                                                quarterly_text += f"     - {key}: ${val/1e6:.2f}M\n"
-                                            else:
-                                                quarterly_text += f"     - {key}: ${val:.2f}\n"
-                                        except:
-                                            quarterly_text += f"     - {key}: {value}\n"
-                        fundamental_sections.append(quarterly_text)
-                except Exception as e:
-                    logger.warning(f"格式化季度财务报表失败: {e}")
-            
-            if fundamental_data.get('BalanceSheet'):
-                try:
-                    balance = fundamental_data['BalanceSheet']
-                    if isinstance(balance, list) and len(balance) > 0:
-                        balance_text = "年度资产负债表:\n"
-                        for record in balance[:3]:  # 最近3年
-                            if isinstance(record, dict):
-                                date = record.get('index', record.get('Date', 'N/A'))
-                                balance_text += f"   {date}:\n"
-                                for key, value in record.items():
-                                    if key not in ['index', 'Date'] and value:
-                                        try:
-                                            val = float(value)
-                                            if abs(val) >= 1e9:
-                                                balance_text += f"     - {key}: ${val/1e9:.2f}B\n"
-                                            elif abs(val) >= 1e6:
-                                                balance_text += f"     - {key}: ${val/1e6:.2f}M\n"
-                                            else:
-                                                balance_text += f"     - {key}: ${val:.2f}\n"
-                                        except:
-                                            balance_text += f"     - {key}: {value}\n"
-                        fundamental_sections.append(balance_text)
-                except Exception as e:
-                    logger.warning(f"格式化资产负债表失败: {e}")
-            
-            if fundamental_data.get('Cashflow'):
-                try:
-                    cashflow = fundamental_data['Cashflow']
-                    if isinstance(cashflow, list) and len(cashflow) > 0:
-                        cashflow_text = "年度现金流量表:\n"
-                        for record in cashflow[:3]:  # 最近3年
-                            if isinstance(record, dict):
-                                date = record.get('index', record.get('Date', 'N/A'))
-                                cashflow_text += f"   {date}:\n"
-                                for key, value in record.items():
-                                    if key not in ['index', 'Date'] and value:
-                                        try:
-                                            val = float(value)
-                                            if abs(val) >= 1e9:
-                                                cashflow_text += f"     - {key}: ${val/1e9:.2f}B\n"
-                                            elif abs(val) >= 1e6:
-                                                cashflow_text += f"     - {key}: ${val/1e6:.2f}M\n"
-                                            else:
-                                                cashflow_text += f"     - {key}: ${val:.2f}\n"
-                                        except:
-                                            cashflow_text += f"     - {key}: {value}\n"
-                        fundamental_sections.append(cashflow_text)
-                except Exception as e:
-                    logger.warning(f"格式化现金流量表失败: {e}")
-            
-            fundamental_text = "\n\n".join(fundamental_sections) if fundamental_sections else "无可用数据"
-        else:
-            fundamental_text = None
-        
-        # 处理额外数据（股息、机构持仓、分析师推荐等）
-        extra_sections = []
-        if extra_data:
-            # 股息数据
-            if extra_data.get('dividends'):
-                dividends = extra_data['dividends']
-                div_text = f"股息历史 (最近{len(dividends)}次):\n"
-                for div in dividends:
-                    div_text += f"   - {div['date']}: ${div['dividend']:.4f}\n"
-                extra_sections.append(div_text)
-            
-            # 机构持仓
-            if extra_data.get('institutional_holders'):
-                inst = extra_data['institutional_holders']
-                inst_text = f"机构持仓 (前{min(len(inst), 10)}大机构):\n"
-                for i, holder in enumerate(inst[:10], 1):
-                    name = holder.get('Holder', '未知')
-                    shares = holder.get('Shares', 0)
-                    value = holder.get('Value', 0)
-                    pct = holder.get('% Out', 0)
-                    inst_text += f"   {i}. {name}\n"
-                    inst_text += f"      持股: {shares:,}, 市值: ${value:,.0f}, 占比: {pct}\n"
-                extra_sections.append(inst_text)
-            
-            # 内部交易
-            if extra_data.get('insider_transactions'):
-                insider = extra_data['insider_transactions']
-                insider_text = f"内部交易 (最近{min(len(insider), 10)}笔):\n"
-                for i, trans in enumerate(insider[:10], 1):
-                    insider_name = trans.get('Insider', '未知')
-                    trans_type = trans.get('Transaction', '未知')
-                    shares = trans.get('Shares', 0)
-                    value = trans.get('Value', 0)
-                    insider_text += f"   {i}. {insider_name}: {trans_type}\n"
-                    if shares:
-                        insider_text += f"      股数: {shares:,}, 价值: ${value:,.0f}\n"
-                extra_sections.append(insider_text)
-            
-            # 分析师推荐
-            if extra_data.get('analyst_recommendations'):
-                recs = extra_data['analyst_recommendations']
-                rec_text = f"分析师推荐 (最近{min(len(recs), 8)}条):\n"
-                for i, rec in enumerate(recs[:8], 1):
-                    firm = rec.get('Firm', '未知')
-                    to_grade = rec.get('To Grade', '未知')
-                    from_grade = rec.get('From Grade', '')
-                    action = rec.get('Action', '')
-                    if from_grade and action:
-                        rec_text += f"   {i}. {firm}: {from_grade} → {to_grade} ({action})\n"
-                    else:
-                        rec_text += f"   {i}. {firm}: {to_grade}\n"
-                extra_sections.append(rec_text)
-            
-            # 收益数据
-            if extra_data.get('earnings'):
-                earnings_data = extra_data['earnings']
-                quarterly = earnings_data.get('quarterly', [])
-                if quarterly:
-                    earn_text = f"季度收益 (最近{min(len(quarterly), 4)}个季度):\n"
-                    for q in quarterly[:4]:
-                        quarter = q.get('quarter', '未知')
-                        revenue = q.get('Revenue', 0)
-                        earnings_val = q.get('Earnings', 0)
-                        try:
-                            rev_b = float(revenue) / 1e9
-                            earn_b = float(earnings_val) / 1e9
-                            earn_text += f"   {quarter}: 营收 ${rev_b:.2f}B, 盈利 ${earn_b:.2f}B\n"
-                        except:
-                            earn_text += f"   {quarter}: 营收 {revenue}, 盈利 {earnings_val}\n"
-                    extra_sections.append(earn_text)
-            
-            # 新闻标题
-            if extra_data.get('news'):
-                news = extra_data['news']
-                news_text = f"最新新闻 (最近{len(news)}条标题):\n"
-                for i, item in enumerate(news, 1):
-                    title = item.get('title', '未知')
-                    publisher = item.get('publisher', '')
-                    news_text += f"   {i}. {title}"
-                    if publisher:
-                        news_text += f" [{publisher}]"
-                    news_text += "\n"
-                extra_sections.append(news_text)
-        
-        extra_text = "\n\n".join(extra_sections) if extra_sections else None
-        
-        # 获取评分系统详细信息
-        score_details = signals.get('score_details', {})
-        dimensions = score_details.get('dimensions', {}) if score_details else {}
-        
-        # 格式化建议价位（处理可能为None的情况）
-        stop_loss_val = signals.get('stop_loss')
-        stop_loss_str = f"${stop_loss_val:.2f}" if stop_loss_val is not None else '未计算'
-        take_profit_val = signals.get('take_profit')
-        take_profit_str = f"${take_profit_val:.2f}" if take_profit_val is not None else '未计算'
-        sar_val = indicators.get('sar')
-        sar_str = f"${sar_val:.2f}" if sar_val is not None else '未计算'
-        atr_val = indicators.get('atr')
-        atr_str = f"${atr_val:.2f}" if atr_val is not None else '未计算'
-        
-        # 根据是否有基本面数据构建不同的提示词
-        if has_fundamental:
-            # 有基本面数据的完整分析提示词
-            prompt = f"""# 分析对象
-**股票代码:** {symbol.upper()}  
-**当前价格:** ${indicators.get('current_price', 0):.2f}  
-**分析周期:** {duration} ({indicators.get('data_points', 0)}个数据点)
+    def __missing__(self, key):
+        return 0
+
+
+# 提示词中文本型字段的默认值
+_PROMPT_TEXT_DEFAULTS = {
+    'trend_direction': 'neutral',
+    'supertrend_direction': 'neutral',
+    'ichimoku_status': 'unknown',
+    'stoch_rsi_status': 'neutral',
+    'obv_trend': 'neutral',
+    'price_volume_confirmation': 'neutral',
+    'vp_status': 'neutral',
+    'ml_trend': 'unknown',
+}
+
+# 有基本面数据的完整分析提示词模板
+_AI_PROMPT_TEMPLATE_FULL = """# 分析对象
+**股票代码:** {symbol}  
+**当前价格:** ${current_price:.2f}  
+**分析周期:** {duration} ({data_points}个数据点)
 
 # 系统评分结果
-**综合评分:** {signals.get('score', 0)}/100  
-**操作建议:** {signals.get('recommendation', '未知')}  
-**风险等级:** {signals.get('risk', {}).get('level', 'unknown') if signals.get('risk') else 'unknown'}  
-**风险评分:** {signals.get('risk', {}).get('score', 0) if signals.get('risk') else 0}/100
+**综合评分:** {score}/100  
+**操作建议:** {recommendation}  
+**风险等级:** {risk_level}  
+**风险评分:** {risk_score}/100
 
 **系统建议价位（参考值，需结合技术分析调整）:**
-- 当前价格: ${indicators.get('current_price', 0):.2f}
+- 当前价格: ${current_price:.2f}
 - 系统建议止损位: {stop_loss_str}
 - 系统建议止盈位: {take_profit_str}
 - SAR止损参考: {sar_str}
-- ATR波动参考: {atr_str} ({indicators.get('atr_percent', 0):.1f}%)
+- ATR波动参考: {atr_str} ({atr_percent:.1f}%)
 
 **多维度评分详情:**
-- 趋势方向维度: {dimensions.get('trend', 0):.1f}/100
-- 动量指标维度: {dimensions.get('momentum', 0):.1f}/100
-- 成交量分析维度: {dimensions.get('volume', 0):.1f}/100
-- 波动性维度: {dimensions.get('volatility', 0):.1f}/100
-- 支撑压力维度: {dimensions.get('support_resistance', 0):.1f}/100
-- 高级指标维度: {dimensions.get('advanced', 0):.1f}/100
+- 趋势方向维度: {dim_trend:.1f}/100
+- 动量指标维度: {dim_momentum:.1f}/100
+- 成交量分析维度: {dim_volume:.1f}/100
+- 波动性维度: {dim_volatility:.1f}/100
+- 支撑压力维度: {dim_support_resistance:.1f}/100
+- 高级指标维度: {dim_advanced:.1f}/100
 
 ---
 
 # 技术指标数据
 
 ## 1. 趋势指标
-- 移动平均线: MA5=${indicators.get('ma5', 0):.2f}, MA20=${indicators.get('ma20', 0):.2f}, MA50=${indicators.get('ma50', 0):.2f}
-   - 趋势方向: {indicators.get('trend_direction', 'neutral')}
-   - 趋势强度: {indicators.get('trend_strength', 0):.0f}%
-- ADX: {indicators.get('adx', 0):.1f} (+DI={indicators.get('plus_di', 0):.1f}, -DI={indicators.get('minus_di', 0):.1f})
-- SuperTrend: ${indicators.get('supertrend', 0):.2f} (方向: {indicators.get('supertrend_direction', 'neutral')})
-- Ichimoku云层: {indicators.get('ichimoku_status', 'unknown')}
-- SAR止损位: ${indicators.get('sar', 0):.2f}
+- 移动平均线: MA5=${ma5:.2f}, MA20=${ma20:.2f}, MA50=${ma50:.2f}
+   - 趋势方向: {trend_direction}
+   - 趋势强度: {trend_strength:.0f}%
+- ADX: {adx:.1f} (+DI={plus_di:.1f}, -DI={minus_di:.1f})
+- SuperTrend: ${supertrend:.2f} (方向: {supertrend_direction})
+- Ichimoku云层: {ichimoku_status}
+- SAR止损位: ${sar:.2f}
 
 ## 2. 动量指标
-- RSI(14): {indicators.get('rsi', 0):.1f}
-- MACD: {indicators.get('macd', 0):.3f} (信号: {indicators.get('macd_signal', 0):.3f}, 柱状图: {indicators.get('macd_histogram', 0):.3f})
-- KDJ: K={indicators.get('kdj_k', 0):.1f}, D={indicators.get('kdj_d', 0):.1f}, J={indicators.get('kdj_j', 0):.1f}
-- CCI: {indicators.get('cci', 0):.1f}
-- StochRSI: K={indicators.get('stoch_rsi_k', 0):.1f}, D={indicators.get('stoch_rsi_d', 0):.1f} (状态: {indicators.get('stoch_rsi_status', 'neutral')})
+- RSI(14): {rsi:.1f}
+- MACD: {macd:.3f} (信号: {macd_signal:.3f}, 柱状图: {macd_histogram:.3f})
+- KDJ: K={kdj_k:.1f}, D={kdj_d:.1f}, J={kdj_j:.1f}
+- CCI: {cci:.1f}
+- StochRSI: K={stoch_rsi_k:.1f}, D={stoch_rsi_d:.1f} (状态: {stoch_rsi_status})
 
 ## 3. 波动性指标
-- 布林带: 上轨=${indicators.get('bb_upper', 0):.2f}, 中轨=${indicators.get('bb_middle', 0):.2f}, 下轨=${indicators.get('bb_lower', 0):.2f}
-- ATR: ${indicators.get('atr', 0):.2f} ({indicators.get('atr_percent', 0):.1f}%)
-- 20日波动率: {indicators.get('volatility_20', 0):.2f}%
+- 布林带: 上轨=${bb_upper:.2f}, 中轨=${bb_middle:.2f}, 下轨=${bb_lower:.2f}
+- ATR: ${atr:.2f} ({atr_percent:.1f}%)
+- 20日波动率: {volatility_20:.2f}%
 
 ## 4. 成交量分析
-- 成交量比率: {indicators.get('volume_ratio', 0):.2f}x (当前/20日均量)
-- OBV趋势: {indicators.get('obv_trend', 'neutral')}
-- 价量关系: {indicators.get('price_volume_confirmation', 'neutral')}
-- Volume Profile: POC=${indicators.get('vp_poc', 0):.2f}, 状态={indicators.get('vp_status', 'neutral')}
+- 成交量比率: {volume_ratio:.2f}x (当前/20日均量)
+- OBV趋势: {obv_trend}
+- 价量关系: {price_volume_confirmation}
+- Volume Profile: POC=${vp_poc:.2f}, 状态={vp_status}
 
 ## 5. 支撑压力位
-- 20日高点: ${indicators.get('resistance_20d_high', 0):.2f}
-- 20日低点: ${indicators.get('support_20d_low', 0):.2f}
-- 枢轴点: ${indicators.get('pivot', 0):.2f}
-- 斐波那契回撤: 23.6%=${indicators.get('fib_23.6', 0):.2f}, 38.2%=${indicators.get('fib_38.2', 0):.2f}, 61.8%=${indicators.get('fib_61.8', 0):.2f}
+- 20日高点: ${resistance_20d_high:.2f}
+- 20日低点: ${support_20d_low:.2f}
+- 枢轴点: ${pivot:.2f}
+- 斐波那契回撤: 23.6%=${fib_23_6:.2f}, 38.2%=${fib_38_2:.2f}, 61.8%=${fib_61_8:.2f}
 
 ## 6. 其他指标
-   - 连续上涨天数: {indicators.get('consecutive_up_days', 0)}
-   - 连续下跌天数: {indicators.get('consecutive_down_days', 0)}
-- ML预测: {indicators.get('ml_trend', 'unknown')} (置信度: {indicators.get('ml_confidence', 0):.1f}%, 预期: {indicators.get('ml_prediction', 0)*100:.2f}%)
+   - 连续上涨天数: {consecutive_up_days}
+   - 连续下跌天数: {consecutive_down_days}
+- ML预测: {ml_trend} (置信度: {ml_confidence:.1f}%, 预期: {ml_prediction_pct:.2f}%)
 
 # 基本面数据
-{fundamental_text if fundamental_text else '无可用数据'}
+{fundamental_text}
 
 # 市场数据
-{extra_text if extra_text else '无额外市场数据'}
+{extra_text}
 
 ---
 
@@ -1022,32 +598,32 @@ def perform_ai_analysis(symbol, indicators, signals, duration, model=DEFAULT_AI_
 
 基于系统提供的多维度评分结果，详细分析：
 
-1. **趋势方向维度** ({dimensions.get('trend', 0):.1f}/100)
+1. **趋势方向维度** ({dim_trend:.1f}/100)
    - 解释当前趋势状态（上涨/下跌/横盘）及其强度
    - 分析MA均线排列、ADX趋势强度、SuperTrend和Ichimoku云层的综合指示
    - 判断趋势的可靠性和持续性
 
-2. **动量指标维度** ({dimensions.get('momentum', 0):.1f}/100)
+2. **动量指标维度** ({dim_momentum:.1f}/100)
    - 分析RSI、MACD、KDJ等动量指标的综合信号
    - 评估当前市场动能状态（超买/超卖/中性）
    - 识别可能的反转或延续信号
 
-3. **成交量分析维度** ({dimensions.get('volume', 0):.1f}/100)
+3. **成交量分析维度** ({dim_volume:.1f}/100)
    - 深入分析价量关系（价涨量增/价跌量增/背离等）
    - 评估成交量的健康度和趋势确认作用
    - 分析OBV和Volume Profile显示的筹码分布情况
 
-4. **波动性维度** ({dimensions.get('volatility', 0):.1f}/100)
+4. **波动性维度** ({dim_volatility:.1f}/100)
    - 评估当前波动率水平对交易的影响
    - 分析布林带位置显示的短期价格区间
    - 给出风险控制和仓位建议
 
-5. **支撑压力维度** ({dimensions.get('support_resistance', 0):.1f}/100)
+5. **支撑压力维度** ({dim_support_resistance:.1f}/100)
    - 识别关键支撑位和压力位
    - 评估当前价格位置的优势/劣势
    - 预测可能的突破或反弹点位
 
-6. **高级指标维度** ({dimensions.get('advanced', 0):.1f}/100)
+6. **高级指标维度** ({dim_advanced:.1f}/100)
    - 综合ML预测、连续涨跌天数等高级信号
    - 评估市场情绪和极端状态
 
@@ -1134,7 +710,7 @@ def perform_ai_analysis(symbol, indicators, signals, duration, model=DEFAULT_AI_
    - **建议买入价位:** $[具体价格或价格区间，例如: $150.50 或 $149.00-$151.00]
      - 说明：为什么选择这个价位？基于什么技术指标？（如支撑位、均线、布林带等）
    - **建议止损价位:** $[具体价格，例如: $147.00]
-     - 说明：基于什么计算？（SAR=${indicators.get('sar', 0):.2f}、ATR=${indicators.get('atr', 0):.2f}、支撑位等）
+     - 说明：基于什么计算？（SAR=${sar:.2f}、ATR=${atr:.2f}、支撑位等）
      - 止损百分比: [X]% （相对于买入价）
    - **建议止盈价位:** $[具体价格，例如: $158.00]
      - 说明：基于什么计算？（压力位、阻力位、目标价等）
@@ -1179,79 +755,79 @@ def perform_ai_analysis(symbol, indicators, signals, duration, model=DEFAULT_AI_
 7. **价位必须明确**: 在"具体操作价位"部分，必须明确给出具体的买入价位、止损价位和止盈价位，包括具体价格数字、百分比和风险收益比，不能只给建议不给具体价格
 
 请开始分析。"""
-        else:
-            # 没有基本面数据，只进行技术分析
-            prompt = f"""# 分析对象
-**股票代码:** {symbol.upper()}  
-**当前价格:** ${indicators.get('current_price', 0):.2f}  
-**分析周期:** {duration} ({indicators.get('data_points', 0)}个数据点)  
+
+# 没有基本面数据，只进行技术分析的提示词模板
+_AI_PROMPT_TEMPLATE_TECHNICAL = """# 分析对象
+**股票代码:** {symbol}  
+**当前价格:** ${current_price:.2f}  
+**分析周期:** {duration} ({data_points}个数据点)  
 **⚠️ 注意:** 无基本面数据，仅基于技术分析
 
 # 系统评分结果
-**综合评分:** {signals.get('score', 0)}/100  
-**操作建议:** {signals.get('recommendation', '未知')}  
-**风险等级:** {signals.get('risk', {}).get('level', 'unknown') if signals.get('risk') else 'unknown'}  
-**风险评分:** {signals.get('risk', {}).get('score', 0) if signals.get('risk') else 0}/100
+**综合评分:** {score}/100  
+**操作建议:** {recommendation}  
+**风险等级:** {risk_level}  
+**风险评分:** {risk_score}/100
 
 **系统建议价位（参考值，需结合技术分析调整）:**
-- 当前价格: ${indicators.get('current_price', 0):.2f}
+- 当前价格: ${current_price:.2f}
 - 系统建议止损位: {stop_loss_str}
 - 系统建议止盈位: {take_profit_str}
 - SAR止损参考: {sar_str}
-- ATR波动参考: {atr_str} ({indicators.get('atr_percent', 0):.1f}%)
+- ATR波动参考: {atr_str} ({atr_percent:.1f}%)
 
 **多维度评分详情:**
-- 趋势方向维度: {dimensions.get('trend', 0):.1f}/100
-- 动量指标维度: {dimensions.get('momentum', 0):.1f}/100
-- 成交量分析维度: {dimensions.get('volume', 0):.1f}/100
-- 波动性维度: {dimensions.get('volatility', 0):.1f}/100
-- 支撑压力维度: {dimensions.get('support_resistance', 0):.1f}/100
-- 高级指标维度: {dimensions.get('advanced', 0):.1f}/100
+- 趋势方向维度: {dim_trend:.1f}/100
+- 动量指标维度: {dim_momentum:.1f}/100
+- 成交量分析维度: {dim_volume:.1f}/100
+- 波动性维度: {dim_volatility:.1f}/100
+- 支撑压力维度: {dim_support_resistance:.1f}/100
+- 高级指标维度: {dim_advanced:.1f}/100
 
 ---
 # 技术指标数据
 
 ## 1. 趋势指标
-- 移动平均线: MA5=${indicators.get('ma5', 0):.2f}, MA20=${indicators.get('ma20', 0):.2f}, MA50=${indicators.get('ma50', 0):.2f}
-   - 趋势方向: {indicators.get('trend_direction', 'neutral')}
-   - 趋势强度: {indicators.get('trend_strength', 0):.0f}%
-- ADX: {indicators.get('adx', 0):.1f} (+DI={indicators.get('plus_di', 0):.1f}, -DI={indicators.get('minus_di', 0):.1f})
-- SuperTrend: ${indicators.get('supertrend', 0):.2f} (方向: {indicators.get('supertrend_direction', 'neutral')})
-- Ichimoku云层: {indicators.get('ichimoku_status', 'unknown')}
-- SAR止损位: ${indicators.get('sar', 0):.2f}
+- 移动平均线: MA5=${ma5:.2f}, MA20=${ma20:.2f}, MA50=${ma50:.2f}
+   - 趋势方向: {trend_direction}
+   - 趋势强度: {trend_strength:.0f}%
+- ADX: {adx:.1f} (+DI={plus_di:.1f}, -DI={minus_di:.1f})
+- SuperTrend: ${supertrend:.2f} (方向: {supertrend_direction})
+- Ichimoku云层: {ichimoku_status}
+- SAR止损位: ${sar:.2f}
 
 ## 2. 动量指标
-- RSI(14): {indicators.get('rsi', 0):.1f}
-- MACD: {indicators.get('macd', 0):.3f} (信号: {indicators.get('macd_signal', 0):.3f}, 柱状图: {indicators.get('macd_histogram', 0):.3f})
-- KDJ: K={indicators.get('kdj_k', 0):.1f}, D={indicators.get('kdj_d', 0):.1f}, J={indicators.get('kdj_j', 0):.1f}
-- CCI: {indicators.get('cci', 0):.1f}
-- StochRSI: K={indicators.get('stoch_rsi_k', 0):.1f}, D={indicators.get('stoch_rsi_d', 0):.1f} (状态: {indicators.get('stoch_rsi_status', 'neutral')})
-- 威廉指标: {indicators.get('williams_r', 0):.1f}
+- RSI(14): {rsi:.1f}
+- MACD: {macd:.3f} (信号: {macd_signal:.3f}, 柱状图: {macd_histogram:.3f})
+- KDJ: K={kdj_k:.1f}, D={kdj_d:.1f}, J={kdj_j:.1f}
+- CCI: {cci:.1f}
+- StochRSI: K={stoch_rsi_k:.1f}, D={stoch_rsi_d:.1f} (状态: {stoch_rsi_status})
+- 威廉指标: {williams_r:.1f}
 
 ## 3. 波动性指标
-- 布林带: 上轨=${indicators.get('bb_upper', 0):.2f}, 中轨=${indicators.get('bb_middle', 0):.2f}, 下轨=${indicators.get('bb_lower', 0):.2f}
-- ATR: ${indicators.get('atr', 0):.2f} ({indicators.get('atr_percent', 0):.1f}%)
-- 20日波动率: {indicators.get('volatility_20', 0):.2f}%
+- 布林带: 上轨=${bb_upper:.2f}, 中轨=${bb_middle:.2f}, 下轨=${bb_lower:.2f}
+- ATR: ${atr:.2f} ({atr_percent:.1f}%)
+- 20日波动率: {volatility_20:.2f}%
 
 ## 4. 成交量分析
-- 成交量比率: {indicators.get('volume_ratio', 0):.2f}x (当前/20日均量)
-- OBV趋势: {indicators.get('obv_trend', 'neutral')}
-- 价量关系: {indicators.get('price_volume_confirmation', 'neutral')}
-- Volume Profile: POC=${indicators.get('vp_poc', 0):.2f}, 状态={indicators.get('vp_status', 'neutral')}
+- 成交量比率: {volume_ratio:.2f}x (当前/20日均量)
+- OBV趋势: {obv_trend}
+- 价量关系: {price_volume_confirmation}
+- Volume Profile: POC=${vp_poc:.2f}, 状态={vp_status}
 
 ## 5. 支撑压力位
-- 20日高点: ${indicators.get('resistance_20d_high', 0):.2f}
-- 20日低点: ${indicators.get('support_20d_low', 0):.2f}
-- 枢轴点: ${indicators.get('pivot', 0):.2f}
-- 斐波那契回撤: 23.6%=${indicators.get('fib_23.6', 0):.2f}, 38.2%=${indicators.get('fib_38.2', 0):.2f}, 61.8%=${indicators.get('fib_61.8', 0):.2f}
+- 20日高点: ${resistance_20d_high:.2f}
+- 20日低点: ${support_20d_low:.2f}
+- 枢轴点: ${pivot:.2f}
+- 斐波那契回撤: 23.6%=${fib_23_6:.2f}, 38.2%=${fib_38_2:.2f}, 61.8%=${fib_61_8:.2f}
 
 ## 6. 其他指标
-   - 连续上涨天数: {indicators.get('consecutive_up_days', 0)}
-   - 连续下跌天数: {indicators.get('consecutive_down_days', 0)}
-- ML预测: {indicators.get('ml_trend', 'unknown')} (置信度: {indicators.get('ml_confidence', 0):.1f}%, 预期: {indicators.get('ml_prediction', 0)*100:.2f}%)
+   - 连续上涨天数: {consecutive_up_days}
+   - 连续下跌天数: {consecutive_down_days}
+- ML预测: {ml_trend} (置信度: {ml_confidence:.1f}%, 预期: {ml_prediction_pct:.2f}%)
 
 # 市场数据
-{extra_text if extra_text else '无额外市场数据'}
+{extra_text}
 
 ---
 # 分析任务
@@ -1262,27 +838,27 @@ def perform_ai_analysis(symbol, indicators, signals, duration, model=DEFAULT_AI_
 
 基于系统提供的多维度评分结果，详细分析各维度的技术含义：
 
-1. **趋势方向维度** ({dimensions.get('trend', 0):.1f}/100)
+1. **趋势方向维度** ({dim_trend:.1f}/100)
    - 解释当前趋势状态及其强度
    - 分析MA均线排列、ADX、SuperTrend的综合指示
    - 判断趋势的可靠性和持续性
 
-2. **动量指标维度** ({dimensions.get('momentum', 0):.1f}/100)
+2. **动量指标维度** ({dim_momentum:.1f}/100)
    - 分析RSI、MACD、KDJ等动量指标的综合信号
    - 评估当前市场动能状态
    - 识别可能的反转或延续信号
 
-3. **成交量分析维度** ({dimensions.get('volume', 0):.1f}/100)
+3. **成交量分析维度** ({dim_volume:.1f}/100)
    - 深入分析价量关系
    - 评估成交量的健康度和趋势确认作用
    - 分析筹码分布情况
 
-4. **波动性维度** ({dimensions.get('volatility', 0):.1f}/100)
+4. **波动性维度** ({dim_volatility:.1f}/100)
    - 评估当前波动率水平对交易的影响
    - 分析布林带位置显示的短期价格区间
    - 给出风险控制建议
 
-5. **支撑压力维度** ({dimensions.get('support_resistance', 0):.1f}/100)
+5. **支撑压力维度** ({dim_support_resistance:.1f}/100)
    - 识别关键支撑位和压力位
    - 评估当前价格位置
    - 预测可能的突破或反弹点位
@@ -1321,7 +897,7 @@ def perform_ai_analysis(symbol, indicators, signals, duration, model=DEFAULT_AI_
    - **建议买入价位:** $[具体价格或价格区间，例如: $150.50 或 $149.00-$151.00]
      - 说明：为什么选择这个价位？基于什么技术指标？（如支撑位、均线、布林带等）
    - **建议止损价位:** $[具体价格，例如: $147.00]
-     - 说明：基于什么计算？（SAR=${indicators.get('sar', 0):.2f}、ATR=${indicators.get('atr', 0):.2f}、支撑位等）
+     - 说明：基于什么计算？（SAR=${sar:.2f}、ATR=${atr:.2f}、支撑位等）
      - 止损百分比: [X]% （相对于买入价）
    - **建议止盈价位:** $[具体价格，例如: $158.00]
      - 说明：基于什么计算？（压力位、阻力位、目标价等）
@@ -1366,21 +942,359 @@ def perform_ai_analysis(symbol, indicators, signals, duration, model=DEFAULT_AI_
 
 请开始分析。"""
 
-        # 调用Ollama（使用环境变量配置的服务地址）
-        ollama_host = os.getenv('OLLAMA_HOST', OLLAMA_HOST)
-        try:
-            client = ollama.Client(host=ollama_host)
-        except Exception:
-            client = None
-        response = (client.chat if client else ollama.chat)(
+
+def _compile_prompt(template):
+    """
+    导入时将提示词模板解析为 (字面文本, 字段名, 格式说明) 序列，请求时只做字段格式化与拼接
+    模板字段只使用简单字段名和格式说明（不含 !r 转换或属性/下标访问）
+    """
+    return tuple((literal, key, spec) for literal, key, spec, _ in string.Formatter().parse(template))
+
+
+def _render_prompt(compiled, fields):
+    """
+    按预解析的模板生成提示词，结果与 template.format_map(fields) 一致
+    """
+    return ''.join([literal if key is None else literal + format(fields[key], spec)
+                    for literal, key, spec in compiled])
+
+
+_AI_PROMPT_FULL = _compile_prompt(_AI_PROMPT_TEMPLATE_FULL)
+_AI_PROMPT_TECHNICAL = _compile_prompt(_AI_PROMPT_TEMPLATE_TECHNICAL)
+
+
+# 提示词中的财务报表段落：(基本面数据键, 标题, 最多记录数)
+_STATEMENT_SECTIONS = (
+    ('Financials', '年度财务报表', 5),
+    ('QuarterlyFinancials', '季度财务报表', 4),
+    ('BalanceSheet', '年度资产负债表', 3),
+    ('Cashflow', '年度现金流量表', 3),
+)
+
+# 财务报表记录中的日期列，不作为报表项输出
+_STATEMENT_SKIP_KEYS = frozenset({'index', 'Date'})
+
+
+def _safe_float(value):
+    """
+    转为 float，无法转换时返回 None
+    报表数值绝大多数已是 float/int，按类型直接返回，跳过 try/except
+    """
+    value_type = type(value)
+    if value_type is float:
+        return value
+    if value_type is int:
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+# 数值量级：(阈值, 后缀)，按绝对值从大到小匹配
+_MAGNITUDES = ((1e9, 'B'), (1e6, 'M'))
+
+
+def _format_magnitude(value, prefix='$', unit=''):
+    """
+    数值按量级格式化（按绝对值显示为 B/M），非数值原样返回
+    """
+    val = _safe_float(value)
+    if val is None:
+        return f"{value}"
+    for threshold, suffix in _MAGNITUDES:
+        if abs(val) >= threshold:
+            return f"{prefix}{val/threshold:.2f}{suffix}{unit}"
+    return f"{prefix}{val:.2f}{unit}"
+
+
+# 分析师共识评级阶梯：评分分界点（含上限）与评级，bisect_left 定位所在区间
+_CONSENSUS_CUTS = (1.5, 2.5, 3.5, 4.5)
+_CONSENSUS_LABELS = ('强烈买入', '买入', '持有', '卖出', '强烈卖出')
+
+
+def _format_consensus(value):
+    """
+    共识评级格式化：评级名称 (评分)
+    """
+    consensus = float(value)
+    rec = _CONSENSUS_LABELS[bisect.bisect_left(_CONSENSUS_CUTS, consensus)]
+    return f"{rec} ({consensus:.2f})"
+
+
+def _format_shares(value):
+    """
+    股数格式化：百万股以上按量级显示为 B/M，以下显示为千分位整数
+    """
+    shares = float(value)
+    if shares >= 1e6:
+        return _format_magnitude(shares, prefix='', unit='股')
+    return f"{int(shares):,}股"
+
+
+# 基本面字段格式化方式：格式化函数接收字段值，数值转换失败时由调用方原样输出
+_FUNDAMENTAL_FORMATTERS = {
+    'raw': lambda v: f"{v}",
+    'employees': lambda v: f"{v}人",
+    'shares': _format_shares,
+    'money': _format_magnitude,
+    'price': lambda v: f"${v}",
+    'range': lambda low, high: f"${low} - ${high}",
+    'dollar': lambda v: f"${float(v):.2f}",
+    'ratio': lambda v: f"{float(v):.2f}",
+    'pct': lambda v: f"{float(v):.2f}%",
+    'consensus': _format_consensus,
+}
+
+# 提示词中的基本面段落：(标题, 段落出现所需的键（None 表示无要求）, ((字段键, ...), 标签, 格式化方式))
+# 字段键全部存在时输出该行，多个键依次作为格式化函数的参数
+_FUNDAMENTAL_SECTIONS = (
+    ('基本信息', 'CompanyName', (
+        (('CompanyName',), '公司名称', 'raw'),
+        (('Exchange',), '交易所', 'raw'),
+        (('Employees',), '员工数', 'employees'),
+        (('SharesOutstanding',), '流通股数', 'shares'),
+    )),
+    ('市值与价格', None, (
+        (('MarketCap',), '市值', 'money'),
+        (('Price',), '当前价', 'price'),
+        (('52WeekLow', '52WeekHigh'), '52周区间', 'range'),
+    )),
+    ('财务指标', None, (
+        (('RevenueTTM',), '营收(TTM)', 'money'),
+        (('NetIncomeTTM',), '净利润(TTM)', 'money'),
+        (('EBITDATTM',), 'EBITDA(TTM)', 'money'),
+        (('ProfitMargin',), '利润率', 'pct'),
+        (('GrossMargin',), '毛利率', 'pct'),
+    )),
+    ('每股数据', None, (
+        (('EPS',), '每股收益(EPS)', 'dollar'),
+        (('BookValuePerShare',), '每股净资产', 'dollar'),
+        (('CashPerShare',), '每股现金', 'dollar'),
+        (('DividendPerShare',), '每股股息', 'dollar'),
+    )),
+    ('估值指标', None, (
+        (('PE',), '市盈率(PE)', 'ratio'),
+        (('PriceToBook',), '市净率(PB)', 'ratio'),
+        (('ROE',), '净资产收益率(ROE)', 'pct'),
+    )),
+    ('分析师预测', None, (
+        (('TargetPrice',), '目标价', 'dollar'),
+        (('ConsensusRecommendation',), '共识评级', 'consensus'),
+        (('ProjectedEPS',), '预测EPS', 'dollar'),
+        (('ProjectedGrowthRate',), '预测增长率', 'pct'),
+    )),
+)
+
+
+def _render_fundamental_section(data, title, fields):
+    """
+    按字段表生成一个基本面段落，没有任何字段时返回 None
+    """
+    lines = []
+    for keys, label, kind in fields:
+        if all(key in data for key in keys):
+            values = [data[key] for key in keys]
+            try:
+                text = _FUNDAMENTAL_FORMATTERS[kind](*values)
+            except (TypeError, ValueError):
+                text = " ".join(f"{v}" for v in values)
+            lines.append(f"   - {label}: {text}")
+    return f"{title}:\n" + "\n".join(lines) if lines else None
+
+
+def _iter_statement_lines(records):
+    """
+    逐行生成财务报表文本，由调用方一次性 join
+    """
+    for record in records:
+        if isinstance(record, dict):
+            date = record.get('index', record.get('Date', 'N/A'))
+            yield f"   {date}:\n"
+            for key, value in record.items():
+                if key not in _STATEMENT_SKIP_KEYS and value:
+                    yield f"     - {key}: {_format_magnitude(value)}\n"
+
+
+def perform_ai_analysis(symbol, indicators, signals, duration, model=DEFAULT_AI_MODEL, extra_data=None):
+    """
+    执行AI分析的辅助函数
+    """
+    try:
+        fundamental_data = indicators.get('fundamental_data', {})
+        has_fundamental = (fundamental_data and 
+                          isinstance(fundamental_data, dict) and 
+                          'raw_xml' not in fundamental_data and
+                          len(fundamental_data) > 0)
+        
+        if has_fundamental:
+            fundamental_sections = []
+            
+            for title, required_key, fields in _FUNDAMENTAL_SECTIONS:
+                if required_key is None or required_key in fundamental_data:
+                    section = _render_fundamental_section(fundamental_data, title, fields)
+                    if section:
+                        fundamental_sections.append(section)
+            
+            # 详细财务报表数据
+            for key, title, limit in _STATEMENT_SECTIONS:
+                records = fundamental_data.get(key)
+                if not records:
+                    continue
+                try:
+                    if isinstance(records, list) and len(records) > 0:
+                        fundamental_sections.append(f"{title}:\n" + "".join(_iter_statement_lines(records[:limit])))
+                except Exception as e:
+                    logger.warning(f"格式化{title}失败: {e}")
+            
+            fundamental_text = "\n\n".join(fundamental_sections) if fundamental_sections else "无可用数据"
+        else:
+            fundamental_text = None
+        
+        # 处理额外数据（股息、机构持仓、分析师推荐等）
+        # 各段落逐行收集到列表后一次性 join
+        extra_sections = []
+        if extra_data:
+            # 股息数据
+            if extra_data.get('dividends'):
+                dividends = extra_data['dividends']
+                lines = [f"股息历史 (最近{len(dividends)}次):\n"]
+                for div in dividends:
+                    lines.append(f"   - {div['date']}: ${div['dividend']:.4f}\n")
+                extra_sections.append("".join(lines))
+            
+            # 机构持仓
+            if extra_data.get('institutional_holders'):
+                inst = extra_data['institutional_holders']
+                lines = [f"机构持仓 (前{min(len(inst), 10)}大机构):\n"]
+                for i, holder in enumerate(inst[:10], 1):
+                    name = holder.get('Holder', '未知')
+                    shares = holder.get('Shares', 0)
+                    value = holder.get('Value', 0)
+                    pct = holder.get('% Out', 0)
+                    lines.append(f"   {i}. {name}\n")
+                    lines.append(f"      持股: {shares:,}, 市值: ${value:,.0f}, 占比: {pct}\n")
+                extra_sections.append("".join(lines))
+            
+            # 内部交易
+            if extra_data.get('insider_transactions'):
+                insider = extra_data['insider_transactions']
+                lines = [f"内部交易 (最近{min(len(insider), 10)}笔):\n"]
+                for i, trans in enumerate(insider[:10], 1):
+                    insider_name = trans.get('Insider', '未知')
+                    trans_type = trans.get('Transaction', '未知')
+                    shares = trans.get('Shares', 0)
+                    value = trans.get('Value', 0)
+                    lines.append(f"   {i}. {insider_name}: {trans_type}\n")
+                    if shares:
+                        lines.append(f"      股数: {shares:,}, 价值: ${value:,.0f}\n")
+                extra_sections.append("".join(lines))
+            
+            # 分析师推荐
+            if extra_data.get('analyst_recommendations'):
+                recs = extra_data['analyst_recommendations']
+                lines = [f"分析师推荐 (最近{min(len(recs), 8)}条):\n"]
+                for i, rec in enumerate(recs[:8], 1):
+                    firm = rec.get('Firm', '未知')
+                    to_grade = rec.get('To Grade', '未知')
+                    from_grade = rec.get('From Grade', '')
+                    action = rec.get('Action', '')
+                    if from_grade and action:
+                        lines.append(f"   {i}. {firm}: {from_grade} → {to_grade} ({action})\n")
+                    else:
+                        lines.append(f"   {i}. {firm}: {to_grade}\n")
+                extra_sections.append("".join(lines))
+            
+            # 收益数据
+            if extra_data.get('earnings'):
+                earnings_data = extra_data['earnings']
+                quarterly = earnings_data.get('quarterly', [])
+                if quarterly:
+                    lines = [f"季度收益 (最近{min(len(quarterly), 4)}个季度):\n"]
+                    for q in quarterly[:4]:
+                        quarter = q.get('quarter', '未知')
+                        revenue = q.get('Revenue', 0)
+                        earnings_val = q.get('Earnings', 0)
+                        rev = _safe_float(revenue)
+                        earn = _safe_float(earnings_val)
+                        if rev is not None and earn is not None:
+                            lines.append(f"   {quarter}: 营收 ${rev / 1e9:.2f}B, 盈利 ${earn / 1e9:.2f}B\n")
+                        else:
+                            lines.append(f"   {quarter}: 营收 {revenue}, 盈利 {earnings_val}\n")
+                    extra_sections.append("".join(lines))
+            
+            # 新闻标题
+            if extra_data.get('news'):
+                news = extra_data['news']
+                lines = [f"最新新闻 (最近{len(news)}条标题):\n"]
+                for i, item in enumerate(news, 1):
+                    title = item.get('title', '未知')
+                    publisher = item.get('publisher', '')
+                    lines.append(f"   {i}. {title} [{publisher}]\n" if publisher else f"   {i}. {title}\n")
+                extra_sections.append("".join(lines))
+        
+        extra_text = "\n\n".join(extra_sections) if extra_sections else None
+        
+        # 获取评分系统详细信息
+        score_details = signals.get('score_details', {})
+        dimensions = score_details.get('dimensions', {}) if score_details else {}
+        
+        # 格式化建议价位（处理可能为None的情况）
+        stop_loss_val = signals.get('stop_loss')
+        stop_loss_str = f"${stop_loss_val:.2f}" if stop_loss_val is not None else '未计算'
+        take_profit_val = signals.get('take_profit')
+        take_profit_str = f"${take_profit_val:.2f}" if take_profit_val is not None else '未计算'
+        sar_val = indicators.get('sar')
+        sar_str = f"${sar_val:.2f}" if sar_val is not None else '未计算'
+        atr_val = indicators.get('atr')
+        atr_str = f"${atr_val:.2f}" if atr_val is not None else '未计算'
+        
+        # 提示词字段：指标字典中缺失的数值字段按 0 填充
+        risk = signals.get('risk')
+        prompt_fields = _ZeroDefault(indicators)
+        for key, default in _PROMPT_TEXT_DEFAULTS.items():
+            prompt_fields.setdefault(key, default)
+        prompt_fields.update(
+            symbol=symbol.upper(),
+            duration=duration,
+            score=signals.get('score', 0),
+            recommendation=signals.get('recommendation', '未知'),
+            risk_level=risk.get('level', 'unknown') if risk else 'unknown',
+            risk_score=risk.get('score', 0) if risk else 0,
+            stop_loss_str=stop_loss_str,
+            take_profit_str=take_profit_str,
+            sar_str=sar_str,
+            atr_str=atr_str,
+            fib_23_6=indicators.get('fib_23.6', 0),
+            fib_38_2=indicators.get('fib_38.2', 0),
+            fib_61_8=indicators.get('fib_61.8', 0),
+            ml_prediction_pct=indicators.get('ml_prediction', 0) * 100,
+            fundamental_text=fundamental_text if fundamental_text else '无可用数据',
+            extra_text=extra_text if extra_text else '无额外市场数据',
+        )
+        for dim in ('trend', 'momentum', 'volume', 'volatility', 'support_resistance', 'advanced'):
+            prompt_fields[f'dim_{dim}'] = dimensions.get(dim, 0)
+        
+        # 根据是否有基本面数据构建不同的提示词
+        if has_fundamental:
+            # 有基本面数据的完整分析提示词
+            prompt = _render_prompt(_AI_PROMPT_FULL, prompt_fields)
+        else:
+            # 没有基本面数据，只进行技术分析
+            prompt = _render_prompt(_AI_PROMPT_TECHNICAL, prompt_fields)
+
+        # 调用Ollama（复用模块级客户端）
+        # 流式接收：客户端超时按相邻分片计算，长回答不会因总耗时超时；分片逐个拼接，无需整体缓冲响应
+        stream = _get_ollama_client().chat(
             model=model,
             messages=[{
                 'role': 'user',
                 'content': prompt
-            }]
+            }],
+            stream=True
         )
         
-        return response['message']['content']
+        return ''.join(chunk['message']['content'] for chunk in stream)
         
     except Exception as ai_error:
         logger.error(f"AI分析失败: {ai_error}")
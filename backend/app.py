@@ -7,13 +7,20 @@ Flask应用主文件 - RESTful API服务
 
 import os
 import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import orjson
+from cachetools import TTLCache
 from flask import Flask, jsonify, request
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 
 from .settings import (
     logger, init_database, get_cached_analysis, save_analysis_cache,
-    save_stock_info, get_hot_stocks
+    save_stock_info, get_hot_stocks, orjson_default
 )
 from .yfinance import (
     get_stock_info, get_historical_data, get_fundamental_data,
@@ -30,11 +37,50 @@ from .utils import (
     create_error_response, create_success_response
 )
 from .stock_analyzer import create_comprehensive_analysis
+from ._risk_nb import warm_up_kernels
+
+
+class ORJSONProvider(JSONProvider):
+    """
+    基于 orjson 的 JSON 序列化，numpy 数值直接序列化，响应体直接输出 bytes
+    """
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=orjson_default, option=self.option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=orjson_default, option=self.option)
+        return self._app.response_class(body, mimetype='application/json')
+
 
 # 创建Flask应用
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)
 
+# 分析结果进程内缓存（已序列化的 JSON 响应体）：同一K线窗口内的重复请求直接返回，不再重算指标、AI分析和序列化
+# 键中包含按K线周期划分的时间桶，跨桶即失效；TTLCache 兜底淘汰
+_ANALYZE_CACHE = TTLCache(maxsize=512, ttl=300)
+_ANALYZE_CACHE_LOCK = threading.Lock()
+
+# 各K线周期的时间桶长度（秒），未列出的周期使用 '1 day' 的值
+_ANALYZE_CACHE_BUCKETS = {
+    '1 min': 15,
+    '2 mins': 20,
+    '5 mins': 30,
+    '15 mins': 60,
+    '30 mins': 120,
+    '1 hour': 180,
+    '1 day': 300,
+    '1 week': 300,
+    '1 month': 300,
+}
+
 
 def _load_indicator_info():
     """从JSON文件加载技术指标解释和参考范围"""
@@ -47,6 +93,27 @@ def _load_indicator_info():
         return {}
 
 
+# 后台写入队列：股票信息获取与分析结果落库不阻塞请求线程，由单个工作线程串行执行
+_BACKGROUND_QUEUE = queue.Queue()
+
+
+def _background_worker():
+    """
+    依次执行后台队列中的 (函数, 参数) 任务
+    """
+    while True:
+        func, args = _BACKGROUND_QUEUE.get()
+        try:
+            func(*args)
+        except Exception as e:
+            logger.warning(f"后台任务执行失败: {func.__name__}, 错误: {e}")
+        finally:
+            _BACKGROUND_QUEUE.task_done()
+
+
+threading.Thread(target=_background_worker, name='background-writer', daemon=True).start()
+
+
 def _save_stock_info_if_available(symbol: str):
     """获取并保存股票信息"""
     try:
@@ -90,19 +157,22 @@ def _perform_analysis(symbol: str, duration: str, bar_size: str, model: str, use
                     cached_result['ai_analysis'] = ai_analysis
                     cached_result['model'] = model
                     cached_result['ai_available'] = True
-                    save_analysis_cache(symbol, duration, bar_size, cached_result)
+                    _BACKGROUND_QUEUE.put((save_analysis_cache, (symbol, duration, bar_size, cached_result)))
                 except Exception as e:
                     logger.warning(f"AI分析执行失败: {e}")
                     cached_result['ai_available'] = False
                     cached_result['ai_error'] = str(e)
             return cached_result, None
     
-    # 获取并保存股票信息
-    _save_stock_info_if_available(symbol)
+    # 后台获取并保存股票信息
+    _BACKGROUND_QUEUE.put((_save_stock_info_if_available, (symbol,)))
+    
+    # 获取历史数据和计算指标（同一份K线数据复用于指标计算和K线输出）
+    hist_data, hist_error = get_historical_data(symbol, duration, bar_size)
+    if hist_error:
+        return None, create_error_response(hist_error)
     
-    # 获取历史数据和计算指标
-    hist_data, _ = get_historical_data(symbol, duration, bar_size)
-    indicators, ind_error = calculate_technical_indicators(symbol, duration, bar_size)
+    indicators, ind_error = calculate_technical_indicators(symbol, duration, bar_size, hist_data=hist_data)
     
     if ind_error:
         return None, create_error_response(ind_error)
@@ -136,11 +206,26 @@ def _perform_analysis(symbol: str, duration: str, bar_size: str, model: str, use
     if extra_data:
         result['extra_data'] = extra_data
     
-    save_analysis_cache(symbol, duration, bar_size, result)
+    _BACKGROUND_QUEUE.put((save_analysis_cache, (symbol, duration, bar_size, result)))
     
     return result, None
 
 
+def _data_response(symbol: str, data):
+    """
+    列表类数据接口的成功响应
+    """
+    return jsonify({'success': True, 'symbol': symbol, 'data': data})
+
+
+def _analyze_cache_key(symbol: str, duration: str, bar_size: str, model: str) -> tuple:
+    """
+    生成分析结果缓存键：(symbol, duration, bar_size, model, 时间桶)
+    """
+    bucket_seconds = _ANALYZE_CACHE_BUCKETS.get(bar_size, _ANALYZE_CACHE_BUCKETS['1 day'])
+    return (symbol, duration, bar_size, model, int(time.time() // bucket_seconds))
+
+
 def _get_extra_analysis_data(symbol: str) -> dict:
     """
     获取用于AI分析的额外数据（股息、机构持仓、分析师推荐等）
@@ -148,37 +233,46 @@ def _get_extra_analysis_data(symbol: str) -> dict:
     extra_data = {}
     
     try:
+        # 各数据源都是独立的网络请求，并发获取（耗时取最大值而非总和）
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            dividends_future = executor.submit(get_dividends, symbol)
+            institutional_future = executor.submit(get_institutional_holders, symbol)
+            insider_future = executor.submit(get_insider_transactions, symbol)
+            recommendations_future = executor.submit(get_recommendations, symbol)
+            earnings_future = executor.submit(get_earnings, symbol)
+            news_future = executor.submit(get_news, symbol, limit=5)
+        
         # 获取股息数据
-        dividends = get_dividends(symbol)
+        dividends = dividends_future.result()
         if dividends:
             extra_data['dividends'] = dividends[-10:]  # 最近10次分红
             
         # 获取机构持仓
-        institutional = get_institutional_holders(symbol)
+        institutional = institutional_future.result()
         if institutional:
             extra_data['institutional_holders'] = institutional[:20]  # 前20大机构
             
         # 获取内部交易
-        insider = get_insider_transactions(symbol)
+        insider = insider_future.result()
         if insider:
             extra_data['insider_transactions'] = insider[:15]  # 最近15笔
             
         # 获取分析师推荐
-        recommendations = get_recommendations(symbol)
+        recommendations = recommendations_future.result()
         if recommendations:
             extra_data['analyst_recommendations'] = recommendations[:10]  # 最近10条
             
         # 获取收益数据
-        earnings = get_earnings(symbol)
+        earnings = earnings_future.result()
         if earnings:
             extra_data['earnings'] = earnings
             
         # 获取新闻（简化版）
-        news = get_news(symbol, limit=5)
+        news = news_future.result()
         if news:
             extra_data['news'] = news
             
-        logger.info(f"已获取额外分析数据: {symbol}, 包含{len(extra_data)}个数据模块")
+        logger.info("已获取额外分析数据: %s, 包含%s个数据模块", symbol, len(extra_data))
         
     except Exception as e:
         logger.warning(f"获取额外数据失败: {symbol}, 错误: {e}")
@@ -186,16 +280,38 @@ def _get_extra_analysis_data(symbol: str) -> dict:
     return extra_data
 
 
+@app.after_request
+def _add_conditional_etag(response):
+    """
+    为只读 GET 请求的 JSON 响应添加 ETag，客户端 If-None-Match 命中时返回 304（无响应体）
+    """
+    if (request.method == 'GET' and response.status_code == 200
+            and response.mimetype == 'application/json' and not response.is_streamed):
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
+
+# 健康检查响应缓存：(秒级时间戳, 已序列化的 JSON 响应体)，同一秒内的请求共用，整体替换保证二者一致
+_health_cache = (0, b'')
+
+
 @app.route('/api/health', methods=['GET'])
 def health():
     """
     健康检查接口
     """
-    return jsonify({
-        'status': 'ok',
-        'gateway': 'yfinance',
-        'timestamp': datetime.now().isoformat()
-    })
+    global _health_cache
+    now = int(time.time())
+    if now != _health_cache[0]:
+        body = jsonify({
+            'status': 'ok',
+            'gateway': 'yfinance',
+            'timestamp': datetime.fromtimestamp(now).isoformat()
+        }).get_data()
+        _health_cache = (now, body)
+    
+    return app.response_class(_health_cache[1], mimetype='application/json')
 
 
 @app.route('/api/analyze/<symbol>', methods=['GET'])
@@ -215,14 +331,24 @@ def analyze_stock(symbol):
     model = request.args.get('model', 'deepseek-v3.1:671b-cloud')
     
     symbol_upper = symbol.upper()
-    logger.info(f"技术分析: {symbol_upper}, {duration}, {bar_size}")
+    logger.info("技术分析: %s, %s, %s", symbol_upper, duration, bar_size)
+    
+    cache_key = _analyze_cache_key(symbol_upper, duration, bar_size, model)
+    with _ANALYZE_CACHE_LOCK:
+        body = _ANALYZE_CACHE.get(cache_key)
+    if body is not None:
+        return app.response_class(body, mimetype='application/json')
     
     result, error_response = _perform_analysis(symbol_upper, duration, bar_size, model, use_cache=True)
     
     if error_response:
         return jsonify(error_response[0]), error_response[1]
     
-    return jsonify(result)
+    response = jsonify(result)
+    with _ANALYZE_CACHE_LOCK:
+        _ANALYZE_CACHE[cache_key] = response.get_data()
+    
+    return response
 
 
 @app.route('/api/refresh-analyze/<symbol>', methods=['POST'])
@@ -241,14 +367,19 @@ def refresh_analyze_stock(symbol):
     model = request.args.get('model', 'deepseek-v3.1:671b-cloud')
     
     symbol_upper = symbol.upper()
-    logger.info(f"刷新技术分析（强制重新获取）: {symbol_upper}, {duration}, {bar_size}")
+    logger.info("刷新技术分析（强制重新获取）: %s, %s, %s", symbol_upper, duration, bar_size)
     
     result, error_response = _perform_analysis(symbol_upper, duration, bar_size, model, use_cache=False)
     
     if error_response:
         return jsonify(error_response[0]), error_response[1]
     
-    return jsonify(result)
+    # 用刷新后的结果覆盖进程内缓存
+    response = jsonify(result)
+    with _ANALYZE_CACHE_LOCK:
+        _ANALYZE_CACHE[_analyze_cache_key(symbol_upper, duration, bar_size, model)] = response.get_data()
+    
+    return response
 
 
 @app.route('/api/hot-stocks', methods=['GET'])
@@ -258,7 +389,7 @@ def hot_stocks_endpoint():
     查询参数:
     - limit: 返回数量限制 (默认: 20)
     """
-    limit = int(request.args.get('limit', 20))
+    limit = request.args.get('limit', 20, type=int)
     
     try:
         hot_stocks = get_hot_stocks(limit)
@@ -323,7 +454,7 @@ def get_fundamental(symbol):
     获取基本面数据
     """
     symbol_upper = symbol.upper()
-    logger.info(f"获取基本面数据: {symbol_upper}")
+    logger.info("获取基本面数据: %s", symbol_upper)
     
     try:
         fundamental = get_fundamental_data(symbol_upper)
@@ -354,16 +485,12 @@ def get_dividends_endpoint(symbol):
     获取股息历史
     """
     symbol_upper = symbol.upper()
-    logger.info(f"获取股息历史: {symbol_upper}")
+    logger.info("获取股息历史: %s", symbol_upper)
     
     try:
         dividends = get_dividends(symbol_upper)
         
-        return jsonify({
-            'success': True,
-            'symbol': symbol_upper,
-            'data': dividends if dividends else []
-        })
+        return _data_response(symbol_upper, dividends if dividends else [])
         
     except Exception as e:
         logger.error(f"获取股息历史失败: {e}")
@@ -379,16 +506,12 @@ def get_institutional_endpoint(symbol):
     获取机构持仓信息
     """
     symbol_upper = symbol.upper()
-    logger.info(f"获取机构持仓: {symbol_upper}")
+    logger.info("获取机构持仓: %s", symbol_upper)
     
     try:
         holders = get_institutional_holders(symbol_upper)
         
-        return jsonify({
-            'success': True,
-            'symbol': symbol_upper,
-            'data': holders if holders else []
-        })
+        return _data_response(symbol_upper, holders if holders else [])
         
     except Exception as e:
         logger.error(f"获取机构持仓失败: {e}")
@@ -404,16 +527,12 @@ def get_insider_endpoint(symbol):
     获取内部交易信息
     """
     symbol_upper = symbol.upper()
-    logger.info(f"获取内部交易: {symbol_upper}")
+    logger.info("获取内部交易: %s", symbol_upper)
     
     try:
         transactions = get_insider_transactions(symbol_upper)
         
-        return jsonify({
-            'success': True,
-            'symbol': symbol_upper,
-            'data': transactions if transactions else []
-        })
+        return _data_response(symbol_upper, transactions if transactions else [])
         
     except Exception as e:
         logger.error(f"获取内部交易失败: {e}")
@@ -429,16 +548,12 @@ def get_recommendations_endpoint(symbol):
     获取分析师推荐
     """
     symbol_upper = symbol.upper()
-    logger.info(f"获取分析师推荐: {symbol_upper}")
+    logger.info("获取分析师推荐: %s", symbol_upper)
     
     try:
         recommendations = get_recommendations(symbol_upper)
         
-        return jsonify({
-            'success': True,
-            'symbol': symbol_upper,
-            'data': recommendations if recommendations else []
-        })
+        return _data_response(symbol_upper, recommendations if recommendations else [])
         
     except Exception as e:
         logger.error(f"获取分析师推荐失败: {e}")
@@ -454,16 +569,12 @@ def get_earnings_endpoint(symbol):
     获取收益数据
     """
     symbol_upper = symbol.upper()
-    logger.info(f"获取收益数据: {symbol_upper}")
+    logger.info("获取收益数据: %s", symbol_upper)
     
     try:
         earnings = get_earnings(symbol_upper)
         
-        return jsonify({
-            'success': True,
-            'symbol': symbol_upper,
-            'data': earnings if earnings else {}
-        })
+        return _data_response(symbol_upper, earnings if earnings else {})
         
     except Exception as e:
         logger.error(f"获取收益数据失败: {e}")
@@ -481,17 +592,13 @@ def get_news_endpoint(symbol):
     - limit: 新闻数量限制 (默认: 10)
     """
     symbol_upper = symbol.upper()
-    limit = int(request.args.get('limit', 10))
-    logger.info(f"获取新闻: {symbol_upper}")
+    limit = request.args.get('limit', 10, type=int)
+    logger.info("获取新闻: %s", symbol_upper)
     
     try:
         news = get_news(symbol_upper, limit=limit)
         
-        return jsonify({
-            'success': True,
-            'symbol': symbol_upper,
-            'data': news if news else []
-        })
+        return _data_response(symbol_upper, news if news else [])
         
     except Exception as e:
         logger.error(f"获取新闻失败: {e}")
@@ -507,7 +614,7 @@ def get_options_endpoint(symbol):
     获取期权数据
     """
     symbol_upper = symbol.upper()
-    logger.info(f"获取期权数据: {symbol_upper}")
+    logger.info("获取期权数据: %s", symbol_upper)
     
     try:
         options = get_options(symbol_upper)
@@ -544,9 +651,9 @@ def comprehensive_analysis(symbol):
     symbol_upper = symbol.upper()
     include_options = request.args.get('include_options', 'false').lower() == 'true'
     include_news = request.args.get('include_news', 'true').lower() == 'true'
-    news_limit = int(request.args.get('news_limit', 10))
+    news_limit = request.args.get('news_limit', 10, type=int)
     
-    logger.info(f"全面分析: {symbol_upper}")
+    logger.info("全面分析: %s", symbol_upper)
     
     try:
         # 获取所有数据
@@ -598,9 +705,9 @@ def get_all_data_endpoint(symbol):
     symbol_upper = symbol.upper()
     include_options = request.args.get('include_options', 'false').lower() == 'true'
     include_news = request.args.get('include_news', 'true').lower() == 'true'
-    news_limit = int(request.args.get('news_limit', 10))
+    news_limit = request.args.get('news_limit', 10, type=int)
     
-    logger.info(f"获取所有数据: {symbol_upper}")
+    logger.info("获取所有数据: %s", symbol_upper)
     
     try:
         all_data = get_all_data(
@@ -676,16 +783,26 @@ def main():
     
     logger.info("✅ YFinance 数据服务就绪")
     
+    # 后台预热风险评估 JIT 内核，不阻塞服务启动
+    threading.Thread(target=warm_up_kernels, name='numba-warmup', daemon=True).start()
+    
     port = 8080
-    logger.info(f"🚀 API服务启动在 http://0.0.0.0:{port}")
-    
-    # 启动Flask服务
-    app.run(
-        host='0.0.0.0',
-        port=port,
-        debug=False,
-        threaded=True
-    )
+    logger.info("🚀 API服务启动在 http://0.0.0.0:%s", port)
+    
+    # 使用 waitress 多线程 WSGI 服务，AI 分析等待 Ollama 时不阻塞其他请求
+    try:
+        from waitress import serve
+    except ImportError:
+        logger.warning("waitress 未安装，使用 Flask 开发服务器")
+        app.run(
+            host='0.0.0.0',
+            port=port,
+            debug=False,
+            threaded=True
+        )
+        return
+    
+    serve(app, host='0.0.0.0', port=port, threads=32)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+使用 mypyc 将纯 Python 的信号生成与评分模块编译为 C 扩展
+编译产物（.so）输出到源文件同目录，导入时优先于 .py 加载；未编译时直接使用 .py
+
+用法: python -m backend.build_mypyc（需要安装 mypy 和 C 编译器）
+"""
+
+import os
+
+from mypyc.build import mypycify
+from setuptools import setup
+
+
+# 需要编译的模块（相对 backend 目录）：信号规则表、风险等级判断与多维度评分，均为字典查找和分支
+_MODULES = (
+    'signal_generators.py',
+    'scoring.py',
+)
+
+
+def build():
+    """
+    编译 _MODULES 中的模块并就地输出扩展模块
+    """
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    project_dir = os.path.dirname(backend_dir)
+    package = os.path.basename(backend_dir)
+
+    # mypyc 按相对路径推断模块全名（backend.xxx），需在项目根目录下执行
+    cwd = os.getcwd()
+    os.chdir(project_dir)
+    try:
+        setup(
+            name='backend-mypyc',
+            # 只对被编译的模块做类型检查，依赖模块（numba 等）不报错
+            ext_modules=mypycify(['--ignore-missing-imports', '--follow-imports=silent']
+                                 + [os.path.join(package, name) for name in _MODULES]),
+            script_args=['build_ext', '--inplace'],
+        )
+    finally:
+        os.chdir(cwd)
+    return backend_dir
+
+
+if __name__ == '__main__':
+    out = build()
+    print(f"已生成 mypyc 扩展模块: {out}")
@@ -10,7 +10,7 @@ from .macd import calculate_macd
 from .volume import calculate_volume
 from .price_change import calculate_price_change
 from .volatility import calculate_volatility
-from .support_resistance import calculate_support_resistance
+from .support_resistance import calculate_support_resistance, SUPPORT_KEYS, RESISTANCE_KEYS
 from .kdj import calculate_kdj
 from .atr import calculate_atr
 from .williams_r import calculate_williams_r
@@ -18,6 +18,7 @@ from .obv import calculate_obv
 from .trend_strength import analyze_trend_strength
 from .fibonacci import calculate_fibonacci_retracement
 from .trend_utils import get_trend
+from .window_utils import get_window_extrema
 from .cci import calculate_cci
 from .adx import calculate_adx
 from .sar import calculate_sar
@@ -35,6 +36,8 @@ __all__ = [
     'calculate_price_change',
     'calculate_volatility',
     'calculate_support_resistance',
+    'SUPPORT_KEYS',
+    'RESISTANCE_KEYS',
     'calculate_kdj',
     'calculate_atr',
     'calculate_williams_r',
@@ -42,6 +45,7 @@ __all__ = [
     'analyze_trend_strength',
     'calculate_fibonacci_retracement',
     'get_trend',
+    'get_window_extrema',
     'calculate_cci',
     'calculate_adx',
     'calculate_sar',
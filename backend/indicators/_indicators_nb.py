@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+技术指标数值内核（Numba JIT 加速）
+KDJ、ATR、OBV、ADX、Ichimoku、EMA、MACD、布林带等逐元素递推计算集中在此处编译
+未安装 numba 时退化为普通 Python 函数，计算结果一致
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """
+        numba 不可用时的空装饰器
+        """
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+            
+        def decorator(func):
+            return func
+        return decorator
+
+
+def _as_float_array(data):
+    """
+    转为浮点数组：float32/float64 原样返回（不复制），其余类型转为 float64
+    """
+    data = np.asarray(data)
+    if data.dtype != np.float32 and data.dtype != np.float64:
+        data = data.astype(np.float64)
+    return data
+
+
+@njit(cache=True, fastmath=True)
+def _kdj(closes, highs, lows, p1, p2, p3):
+    """
+    KDJ 递推，返回最新的 (K, D, J)
+    """
+    n = closes.shape[0]
+    alpha_k = 1.0 / p2
+    alpha_d = 1.0 / p3
+    k = 0.0
+    d = 0.0
+    for i in range(p1 - 1, n):
+        llv = lows[i - p1 + 1]
+        hhv = highs[i - p1 + 1]
+        for j in range(i - p1 + 2, i + 1):
+            if lows[j] < llv:
+                llv = lows[j]
+            if highs[j] > hhv:
+                hhv = highs[j]
+                
+        if hhv == llv:
+            rsv = 50.0
+        else:
+            rsv = ((closes[i] - llv) / (hhv - llv)) * 100
+            
+        if i == p1 - 1:
+            k = rsv
+            d = k
+        else:
+            k = (1 - alpha_k) * k + alpha_k * rsv
+            d = (1 - alpha_d) * d + alpha_d * k
+    return k, d, 3 * k - 2 * d
+
+
+@njit(cache=True, fastmath=True)
+def _true_range(closes, highs, lows):
+    """
+    真实波幅 TR 序列（长度 n-1）
+    """
+    n = closes.shape[0]
+    tr = np.empty(n - 1)
+    for i in range(1, n):
+        high_low = highs[i] - lows[i]
+        high_close = abs(highs[i] - closes[i - 1])
+        low_close = abs(lows[i] - closes[i - 1])
+        tr[i - 1] = max(high_low, high_close, low_close)
+    return tr
+
+
+@njit(cache=True, fastmath=True)
+def _wilder_series(data, period):
+    """
+    Wilder 平滑完整序列（首值为前 period 个的简单平均）
+    """
+    n = data.shape[0]
+    out = np.empty(n - period + 1)
+    smoothed = data[:period].mean()
+    out[0] = smoothed
+    for i in range(period, n):
+        smoothed = (smoothed * (period - 1) + data[i]) / period
+        out[i - period + 1] = smoothed
+    return out
+
+
+@njit(cache=True, fastmath=True)
+def _atr(closes, highs, lows, period):
+    """
+    ATR（Wilder 平滑）最终值
+    """
+    tr = _true_range(closes, highs, lows)
+    return _wilder_series(tr, period)[-1]
+
+
+@njit(cache=True, fastmath=True)
+def _obv(closes, volumes):
+    """
+    OBV 序列
+    """
+    n = closes.shape[0]
+    obv = np.empty(n)
+    obv[0] = 0.0
+    for i in range(1, n):
+        if closes[i] > closes[i - 1]:
+            obv[i] = obv[i - 1] + volumes[i]
+        elif closes[i] < closes[i - 1]:
+            obv[i] = obv[i - 1] - volumes[i]
+        else:
+            obv[i] = obv[i - 1]
+    return obv
+
+
+@njit(cache=True)
+def _adx(closes, highs, lows, period):
+    """
+    ADX 计算，返回 (+DI, -DI, ADX)
+    +DI/-DI 无法计算时返回 NaN，DX 序列不足时 ADX 为 NaN
+    """
+    n = closes.shape[0]
+    plus_dm = np.zeros(n - 1)
+    minus_dm = np.zeros(n - 1)
+    for i in range(1, n):
+        high_diff = highs[i] - highs[i - 1]
+        low_diff = lows[i - 1] - lows[i]
+        if high_diff > low_diff and high_diff > 0:
+            plus_dm[i - 1] = high_diff
+        if low_diff > high_diff and low_diff > 0:
+            minus_dm[i - 1] = low_diff
+    tr = _true_range(closes, highs, lows)
+    
+    pdm_series = _wilder_series(plus_dm, period)
+    mdm_series = _wilder_series(minus_dm, period)
+    tr_series = _wilder_series(tr, period)
+    
+    smoothed_tr = tr_series[-1]
+    if smoothed_tr == 0:
+        return np.nan, np.nan, np.nan
+    plus_di = (pdm_series[-1] / smoothed_tr) * 100
+    minus_di = (mdm_series[-1] / smoothed_tr) * 100
+    
+    # DX 序列（跳过无法计算的点）
+    dx = np.empty(tr_series.shape[0])
+    count = 0
+    for i in range(tr_series.shape[0]):
+        smooth_tr_val = tr_series[i]
+        if smooth_tr_val != 0:
+            pdi = (pdm_series[i] / smooth_tr_val) * 100
+            mdi = (mdm_series[i] / smooth_tr_val) * 100
+            di_sum = pdi + mdi
+            if di_sum != 0:
+                dx[count] = (abs(pdi - mdi) / di_sum) * 100
+                count += 1
+                
+    if count < period:
+        return plus_di, minus_di, np.nan
+    return plus_di, minus_di, _wilder_series(dx[:count], period)[-1]
+
+
+@njit(cache=True)
+def _rolling_mid(highs, lows, window):
+    """
+    (HHV(H, window) + LLV(L, window)) / 2 序列，不足窗口处为 NaN
+    """
+    n = highs.shape[0]
+    out = np.full(n, np.nan)
+    for i in range(window - 1, n):
+        hhv = highs[i - window + 1]
+        llv = lows[i - window + 1]
+        for j in range(i - window + 2, i + 1):
+            if highs[j] > hhv:
+                hhv = highs[j]
+            if lows[j] < llv:
+                llv = lows[j]
+        out[i] = (hhv + llv) / 2
+    return out
+
+
+@njit(cache=True)
+def _ichimoku(highs, lows, short, mid, long_period):
+    """
+    一目均衡表序列，返回 (CL, DL, A, B)
+    A、B 已向前平移 mid 期
+    """
+    n = highs.shape[0]
+    cl = _rolling_mid(highs, lows, short)
+    dl = _rolling_mid(highs, lows, mid)
+    long_mid = _rolling_mid(highs, lows, long_period)
+    
+    a = np.full(n, np.nan)
+    b = np.full(n, np.nan)
+    for i in range(mid, n):
+        a[i] = (cl[i - mid] + dl[i - mid]) / 2
+        b[i] = long_mid[i - mid]
+    return cl, dl, a, b
+
+
+@njit(cache=True, fastmath=True)
+def _ema_last(closes, periods):
+    """
+    多周期 EMA 一次遍历同时递推，返回各周期的最新 EMA（顺序与 periods 一致）
+    """
+    m = periods.shape[0]
+    alphas = np.empty(m)
+    ema = np.empty(m)
+    for j in range(m):
+        alphas[j] = 2.0 / (periods[j] + 1)
+        ema[j] = closes[0]
+    for i in range(1, closes.shape[0]):
+        price = closes[i]
+        for j in range(m):
+            ema[j] = alphas[j] * price + (1 - alphas[j]) * ema[j]
+    return ema
+
+
+@njit(cache=True, fastmath=True)
+def _macd(closes, fast_period, slow_period, signal_period):
+    """
+    MACD 单次遍历：快慢 EMA、DIF、DEA 同步递推，返回最新的 (DIF, DEA, 柱状值)
+    柱状值按中国标准 (DIF - DEA) * 2
+    """
+    alpha_fast = 2.0 / (fast_period + 1)
+    alpha_slow = 2.0 / (slow_period + 1)
+    alpha_signal = 2.0 / (signal_period + 1)
+    ema_fast = closes[0] * 1.0
+    ema_slow = closes[0] * 1.0
+    dif = ema_fast - ema_slow
+    dea = dif
+    for i in range(1, closes.shape[0]):
+        price = closes[i]
+        ema_fast = alpha_fast * price + (1 - alpha_fast) * ema_fast
+        ema_slow = alpha_slow * price + (1 - alpha_slow) * ema_slow
+        dif = ema_fast - ema_slow
+        dea = alpha_signal * dif + (1 - alpha_signal) * dea
+    return dif, dea, (dif - dea) * 2
+
+
+@njit(cache=True)
+def _bollinger(closes, period, num_std):
+    """
+    布林带序列（总体标准差），返回 (上轨, 中轨, 下轨)，长度 n-period+1
+    均值用滚动和递推，方差按窗口内离差平方和计算，避免大数相减的精度损失
+    """
+    n = closes.shape[0]
+    count = n - period + 1
+    upper = np.empty(count)
+    middle = np.empty(count)
+    lower = np.empty(count)
+    
+    window_sum = 0.0
+    for j in range(period - 1):
+        window_sum += closes[j]
+    for i in range(period - 1, n):
+        window_sum += closes[i]
+        mean = window_sum / period
+        sq_sum = 0.0
+        for j in range(i - period + 1, i + 1):
+            dev = closes[j] - mean
+            sq_sum += dev * dev
+        std = np.sqrt(sq_sum / period)
+        k = i - period + 1
+        upper[k] = mean + num_std * std
+        middle[k] = mean
+        lower[k] = mean - num_std * std
+        window_sum -= closes[k]
+    return upper, middle, lower
+
+
+# JIT 内核（build_aot.py 以此为源进行预编译）
+_JIT_KERNELS = {
+    'kdj': _kdj,
+    'atr': _atr,
+    'obv': _obv,
+    'adx': _adx,
+    'ichimoku': _ichimoku,
+    'ema_last': _ema_last,
+    'macd': _macd,
+    'bollinger': _bollinger,
+}
+
+# 优先使用 build_aot.py 预编译的扩展模块，避免进程启动时的 JIT 编译
+try:
+    from . import _indicators_aot
+except ImportError:
+    _indicators_aot = None
+
+
+def _with_aot(name):
+    """
+    存在预编译模块时按价格数组 dtype 分派到对应签名，否则使用 JIT 内核
+    """
+    jit_kernel = _JIT_KERNELS[name]
+    if _indicators_aot is None:
+        return jit_kernel
+    aot_kernels = {
+        np.dtype(np.float64): getattr(_indicators_aot, f'{name}_f8'),
+        np.dtype(np.float32): getattr(_indicators_aot, f'{name}_f4'),
+    }
+    
+    def dispatch(prices, *args):
+        return aot_kernels.get(prices.dtype, jit_kernel)(prices, *args)
+    return dispatch
+
+
+_kdj = _with_aot('kdj')
+_atr = _with_aot('atr')
+_obv = _with_aot('obv')
+_adx = _with_aot('adx')
+_ichimoku = _with_aot('ichimoku')
+_ema_last = _with_aot('ema_last')
+_macd = _with_aot('macd')
+_bollinger = _with_aot('bollinger')
+
+
+def _touch():
+    """
+    用小数组触发各内核编译（或加载磁盘缓存），避免首个请求承担编译耗时
+    价格 dtype 需与指标计算时传入的一致（_extract_ohlcv 输出 float64），否则首个请求仍会编译新的特化版本
+    """
+    closes = np.linspace(100.0, 110.0, 64)
+    highs = closes + 1.0
+    lows = closes - 1.0
+    volumes = np.ones(64)
+    _kdj(closes, highs, lows, 9, 3, 3)
+    _atr(closes, highs, lows, 14)
+    _obv(closes, volumes)
+    _adx(closes, highs, lows, 14)
+    _ichimoku(highs, lows, 9, 26, 52)
+    _ema_last(closes, np.array([5, 12, 20, 26, 50], dtype=np.int64))
+    _macd(closes, 12, 26, 9)
+    _bollinger(closes, 20, 2.0)
+
+
+if NUMBA_AVAILABLE and _indicators_aot is None:
+    _touch()
@@ -3,7 +3,7 @@
 ATR（平均真实波幅）指标计算
 """
 
-import numpy as np
+from ._indicators_nb import _atr, _as_float_array
 
 
 def calculate_atr(closes, highs, lows, period=14):
@@ -16,24 +16,11 @@ def calculate_atr(closes, highs, lows, period=14):
     if len(closes) < period + 1:
         return 0.0
     
-    # 计算真实波幅TR序列
-    tr_list = []
-    for i in range(1, len(closes)):
-        high_low = highs[i] - lows[i]
-        high_close = abs(highs[i] - closes[i-1])
-        low_close = abs(lows[i] - closes[i-1])
-        tr = max(high_low, high_close, low_close)
-        tr_list.append(tr)
-    
-    if len(tr_list) < period:
-        return 0.0
-    
-    # 第一个ATR使用简单平均
-    atr = np.mean(tr_list[:period])
-    
-    # 如果有更多数据，使用Wilder平滑
-    for i in range(period, len(tr_list)):
-        atr = (atr * (period - 1) + tr_list[i]) / period
+    # TR 序列与 Wilder 平滑由 JIT 内核完成
+    atr = _atr(_as_float_array(closes),
+               _as_float_array(highs),
+               _as_float_array(lows),
+               period)
     
     return float(atr)
 
@@ -3,7 +3,7 @@
 布林带 (Bollinger Bands) 指标计算
 """
 
-import numpy as np
+from ._indicators_nb import _bollinger, _as_float_array
 
 
 def calculate_bollinger(closes, period=20, num_std=2):
@@ -14,29 +14,17 @@ def calculate_bollinger(closes, period=20, num_std=2):
     result = {}
     
     if len(closes) >= period:
-        # 计算最新值（保持向后兼容）
-        ma = np.mean(closes[-period:])
-        std = np.std(closes[-period:])
-        result['bb_upper'] = float(ma + num_std * std)
-        result['bb_middle'] = float(ma)
-        result['bb_lower'] = float(ma - num_std * std)
+        # 历史序列（用于绘制趋势线），滚动窗口由 JIT 内核一次遍历完成
+        upper_band, middle_band, lower_band = _bollinger(_as_float_array(closes), period, float(num_std))
         
-        # 计算历史序列（用于绘制趋势线）
-        upper_band = []
-        middle_band = []
-        lower_band = []
+        # 最新值（保持向后兼容）
+        result['bb_upper'] = float(upper_band[-1])
+        result['bb_middle'] = float(middle_band[-1])
+        result['bb_lower'] = float(lower_band[-1])
         
-        for i in range(period - 1, len(closes)):
-            window = closes[i - period + 1:i + 1]
-            ma_val = np.mean(window)
-            std_val = np.std(window)
-            upper_band.append(float(ma_val + num_std * std_val))
-            middle_band.append(float(ma_val))
-            lower_band.append(float(ma_val - num_std * std_val))
-        
-        result['bb_upper_series'] = upper_band
-        result['bb_middle_series'] = middle_band
-        result['bb_lower_series'] = lower_band
+        result['bb_upper_series'] = upper_band.tolist()
+        result['bb_middle_series'] = middle_band.tolist()
+        result['bb_lower_series'] = lower_band.tolist()
     
     return result
 
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+预编译（AOT）技术指标内核
+将 _indicators_nb 中的 JIT 内核编译为扩展模块 _indicators_aot，
+部署后进程启动直接加载 .so，无需 JIT 编译
+
+用法: python -m backend.indicators.build_aot
+"""
+
+import os
+import sys
+
+from numba.pycc import CC
+
+from ._indicators_nb import _JIT_KERNELS
+
+
+# 每个内核导出 float64 / float32 两种价格输入签名（成交量始终为 float64）
+_EXPORTS = (
+    ('kdj', 'UniTuple(f8, 3)({p}[:], {p}[:], {p}[:], i8, i8, i8)'),
+    ('atr', 'f8({p}[:], {p}[:], {p}[:], i8)'),
+    ('obv', 'f8[:]({p}[:], f8[:])'),
+    ('adx', 'UniTuple(f8, 3)({p}[:], {p}[:], {p}[:], i8)'),
+    ('ichimoku', 'UniTuple(f8[:], 4)({p}[:], {p}[:], i8, i8, i8)'),
+    ('ema_last', 'f8[:]({p}[:], i8[:])'),
+    ('macd', 'UniTuple(f8, 3)({p}[:], i8, i8, i8)'),
+    ('bollinger', 'UniTuple(f8[:], 3)({p}[:], i8, f8)'),
+)
+
+
+def build(output_dir=None):
+    """
+    编译并输出 _indicators_aot 扩展模块（默认输出到本目录）
+    """
+    cc = CC('_indicators_aot')
+    cc.output_dir = output_dir or os.path.dirname(os.path.abspath(__file__))
+    cc.verbose = True
+    
+    for name, signature in _EXPORTS:
+        for dtype in ('f8', 'f4'):
+            cc.export(f'{name}_{dtype}', signature.format(p=dtype))(_JIT_KERNELS[name].py_func)
+            
+    cc.compile()
+    return cc.output_dir
+
+
+if __name__ == '__main__':
+    out = build(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"已生成 _indicators_aot 扩展模块: {out}")
@@ -6,9 +6,15 @@
 import numpy as np
 
 
-def calculate_fibonacci_retracement(highs, lows):
+# 斐波那契回撤比例 (23.6%, 38.2%, 50%, 61.8%, 78.6%) 及对应的结果键
+_FIB_RATIOS = np.array([0.236, 0.382, 0.5, 0.618, 0.786])
+_FIB_KEYS = ('fib_23.6', 'fib_38.2', 'fib_50.0', 'fib_61.8', 'fib_78.6')
+
+
+def calculate_fibonacci_retracement(highs, lows, extrema=None):
     """
     计算斐波那契回撤位
+    extrema: 可选，get_window_extrema 的结果（包含20期），用于复用窗口极值
     """
     result = {}
     
@@ -17,24 +23,18 @@ def calculate_fibonacci_retracement(highs, lows):
         return result
         
     # 找到最近的高点和低点
-    recent_high = float(np.max(highs[-20:]))
-    recent_low = float(np.min(lows[-20:]))
+    if extrema:
+        recent_high, recent_low = extrema[20]
+    else:
+        recent_high = float(np.max(highs[-20:]))
+        recent_low = float(np.min(lows[-20:]))
     
     # 计算价格范围
     price_range = recent_high - recent_low
     
-    # 斐波那契回撤水平 (23.6%, 38.2%, 50%, 61.8%, 78.6%)
-    fib_levels = {
-        'fib_23.6': recent_high - (price_range * 0.236),
-        'fib_38.2': recent_high - (price_range * 0.382),
-        'fib_50.0': recent_high - (price_range * 0.5),
-        'fib_61.8': recent_high - (price_range * 0.618),
-        'fib_78.6': recent_high - (price_range * 0.786)
-    }
-    
-    # 转换为浮点数
-    for key, value in fib_levels.items():
-        result[key] = float(value)
+    # 斐波那契回撤水平（一次向量运算得到全部水平）
+    fib_levels = recent_high - price_range * _FIB_RATIOS
+    result.update(zip(_FIB_KEYS, map(float, fib_levels)))
         
     # 添加最近高低点信息
     result['fib_recent_high'] = recent_high
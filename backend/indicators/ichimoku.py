@@ -10,8 +10,9 @@ B = REF((LLV(L,LONG) + HHV(H,LONG))/2, MID)
 """
 
 import numpy as np
+from ._indicators_nb import _ichimoku, _as_float_array
 
-def calculate_ichimoku(closes, highs, lows, short=9, mid=26, long_period=52):
+def calculate_ichimoku(closes, highs, lows, short=9, mid=26, long_period=52, extrema=None):
     """
     计算Ichimoku Cloud指标（按照富途公式）
     
@@ -22,6 +23,7 @@ def calculate_ichimoku(closes, highs, lows, short=9, mid=26, long_period=52):
     short: 短期周期，默认9
     mid: 中期周期，默认26
     long_period: 长期周期，默认52
+    extrema: 可选，get_window_extrema 的结果（包含long_period期），用于复用窗口极值
     
     返回:
     dict: 包含Tenkan-sen, Kijun-sen, Senkou Span A, Senkou Span B, Chikou Span等
@@ -36,59 +38,20 @@ def calculate_ichimoku(closes, highs, lows, short=9, mid=26, long_period=52):
     n = len(closes)
     
     # 1. CL (转换线/Tenkan-sen): (HHV(H,SHORT) + LLV(L,SHORT)) / 2
-    cl_values = []
-    for i in range(n):
-        if i < short - 1:
-            cl_values.append(np.nan)
-        else:
-            period_highs = highs[i - short + 1:i + 1]
-            period_lows = lows[i - short + 1:i + 1]
-            hhv = np.max(period_highs)
-            llv = np.min(period_lows)
-            cl = (hhv + llv) / 2
-            cl_values.append(cl)
-    
     # 2. DL (基准线/Kijun-sen): (HHV(H,MID) + LLV(L,MID)) / 2
-    dl_values = []
-    for i in range(n):
-        if i < mid - 1:
-            dl_values.append(np.nan)
-        else:
-            period_highs = highs[i - mid + 1:i + 1]
-            period_lows = lows[i - mid + 1:i + 1]
-            hhv = np.max(period_highs)
-            llv = np.min(period_lows)
-            dl = (hhv + llv) / 2
-            dl_values.append(dl)
+    # 4. A (先行带A/Senkou Span A): REF((CL+DL)/2, MID)
+    # 5. B (先行带B/Senkou Span B): REF((LLV(L,LONG) + HHV(H,LONG))/2, MID)
+    # 滚动高低点与平移由 JIT 内核完成
+    cl_values, dl_values, a_values, b_values = _ichimoku(
+        _as_float_array(highs),
+        _as_float_array(lows),
+        short, mid, long_period
+    )
     
     # 3. LL (延迟线/Chikou Span): REFX(C,MID) - 未来MID期的收盘价
     # REFX(C, MID)[i] = closes[i + MID]，在图表上向后移动MID期绘制
-    ll_values = [np.nan] * n
-    for i in range(n - mid):
-        ll_values[i] = closes[i + mid]  # 未来MID期的收盘价
-    
-    # 4. A (先行带A/Senkou Span A): REF((CL+DL)/2, MID)
-    # REF((CL+DL)/2, MID)[i] = (CL[i-MID] + DL[i-MID]) / 2，在图表上向前移动MID期绘制
-    a_values = [np.nan] * n
-    for i in range(mid, n):
-        cl_idx = i - mid
-        dl_idx = i - mid
-        if cl_idx >= 0 and dl_idx >= 0:
-            if not (np.isnan(cl_values[cl_idx]) or np.isnan(dl_values[dl_idx])):
-                a_values[i] = (cl_values[cl_idx] + dl_values[dl_idx]) / 2
-    
-    # 5. B (先行带B/Senkou Span B): REF((LLV(L,LONG) + HHV(H,LONG))/2, MID)
-    # REF((LLV+HHV)/2, MID)[i] = (LLV[i-MID] + HHV[i-MID]) / 2，在图表上向前移动MID期绘制
-    b_values = [np.nan] * n
-    for i in range(mid + long_period - 1, n):
-        # 计算 i - MID 位置的长期最高最低价
-        calc_idx = i - mid
-        if calc_idx >= long_period - 1:
-            period_highs = highs[calc_idx - long_period + 1:calc_idx + 1]
-            period_lows = lows[calc_idx - long_period + 1:calc_idx + 1]
-            hhv = np.max(period_highs)
-            llv = np.min(period_lows)
-            b_values[i] = (hhv + llv) / 2
+    ll_values = np.full(n, np.nan)
+    ll_values[:n - mid] = closes[mid:]
     
     # 返回最新值（用于API）
     # 转换线和基准线：当前时刻的值
@@ -104,8 +67,11 @@ def calculate_ichimoku(closes, highs, lows, short=9, mid=26, long_period=52):
     
     # Senkou Span B：当前时刻的52日最高最低中点，在图表上向未来偏移26期显示
     if n >= long_period:
-        period52_high = np.max(highs[-long_period:])
-        period52_low = np.min(lows[-long_period:])
+        if extrema and long_period in extrema:
+            period52_high, period52_low = extrema[long_period]
+        else:
+            period52_high = np.max(highs[-long_period:])
+            period52_low = np.min(lows[-long_period:])
         result['ichimoku_senkou_span_b'] = float((period52_high + period52_low) / 2)
     
     # Chikou Span：当前收盘价，在图表上向过去偏移26期显示
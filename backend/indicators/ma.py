@@ -5,6 +5,11 @@
 """
 
 import numpy as np
+from ._indicators_nb import _ema_last, _as_float_array
+
+
+# 输出的 EMA 周期
+_EMA_PERIODS = (5, 12, 20, 26, 50)
 
 
 def calculate_sma_series(data, period):
@@ -53,25 +58,12 @@ def calculate_ma(closes):
         result['ma200'] = float(np.mean(closes[-200:]))
         
     # 2. EMA (指数移动平均) - 对近期价格更敏感
-    if len(closes) >= 5:
-        ema5 = calculate_ema_series(closes, 5)
-        result['ema5'] = float(ema5[-1])
-        
-    if len(closes) >= 12:
-        ema12 = calculate_ema_series(closes, 12)
-        result['ema12'] = float(ema12[-1])
-        
-    if len(closes) >= 20:
-        ema20 = calculate_ema_series(closes, 20)
-        result['ema20'] = float(ema20[-1])
-        
-    if len(closes) >= 26:
-        ema26 = calculate_ema_series(closes, 26)
-        result['ema26'] = float(ema26[-1])
-        
-    if len(closes) >= 50:
-        ema50 = calculate_ema_series(closes, 50)
-        result['ema50'] = float(ema50[-1])
+    # 各周期 EMA 由 JIT 内核在一次遍历中同时递推
+    ema_periods = [p for p in _EMA_PERIODS if len(closes) >= p]
+    if ema_periods:
+        ema_values = _ema_last(_as_float_array(closes), np.array(ema_periods, dtype=np.int64))
+        for period, value in zip(ema_periods, ema_values):
+            result[f'ema{period}'] = float(value)
     
     # 3. 均线系统状态判断
     if 'ma5' in result and 'ma10' in result and 'ma20' in result:
@@ -4,13 +4,12 @@
 """
 
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
 
 
-def calculate_ml_predictions(closes, highs, lows, volumes):
+def calculate_ml_predictions(closes, highs, lows, volumes, deltas=None):
     """
     使用机器学习模型进行趋势预测，增强成交量特征
+    deltas: 可选，预先计算好的 np.diff(closes)
     """
     result = {}
     
@@ -25,7 +24,9 @@ def calculate_ml_predictions(closes, highs, lows, volumes):
         
     # 准备特征数据
     # 特征1: 过去5天的价格变化率
-    price_changes = np.diff(closes) / (closes[:-1] + 1e-8)
+    if deltas is None:
+        deltas = np.diff(closes)
+    price_changes = deltas / (closes[:-1] + 1e-8)
     recent_changes = price_changes[-5:] if len(price_changes) >= 5 else price_changes
     
     # 特征2: 过去5天的成交量变化率
@@ -144,18 +145,21 @@ def calculate_ml_predictions(closes, highs, lows, volumes):
             X = np.array(X)
             y = np.array(y)
             
-            # 标准化特征
-            scaler = StandardScaler()
-            X_scaled = scaler.fit_transform(X)
+            # 标准化特征（与StandardScaler一致：总体标准差，零方差列不缩放）
+            x_mean = X.mean(axis=0)
+            x_scale = X.std(axis=0)
+            x_scale[x_scale == 0] = 1.0
+            X_scaled = (X - x_mean) / x_scale
             
-            # 训练线性回归模型
-            model = LinearRegression()
-            model.fit(X_scaled, y)
+            # 线性回归：正规方程闭式解，加极小的岭项保证矩阵可逆
+            XtX = X_scaled.T @ X_scaled
+            Xty = X_scaled.T @ y
+            w = np.linalg.solve(XtX + 1e-6 * np.eye(XtX.shape[1]), Xty)
+            b = y.mean() - X_scaled.mean(axis=0) @ w
             
             # 预测
-            current_features = np.array(features).reshape(1, -1)
-            current_features_scaled = scaler.transform(current_features)
-            prediction = model.predict(current_features_scaled)[0]
+            current_features_scaled = (np.asarray(features) - x_mean) / x_scale
+            prediction = float(current_features_scaled @ w + b)
             
             result['ml_prediction'] = float(prediction)
             result['ml_confidence'] = float(min(np.abs(prediction) * 100, 100))  # 置信度限制在100以内
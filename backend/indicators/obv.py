@@ -3,21 +3,12 @@
 OBV（能量潮指标）计算
 """
 
-import numpy as np
+from ._indicators_nb import _obv, _as_float_array
 
 
 def calculate_obv(closes, volumes):
     """
     计算OBV（能量潮指标）
     """
-    obv = [0]
-    for i in range(1, len(closes)):
-        if closes[i] > closes[i-1]:
-            obv.append(obv[-1] + volumes[i])
-        elif closes[i] < closes[i-1]:
-            obv.append(obv[-1] - volumes[i])
-        else:
-            obv.append(obv[-1])
-    
-    return np.array(obv)
-
+    return _obv(_as_float_array(closes),
+                _as_float_array(volumes))
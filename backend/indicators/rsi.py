@@ -6,15 +6,17 @@ RSI (相对强弱指标) 计算
 import numpy as np
 
 
-def calculate_rsi(closes, period=14):
+def calculate_rsi(closes, period=14, deltas=None):
     """
     计算RSI指标
     使用Wilder平滑法（指数移动平均）
+    deltas: 可选，预先计算好的 np.diff(closes)
     """
     result = {}
     
     if len(closes) >= period + 1:
-        deltas = np.diff(closes)
+        if deltas is None:
+            deltas = np.diff(closes)
         gains = np.where(deltas > 0, deltas, 0)
         losses = np.where(deltas < 0, -deltas, 0)
         
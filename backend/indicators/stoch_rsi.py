@@ -3,10 +3,67 @@
 Stochastic RSI (随机相对强弱指标) 计算
 """
 
+import threading
 import numpy as np
-from .rsi import calculate_rsi
+from cachetools import LRUCache
 
-def calculate_stoch_rsi(closes, period=14, smooth_k=3, smooth_d=3):
+# RSI Wilder 递推状态缓存：键为 (周期, 尾部长度, dtype, 收盘价前缀长度, 前缀内容哈希)，
+# 值为前缀末尾 count 个 (平均涨幅, 平均跌幅)
+# 同一股票反复分析时（新K线追加或最后一根K线更新），从已缓存的前缀状态续推即可
+_WILDER_STATE = LRUCache(maxsize=1024)
+_WILDER_STATE_LOCK = threading.Lock()
+
+
+def _rsi_tail(closes, gains, losses, period, count):
+    """
+    计算最后 count 个 RSI 值（Wilder 平滑）
+    优先从全部K线或除最后一根外的前缀状态续推，递推完成后缓存这两个前缀的状态
+    """
+    n = len(closes)
+    keys = {
+        length: (period, count, closes.dtype.str, length, hash(closes[:length].tobytes()))
+        for length in (n, n - 1)
+    }
+    with _WILDER_STATE_LOCK:
+        resume = next(((length, _WILDER_STATE[key]) for length, key in keys.items()
+                       if key in _WILDER_STATE), None)
+    
+    avg_gain = np.zeros_like(closes)
+    avg_loss = np.zeros_like(closes)
+    
+    if resume is None:
+        # 初始平均
+        avg_gain[period] = np.mean(gains[:period])
+        avg_loss[period] = np.mean(losses[:period])
+        start = period + 1
+    else:
+        length, (avg_gain[length - count:length], avg_loss[length - count:length]) = resume
+        start = length
+        
+    # Wilder平滑（只递推前缀之后的K线）
+    for i in range(start, n):
+        avg_gain[i] = (avg_gain[i-1] * (period - 1) + gains[i-1]) / period
+        avg_loss[i] = (avg_loss[i-1] * (period - 1) + losses[i-1]) / period
+        
+    with _WILDER_STATE_LOCK:
+        for length, key in keys.items():
+            _WILDER_STATE[key] = (avg_gain[length - count:length].copy(),
+                                  avg_loss[length - count:length].copy())
+            
+    # 计算RSI序列
+    # 避免除以零
+    tail_gain = avg_gain[n - count:]
+    tail_loss = avg_loss[n - count:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = tail_gain / tail_loss
+        rsi = 100 - (100 / (1 + rs))
+    
+    # 处理除以零的情况 (loss为0时rsi为100)
+    rsi[tail_loss == 0] = 100
+    return rsi
+
+
+def calculate_stoch_rsi(closes, period=14, smooth_k=3, smooth_d=3, deltas=None):
     """
     计算StochRSI指标
     
@@ -14,6 +71,7 @@ def calculate_stoch_rsi(closes, period=14, smooth_k=3, smooth_d=3):
     - period: RSI周期和Stoch周期 (通常为14)
     - smooth_k: %K平滑周期 (通常为3)
     - smooth_d: %D平滑周期 (通常为3)
+    - deltas: 可选，预先计算好的 np.diff(closes)
     
     返回:
     - stoch_rsi_k: StochRSI的主线
@@ -21,84 +79,48 @@ def calculate_stoch_rsi(closes, period=14, smooth_k=3, smooth_d=3):
     """
     result = {}
     
-    # 需要足够的数据: RSI周期 + Stoch周期
-    if len(closes) < period + period:
+    # 需要足够的数据: RSI周期 + Stoch周期 + 最新 %D 所需的 smooth_k + smooth_d - 1 个 StochRSI 值
+    stoch_count = smooth_k + smooth_d - 1
+    if len(closes) < period + period + stoch_count - 1:
         return result
         
     # 1. 计算RSI序列
-    # 注意：为了计算准确，我们需要RSI的历史序列
-    # 这里我们重新实现一个简单的RSI序列计算，或者修改rsi.py
-    # 为了独立性，这里实现RSI序列计算
-    
-    deltas = np.diff(closes)
+    # 只计算最后 stoch_count 个 StochRSI 窗口所需的 RSI 值
+    closes = np.asarray(closes)
+    if deltas is None:
+        deltas = np.diff(closes)
     gains = np.where(deltas > 0, deltas, 0)
     losses = np.where(deltas < 0, -deltas, 0)
-    
-    avg_gain = np.zeros_like(closes)
-    avg_loss = np.zeros_like(closes)
-    rs = np.zeros_like(closes)
-    rsi = np.zeros_like(closes)
-    
-    # 初始平均
-    avg_gain[period] = np.mean(gains[:period])
-    avg_loss[period] = np.mean(losses[:period])
-    
-    # Wilder平滑
-    for i in range(period + 1, len(closes)):
-        avg_gain[i] = (avg_gain[i-1] * (period - 1) + gains[i-1]) / period
-        avg_loss[i] = (avg_loss[i-1] * (period - 1) + losses[i-1]) / period
-        
-    # 计算RSI序列
-    # 避免除以零
-    with np.errstate(divide='ignore', invalid='ignore'):
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-    
-    # 处理除以零的情况 (loss为0时rsi为100)
-    rsi[avg_loss == 0] = 100
-    # 前period个数据无效
-    rsi[:period] = np.nan
+    rsi = _rsi_tail(closes, gains, losses, period, stoch_count + period - 1)
     
     # 2. 计算StochRSI
     # StochRSI = (Current RSI - Lowest Low RSI) / (Highest High RSI - Lowest Low RSI)
     
-    stoch_rsi = np.zeros_like(rsi)
+    stoch_rsi = np.zeros(stoch_count, dtype=rsi.dtype)
     
-    for i in range(len(rsi)):
-        if i < period + period - 1:
-            stoch_rsi[i] = np.nan
-            continue
-            
-        current_rsi = rsi[i]
+    for j in range(stoch_count):
         # 获取过去period天的RSI窗口
-        rsi_window = rsi[i-period+1:i+1]
+        rsi_window = rsi[j:j + period]
+        current_rsi = rsi_window[-1]
         
         min_rsi = np.min(rsi_window)
         max_rsi = np.max(rsi_window)
         
         if max_rsi - min_rsi != 0:
-            stoch_rsi[i] = (current_rsi - min_rsi) / (max_rsi - min_rsi)
+            stoch_rsi[j] = (current_rsi - min_rsi) / (max_rsi - min_rsi)
         else:
-            stoch_rsi[i] = 0.5 # 如果最大最小相等，取中间值
+            stoch_rsi[j] = 0.5 # 如果最大最小相等，取中间值
             
     # 3. 平滑处理得到 %K 和 %D
     # 这里简单使用SMA平滑
     
     # 计算 %K (StochRSI的SMA)
-    k_values = np.zeros_like(stoch_rsi)
-    for i in range(len(stoch_rsi)):
-        if i < period + period + smooth_k - 2:
-            k_values[i] = np.nan
-            continue
-        k_values[i] = np.mean(stoch_rsi[i-smooth_k+1:i+1])
+    k_values = np.zeros(smooth_d, dtype=stoch_rsi.dtype)
+    for j in range(smooth_d):
+        k_values[j] = np.mean(stoch_rsi[j:j + smooth_k])
         
     # 计算 %D (%K的SMA)
-    d_values = np.zeros_like(k_values)
-    for i in range(len(k_values)):
-        if i < period + period + smooth_k + smooth_d - 3:
-            d_values[i] = np.nan
-            continue
-        d_values[i] = np.mean(k_values[i-smooth_d+1:i+1])
+    d_values = np.array([np.mean(k_values)], dtype=k_values.dtype)
         
     # 返回最新值 (转换为0-100区间)
     if not np.isnan(k_values[-1]) and not np.isnan(d_values[-1]):
@@ -21,17 +21,11 @@ def calculate_supertrend(closes, highs, lows, period=10, multiplier=3.0):
         return result
         
     # 1. 计算ATR序列
-    # 注意：我们需要修改atr.py以支持返回序列，或者在这里重新实现ATR计算
-    # 为了独立性，这里简单实现ATR序列计算
-    
-    tr_list = [0.0]
-    for i in range(1, len(closes)):
-        hl = highs[i] - lows[i]
-        hc = abs(highs[i] - closes[i-1])
-        lc = abs(lows[i] - closes[i-1])
-        tr_list.append(max(hl, hc, lc))
-    
-    tr = np.array(tr_list)
+    # TR 直接在价格数组视图上向量化计算（首个TR为0），不再逐根构建 Python 列表
+    prev_closes = closes[:-1]
+    tr = np.zeros(len(closes))
+    tr[1:] = np.maximum(highs[1:] - lows[1:],
+                        np.maximum(np.abs(highs[1:] - prev_closes), np.abs(lows[1:] - prev_closes)))
     atr = np.zeros_like(tr)
     
     # 初始ATR (简单平均)
@@ -3,13 +3,46 @@
 支撑位和压力位计算
 """
 
+import threading
 import numpy as np
 
 
-def calculate_support_resistance(closes, highs, lows):
+# calculate_support_resistance 可能输出的支撑位/压力位键名（供信号生成直接按键查找）
+SUPPORT_KEYS = (
+    'support_20d_low', 'support_50d_low',
+    'key_support_1', 'key_support_2',
+    'psychological_support',
+)
+RESISTANCE_KEYS = (
+    'resistance_20d_high', 'resistance_50d_high',
+    'key_resistance_1', 'key_resistance_2',
+    'psychological_resistance',
+)
+
+# 关键价格聚类使用的暂存缓冲区（每线程一份，Flask 以多线程方式运行）
+_CLUSTER_WINDOW = 30
+_scratch = threading.local()
+
+
+def _get_cluster_buffer(dtype):
+    """
+    获取当前线程复用的 (3, 30) 暂存缓冲区
+    按价格数组的 dtype 分别缓存，写入时不做 float32 -> float64 转换
+    """
+    buffers = getattr(_scratch, 'buffers', None)
+    if buffers is None:
+        buffers = _scratch.buffers = {}
+    buf = buffers.get(dtype)
+    if buf is None:
+        buf = buffers[dtype] = np.empty((3, _CLUSTER_WINDOW), dtype=dtype)
+    return buf
+
+
+def calculate_support_resistance(closes, highs, lows, extrema=None):
     """
     计算支撑位和压力位
     使用多种方法：pivot点、历史高低点、聚类分析
+    extrema: 可选，get_window_extrema 的结果（包含20/50期），用于复用窗口极值
     """
     result = {}
     current_price = float(closes[-1])
@@ -39,13 +72,19 @@ def calculate_support_resistance(closes, highs, lows):
     # 方法2: 最近N日的高低点
     if len(closes) >= 20:
         # 最近20日高低点
-        recent_high = float(np.max(highs[-20:]))
-        recent_low = float(np.min(lows[-20:]))
+        if extrema:
+            recent_high, recent_low = extrema[20]
+        else:
+            recent_high = float(np.max(highs[-20:]))
+            recent_low = float(np.min(lows[-20:]))
         
         # 最近50日高低点（如果有足够数据）
         if len(closes) >= 50:
-            high_50 = float(np.max(highs[-50:]))
-            low_50 = float(np.min(lows[-50:]))
+            if extrema:
+                high_50, low_50 = extrema[50]
+            else:
+                high_50 = float(np.max(highs[-50:]))
+                low_50 = float(np.min(lows[-50:]))
             result['resistance_50d_high'] = high_50
             result['support_50d_low'] = low_50
         
@@ -53,9 +92,13 @@ def calculate_support_resistance(closes, highs, lows):
         result['support_20d_low'] = recent_low
     
     # 方法3: 关键价格聚类（找出价格经常触及的区域）
-    if len(closes) >= 30:
-        # 合并所有价格点
-        all_prices = np.concatenate([highs[-30:], lows[-30:], closes[-30:]])
+    if len(closes) >= _CLUSTER_WINDOW:
+        # 合并所有价格点（写入复用缓冲区，避免每次拼接分配新数组）
+        buf = _get_cluster_buffer(closes.dtype)
+        buf[0] = highs[-_CLUSTER_WINDOW:]
+        buf[1] = lows[-_CLUSTER_WINDOW:]
+        buf[2] = closes[-_CLUSTER_WINDOW:]
+        all_prices = buf.ravel()
         
         # 使用简单的价格分组来找关键位
         price_range = np.max(all_prices) - np.min(all_prices)
@@ -51,21 +51,21 @@ def analyze_trend_strength(closes, highs, lows):
         else:
             result['trend_direction'] = 'neutral'
     
-    # 2. 连续上涨/下跌天数
+    # 2. 连续上涨/下跌天数（最近9个交易日，从最新一天往前数）
     consecutive_up = 0
     consecutive_down = 0
     
-    for i in range(1, min(10, len(closes))):
-        if closes[-i] > closes[-i-1]:
-            consecutive_up += 1
-            if consecutive_down > 0:
-                break
-        elif closes[-i] < closes[-i-1]:
-            consecutive_down += 1
-            if consecutive_up > 0:
-                break
+    window = min(10, len(closes))
+    signs = np.sign(np.diff(closes[-window:]))[::-1] if window > 1 else np.array([])
+    if len(signs) > 0 and signs[0] != 0:
+        changed = signs != signs[0]
+        run = int(np.argmax(changed)) if changed.any() else len(signs)
+        # 出现反向变动的那一天也计入反方向天数（与逐日统计口径一致）
+        opposite = 1 if run < len(signs) and signs[run] == -signs[0] else 0
+        if signs[0] > 0:
+            consecutive_up, consecutive_down = run, opposite
         else:
-            break
+            consecutive_up, consecutive_down = opposite, run
     
     result['consecutive_up_days'] = int(consecutive_up)
     result['consecutive_down_days'] = int(consecutive_down)
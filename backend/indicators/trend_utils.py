@@ -13,9 +13,13 @@ def get_trend(data):
     if len(data) < 3:
         return 'neutral'
     
-    # 简单线性回归判断趋势
-    x = np.arange(len(data))
-    slope = np.polyfit(x, data, 1)[0]
+    # 简单线性回归判断趋势（闭式解，x = 0..n-1 的求和项直接用公式计算）
+    data = np.asarray(data, dtype=np.float64)
+    n = len(data)
+    sum_x = n * (n - 1) // 2
+    sum_xx = n * (n - 1) * (2 * n - 1) // 6
+    sum_xy = float(np.arange(n) @ data)
+    slope = (n * sum_xy - sum_x * float(data.sum())) / (n * sum_xx - sum_x * sum_x)
     
     if slope > np.std(data) * 0.1:
         return 'up'
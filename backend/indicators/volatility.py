@@ -6,14 +6,17 @@
 import numpy as np
 
 
-def calculate_volatility(closes, period=20):
+def calculate_volatility(closes, period=20, deltas=None):
     """
     计算波动率
+    deltas: 可选，预先计算好的 np.diff(closes)
     """
     result = {}
     
     if len(closes) >= period + 1:
-        returns = np.diff(closes) / closes[:-1]
+        if deltas is None:
+            deltas = np.diff(closes)
+        returns = deltas / closes[:-1]
         result['volatility_20'] = float(np.std(returns[-period:]) * 100)
     
     return result
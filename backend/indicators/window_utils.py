@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+窗口极值工具函数
+"""
+
+import numpy as np
+
+
+def get_window_extrema(highs, lows, periods=(9, 20, 26, 50, 52)):
+    """
+    一次性计算最近N期的最高价和最低价
+    返回 {N: (最高价, 最低价)}，数据不足N期时使用全部数据
+    """
+    n = len(highs)
+    if n == 0:
+        return {}
+    
+    # 倒序累计极值：第 k 个元素即为最近 k+1 期的极值，所有周期共用一次扫描
+    depth = min(max(periods), n)
+    highs_acc = np.maximum.accumulate(highs[:-depth - 1:-1])
+    lows_acc = np.minimum.accumulate(lows[:-depth - 1:-1])
+    
+    extrema = {}
+    for p in periods:
+        idx = min(p, n) - 1
+        extrema[p] = (float(highs_acc[idx]), float(lows_acc[idx]))
+    return extrema
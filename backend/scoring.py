@@ -9,6 +9,13 @@ import numpy as np
 from typing import Dict, Tuple, Optional
 
 
+# 各评分项所需的指标键（dict.keys() 与 frozenset 做子集判断，一次 C 层集合运算）
+_MA_KEYS = frozenset({'ma5', 'ma20', 'ma50'})
+_ICHIMOKU_KEYS = frozenset({'ichimoku_cloud_top', 'ichimoku_cloud_bottom', 'ichimoku_status'})
+_KDJ_KEYS = frozenset({'kdj_k', 'kdj_d', 'kdj_j'})
+_BOLLINGER_KEYS = frozenset({'bb_upper', 'bb_lower', 'bb_middle', 'current_price'})
+
+
 class ScoringSystem:
     """多维度加权评分系统"""
     
@@ -133,11 +140,8 @@ class ScoringSystem:
             }
             risk_adjustment_factor = risk_adjustment_map.get(risk_level, 1.0)
         
-        # 应用风险调整
-        total_score = base_score * risk_adjustment_factor
-        
-        # 归一化到 -100 到 100 范围
-        total_score = max(-100, min(100, int(round(total_score))))
+        # 应用风险调整，并归一化到 -100 到 100 范围
+        total_score = max(-100, min(100, int(round(base_score * risk_adjustment_factor))))
         
         # 详细评分信息
         score_details = {
@@ -174,7 +178,7 @@ class ScoringSystem:
         
         # 1. MA均线排列 (权重30%)
         ma_score = 0.0
-        if all(k in indicators for k in ['ma5', 'ma20', 'ma50']):
+        if indicators.keys() >= _MA_KEYS:
             ma5 = indicators['ma5']
             ma20 = indicators['ma20']
             ma50 = indicators['ma50']
@@ -183,16 +187,16 @@ class ScoringSystem:
             if current_price > 0:
                 # 多头排列: 价格 > MA5 > MA20 > MA50
                 if current_price > ma5 > ma20 > ma50:
-                    ma_score = 30
+                    ma_score = 30.0
                 # 空头排列: 价格 < MA5 < MA20 < MA50
                 elif current_price < ma5 < ma20 < ma50:
-                    ma_score = -30
+                    ma_score = -30.0
                 # 部分多头排列
                 elif ma5 > ma20:
-                    ma_score = 15
+                    ma_score = 15.0
                 # 部分空头排列
                 elif ma5 < ma20:
-                    ma_score = -15
+                    ma_score = -15.0
         
         score += ma_score * 0.3
         
@@ -215,9 +219,9 @@ class ScoringSystem:
                     adx_score = -30 * intensity
             elif adx_signal == 'trend':
                 if plus_di > minus_di:
-                    adx_score = 15
+                    adx_score = 15.0
                 else:
-                    adx_score = -15
+                    adx_score = -15.0
         
         score += adx_score * 0.3
         
@@ -230,15 +234,15 @@ class ScoringSystem:
             
             if current_price > 0 and st_price > 0:
                 if st_dir == 'up' and current_price > st_price:
-                    supertrend_score = 20
+                    supertrend_score = 20.0
                 elif st_dir == 'down' and current_price < st_price:
-                    supertrend_score = -20
+                    supertrend_score = -20.0
         
         score += supertrend_score * 0.2
         
         # 4. Ichimoku云层 (权重20%)
         ichimoku_score = 0.0
-        if all(k in indicators for k in ['ichimoku_cloud_top', 'ichimoku_cloud_bottom', 'ichimoku_status']):
+        if indicators.keys() >= _ICHIMOKU_KEYS:
             current_price = indicators.get('current_price', 0)
             cloud_top = indicators.get('ichimoku_cloud_top', 0)
             cloud_bottom = indicators.get('ichimoku_cloud_bottom', 0)
@@ -246,17 +250,17 @@ class ScoringSystem:
             
             if current_price > 0 and cloud_top > 0 and cloud_bottom > 0:
                 if status == 'bullish':
-                    ichimoku_score = 20
+                    ichimoku_score = 20.0
                 elif status == 'bearish':
-                    ichimoku_score = -20
+                    ichimoku_score = -20.0
                 elif current_price > cloud_top:
-                    ichimoku_score = 10
+                    ichimoku_score = 10.0
                 elif current_price < cloud_bottom:
-                    ichimoku_score = -10
+                    ichimoku_score = -10.0
         
         score += ichimoku_score * 0.2
         
-        return max(-100, min(100, score))
+        return max(-100.0, min(100.0, score))
     
     def _score_momentum(self, indicators: Dict) -> float:
         """
@@ -301,7 +305,7 @@ class ScoringSystem:
         
         # 3. KDJ (权重20%)
         kdj_score = 0.0
-        if all(k in indicators for k in ['kdj_k', 'kdj_d', 'kdj_j']):
+        if indicators.keys() >= _KDJ_KEYS:
             k = indicators['kdj_k']
             d = indicators['kdj_d']
             j = indicators['kdj_j']
@@ -314,9 +318,9 @@ class ScoringSystem:
                 kdj_score = -20 * (j - 80) / 20
             # 金叉死叉
             elif k > d:
-                kdj_score = 10
+                kdj_score = 10.0
             elif k < d:
-                kdj_score = -10
+                kdj_score = -10.0
         
         score += kdj_score * 0.2
         
@@ -340,18 +344,18 @@ class ScoringSystem:
             
             if status == 'oversold':
                 if k > d:  # 金叉
-                    stoch_rsi_score = 15
+                    stoch_rsi_score = 15.0
                 else:
-                    stoch_rsi_score = 8
+                    stoch_rsi_score = 8.0
             elif status == 'overbought':
                 if k < d:  # 死叉
-                    stoch_rsi_score = -15
+                    stoch_rsi_score = -15.0
                 else:
-                    stoch_rsi_score = -8
+                    stoch_rsi_score = -8.0
         
         score += stoch_rsi_score * 0.15
         
-        return max(-100, min(100, score))
+        return max(-100.0, min(100.0, score))
     
     def _score_volume(self, indicators: Dict) -> float:
         """
@@ -370,11 +374,11 @@ class ScoringSystem:
         if 'price_volume_confirmation' in indicators:
             confirmation = indicators['price_volume_confirmation']
             if confirmation == 'bullish':
-                price_volume_score = 40
+                price_volume_score = 40.0
             elif confirmation == 'bearish':
-                price_volume_score = -40
+                price_volume_score = -40.0
             elif confirmation == 'divergence':
-                price_volume_score = -20
+                price_volume_score = -20.0
         
         score += price_volume_score * 0.4
         
@@ -385,13 +389,13 @@ class ScoringSystem:
             price_change = indicators.get('price_change_pct', 0)
             
             if obv_trend == 'up' and price_change > 0:
-                obv_score = 30  # 量价齐升
+                obv_score = 30.0  # 量价齐升
             elif obv_trend == 'down' and price_change < 0:
-                obv_score = -30  # 量价齐跌
+                obv_score = -30.0  # 量价齐跌
             elif obv_trend == 'up':
-                obv_score = 15
+                obv_score = 15.0
             elif obv_trend == 'down':
-                obv_score = -15
+                obv_score = -15.0
         
         score += obv_score * 0.3
         
@@ -400,9 +404,9 @@ class ScoringSystem:
         if 'vp_status' in indicators:
             vp_status = indicators['vp_status']
             if vp_status == 'above_va':
-                vp_score = 20
+                vp_score = 20.0
             elif vp_status == 'below_va':
-                vp_score = -20
+                vp_score = -20.0
         
         score += vp_score * 0.2
         
@@ -414,14 +418,14 @@ class ScoringSystem:
             
             # 放量上涨
             if ratio > 1.5 and price_change > 0:
-                volume_ratio_score = 10
+                volume_ratio_score = 10.0
             # 放量下跌
             elif ratio > 1.5 and price_change < 0:
-                volume_ratio_score = -10
+                volume_ratio_score = -10.0
         
         score += volume_ratio_score * 0.1
         
-        return max(-100, min(100, score))
+        return max(-100.0, min(100.0, score))
     
     def _score_volatility(self, indicators: Dict) -> float:
         """
@@ -436,7 +440,7 @@ class ScoringSystem:
         
         # 1. 布林带位置 (权重50%)
         bb_score = 0.0
-        if all(k in indicators for k in ['bb_upper', 'bb_lower', 'bb_middle', 'current_price']):
+        if indicators.keys() >= _BOLLINGER_KEYS:
             price = indicators['current_price']
             upper = indicators['bb_upper']
             lower = indicators['bb_lower']
@@ -463,18 +467,18 @@ class ScoringSystem:
             vol = indicators['volatility_20']
             # 理想波动率区间: 2-3% (最优交易区间)
             if 2.0 <= vol <= 3.0:
-                volatility_score = 30  # 最优区间
+                volatility_score = 30.0  # 最优区间
             # 次优波动率: 1.5-4.0%
             elif 1.5 <= vol < 2.0 or 3.0 < vol <= 4.0:
-                volatility_score = 15  # 次优区间
+                volatility_score = 15.0  # 次优区间
             # 低波动 (缺乏交易机会)
             elif vol < 1.0:
-                volatility_score = -20  # 流动性差、关注度低
+                volatility_score = -20.0  # 流动性差、关注度低
             # 高波动 (风险过大)
             elif vol > 5.0:
-                volatility_score = -40  # 风险极高
+                volatility_score = -40.0  # 风险极高
             elif vol > 4.0:
-                volatility_score = -25  # 风险较高
+                volatility_score = -25.0  # 风险较高
         
         score += volatility_score * 0.3
         
@@ -485,13 +489,13 @@ class ScoringSystem:
             # 低ATR: 正分
             # 高ATR: 负分
             if atr_pct < 1.5:
-                atr_score = 20
+                atr_score = 20.0
             elif atr_pct > 5.0:
-                atr_score = -30
+                atr_score = -30.0
         
         score += atr_score * 0.2
         
-        return max(-100, min(100, score))
+        return max(-100.0, min(100.0, score))
     
     def _score_support_resistance(self, indicators: Dict) -> float:
         """
@@ -519,7 +523,7 @@ class ScoringSystem:
                 support_score = 40 * (2 - dist_pct) / 2
             # 跌破支撑位: 负分
             elif dist_pct < 0:
-                support_score = -40
+                support_score = -40.0
         
         score += support_score * 0.4
         
@@ -534,7 +538,7 @@ class ScoringSystem:
                 resistance_score = -30 * (2 - dist_pct) / 2
             # 突破压力位: 正分
             elif dist_pct < 0:
-                resistance_score = 30
+                resistance_score = 30.0
         
         score += resistance_score * 0.3
         
@@ -548,18 +552,18 @@ class ScoringSystem:
             if sar > 0:
                 if sar_signal == 'buy':
                     if sar_trend == 'up':
-                        sar_score = 25
+                        sar_score = 25.0
                     else:
-                        sar_score = 30  # 转向买入
+                        sar_score = 30.0  # 转向买入
                 elif sar_signal == 'sell':
                     if sar_trend == 'down':
-                        sar_score = -25
+                        sar_score = -25.0
                     else:
-                        sar_score = -30  # 转向卖出
+                        sar_score = -30.0  # 转向卖出
         
         score += sar_score * 0.3
         
-        return max(-100, min(100, score))
+        return max(-100.0, min(100.0, score))
     
     def _score_advanced(self, indicators: Dict) -> float:
         """
@@ -634,7 +638,7 @@ class ScoringSystem:
         
         score += wr_score * 0.1
         
-        return max(-100, min(100, score))
+        return max(-100.0, min(100.0, score))
     
     def get_recommendation(self, score: int) -> Tuple[str, str]:
         """
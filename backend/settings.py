@@ -8,7 +8,15 @@
 import logging
 import os
 import sqlite3
+import threading
 import json
+import itertools
+import orjson
+from cachetools import LRUCache
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 import pandas as pd
 import numpy as np
 from datetime import date
@@ -29,9 +37,98 @@ OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
 DEFAULT_AI_MODEL = 'deepseek-v3.1:671b-cloud'
 
 
+# 写入语句（UPSERT：冲突时原地更新，不删除重插；固定文本便于 sqlite3 语句缓存复用）
+_UPSERT_ANALYSIS = '''
+    INSERT INTO analysis_cache
+    (symbol, duration, bar_size, query_date, indicators, signals, candles,
+     ai_analysis, model, ai_available)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(symbol, duration, bar_size, query_date) DO UPDATE SET
+        indicators = excluded.indicators,
+        signals = excluded.signals,
+        candles = excluded.candles,
+        ai_analysis = excluded.ai_analysis,
+        model = excluded.model,
+        ai_available = excluded.ai_available,
+        created_at = CURRENT_TIMESTAMP
+'''
+
+_UPSERT_STOCK_INFO = '''
+    INSERT INTO stock_info (symbol, name, updated_at)
+    VALUES (?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(symbol) DO UPDATE SET
+        name = excluded.name,
+        updated_at = CURRENT_TIMESTAMP
+'''
+
+_UPSERT_KLINE = '''
+    INSERT INTO kline_data
+    (symbol, interval, date, open, high, low, close, volume, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(symbol, interval, date) DO UPDATE SET
+        open = excluded.open,
+        high = excluded.high,
+        low = excluded.low,
+        close = excluded.close,
+        volume = excluded.volume,
+        updated_at = CURRENT_TIMESTAMP
+'''
+
+# 按 kline_data 重新汇总单个 (symbol, interval) 的日期范围和条数
+_UPSERT_KLINE_META = '''
+    INSERT INTO kline_meta (symbol, interval, first_date, last_date, row_count)
+    SELECT symbol, interval, MIN(date), MAX(date), COUNT(*)
+    FROM kline_data
+    WHERE symbol = ? AND interval = ?
+    GROUP BY symbol, interval
+    ON CONFLICT(symbol, interval) DO UPDATE SET
+        first_date = excluded.first_date,
+        last_date = excluded.last_date,
+        row_count = excluded.row_count
+'''
+
+
+# 当天分析结果的内存缓存（已反序列化），避免重复的数据库查询和 JSON 解析
+_analysis_mem = LRUCache(maxsize=256)
+_analysis_mem_lock = threading.Lock()
+
+# 每个线程复用一个数据库连接，避免每次查询都重新打开数据库文件
+_tls = threading.local()
+
+
+def _connect():
+    """
+    获取当前线程的数据库连接（首次调用时创建）
+    自动提交模式，多语句写入需显式 BEGIN；WAL 日志模式，synchronous=NORMAL 减少写入时的 fsync
+    """
+    conn = getattr(_tls, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA mmap_size=268435456')
+        _tls.conn = conn
+    return conn
+
+
 class JSONEncoder(json.JSONEncoder):
     """自定义JSON编码器，处理pandas Timestamp等特殊类型"""
+    # 常见类型按 type(obj) 直接查表转换，其余走 isinstance 判断
+    _dispatch = {
+        pd.Timestamp: lambda obj: obj.strftime('%Y-%m-%d'),
+        np.ndarray: lambda obj: obj.tolist(),
+    }
+    for _t in (np.int8, np.int16, np.int32, np.int64, np.uint8, np.uint16, np.uint32, np.uint64):
+        _dispatch[_t] = int
+    for _t in (np.float16, np.float32, np.float64):
+        _dispatch[_t] = float
+    del _t
+    
     def default(self, obj):
+        handler = self._dispatch.get(type(obj))
+        if handler is not None:
+            return handler(obj)
         if isinstance(obj, pd.Timestamp):
             return obj.strftime('%Y-%m-%d')
         elif isinstance(obj, (pd.Series, pd.DataFrame)):
@@ -47,106 +144,192 @@ class JSONEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
-def init_database():
+_JSON_ENCODER = JSONEncoder()
+
+# 缓存数据序列化选项：numpy 数值直接序列化，允许非字符串键
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# 分析缓存的 JSON 列以 zstd 压缩后的 BLOB 存储（未安装 zstandard 时写入未压缩 JSON）
+# 读取时按帧头识别，压缩与未压缩的旧数据可以混存
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+_ZSTD_COMPRESSOR = zstandard.ZstdCompressor(level=3) if zstandard is not None else None
+
+
+def orjson_default(obj):
+    """
+    orjson 无法直接序列化的类型（pandas Timestamp 等）交给 JSONEncoder 处理，其余转为字符串
     """
-    初始化SQLite数据库，创建分析结果缓存表、股票信息表和K线数据表
+    try:
+        return _JSON_ENCODER.default(obj)
+    except TypeError:
+        return str(obj)
+
+
+def _dumps_bytes(obj):
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    序列化为 UTF-8 JSON 字节串（orjson 单次分配输出缓冲区，不再额外解码为 str）
+    """
+    return orjson.dumps(obj, default=orjson_default, option=_ORJSON_OPTIONS)
+
+
+def _pack(obj):
+    """
+    序列化为缓存列存储的字节串：安装了 zstandard 时压缩为 zstd 帧，否则为原始 JSON
+    """
+    data = _dumps_bytes(obj)
+    if _ZSTD_COMPRESSOR is not None:
+        return _ZSTD_COMPRESSOR.compress(data)
+    return data
+
+
+def _loads(text):
+    """
+    反序列化 JSON 文本或字节串（zstd 压缩的先解压）；旧缓存中可能含 NaN 等 orjson 不接受的写法，回退到标准库
+    """
+    if isinstance(text, bytes) and text[:4] == _ZSTD_MAGIC:
+        text = zstandard.ZstdDecompressor().decompress(text)
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json.loads(text)
+
+
+# 数据库结构版本（PRAGMA user_version），修改表结构时递增
+_SCHEMA_VERSION = 2
+
+# 完整建表脚本：executescript 一次解析，在单个事务内执行并写入结构版本
+_SCHEMA_SCRIPT = f'''
+    BEGIN;
     
-    # 创建分析结果缓存表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS analysis_cache (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            symbol TEXT NOT NULL,
-            duration TEXT NOT NULL,
-            bar_size TEXT NOT NULL,
-            query_date DATE NOT NULL,
-            indicators TEXT NOT NULL,
-            signals TEXT NOT NULL,
-            candles TEXT NOT NULL,
-            ai_analysis TEXT,
-            model TEXT,
-            ai_available INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(symbol, duration, bar_size, query_date)
-        )
-    ''')
+    -- 分析结果缓存表
+    CREATE TABLE IF NOT EXISTS analysis_cache (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol TEXT NOT NULL,
+        duration TEXT NOT NULL,
+        bar_size TEXT NOT NULL,
+        query_date DATE NOT NULL,
+        indicators TEXT NOT NULL,
+        signals TEXT NOT NULL,
+        candles TEXT NOT NULL,
+        ai_analysis TEXT,
+        model TEXT,
+        ai_available INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(symbol, duration, bar_size, query_date)
+    );
     
-    # 创建股票信息表，用于缓存股票代码和全名
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS stock_info (
-            symbol TEXT PRIMARY KEY,
-            name TEXT,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    -- 股票信息表，用于缓存股票代码和全名
+    CREATE TABLE IF NOT EXISTS stock_info (
+        symbol TEXT PRIMARY KEY,
+        name TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
     
-    # 创建K线数据表，用于缓存全量K线数据
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS kline_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            symbol TEXT NOT NULL,
-            interval TEXT NOT NULL,
-            date TEXT NOT NULL,
-            open REAL NOT NULL,
-            high REAL NOT NULL,
-            low REAL NOT NULL,
-            close REAL NOT NULL,
-            volume INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(symbol, interval, date)
-        )
-    ''')
+    -- K线数据表，用于缓存全量K线数据
+    CREATE TABLE IF NOT EXISTS kline_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol TEXT NOT NULL,
+        interval TEXT NOT NULL,
+        date TEXT NOT NULL,
+        open REAL NOT NULL,
+        high REAL NOT NULL,
+        low REAL NOT NULL,
+        close REAL NOT NULL,
+        volume INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(symbol, interval, date)
+    );
     
-    # 创建索引以提高查询速度
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_symbol_duration_bar_date 
-        ON analysis_cache(symbol, duration, bar_size, query_date)
-    ''')
+    -- 索引以提高查询速度
+    CREATE INDEX IF NOT EXISTS idx_symbol_duration_bar_date
+    ON analysis_cache(symbol, duration, bar_size, query_date);
     
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_kline_symbol_interval_date 
-        ON kline_data(symbol, interval, date DESC)
-    ''')
+    CREATE INDEX IF NOT EXISTS idx_kline_symbol_interval_date
+    ON kline_data(symbol, interval, date DESC);
     
-    conn.commit()
-    conn.close()
+    -- K线缓存元数据：每个 (symbol, interval) 的日期范围，判断缓存新鲜度时无需读取全部K线
+    CREATE TABLE IF NOT EXISTS kline_meta (
+        symbol TEXT NOT NULL,
+        interval TEXT NOT NULL,
+        first_date TEXT NOT NULL,
+        last_date TEXT NOT NULL,
+        row_count INTEGER NOT NULL,
+        PRIMARY KEY (symbol, interval)
+    ) WITHOUT ROWID;
+    
+    -- 为已有K线数据补建元数据
+    INSERT OR REPLACE INTO kline_meta (symbol, interval, first_date, last_date, row_count)
+    SELECT symbol, interval, MIN(date), MAX(date), COUNT(*)
+    FROM kline_data
+    GROUP BY symbol, interval;
+    
+    PRAGMA user_version = {_SCHEMA_VERSION};
+    
+    COMMIT;
+'''
+
+
+def init_database():
+    """
+    初始化SQLite数据库，创建分析结果缓存表、股票信息表、K线数据表和K线元数据表
+    WAL 等连接级 PRAGMA 已在 _connect 中设置
+    """
+    conn = _connect()
+    if conn.execute('PRAGMA user_version').fetchone()[0] >= _SCHEMA_VERSION:
+        logger.info("数据库结构已是最新，跳过初始化")
+        return
+    
+    conn.executescript(_SCHEMA_SCRIPT)
     logger.info("数据库初始化完成")
 
 
+def _analysis_mem_key(symbol, duration, bar_size, day):
+    """
+    分析结果内存缓存键（含日期，跨日自动失效）
+    """
+    return (symbol.upper(), duration, bar_size, day.toordinal())
+
+
 def get_cached_analysis(symbol, duration, bar_size):
     """
-    从数据库获取当天的分析结果
+    从数据库获取当天的分析结果（优先读取内存缓存）
     返回: 如果有当天的数据返回结果字典，否则返回None
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        today = date.today()
+        mem_key = _analysis_mem_key(symbol, duration, bar_size, today)
+        with _analysis_mem_lock:
+            cached = _analysis_mem.get(mem_key)
+        if cached is not None:
+            # 浅拷贝：调用方会在顶层补充 AI 分析等字段
+            return dict(cached)
         
-        today = date.today().isoformat()
+        conn = _connect()
+        cursor = conn.cursor()
         
         cursor.execute('''
             SELECT indicators, signals, candles, ai_analysis, model, ai_available
             FROM analysis_cache
             WHERE symbol = ? AND duration = ? AND bar_size = ? AND query_date = ?
-        ''', (symbol.upper(), duration, bar_size, today))
+        ''', (symbol.upper(), duration, bar_size, today.isoformat()))
         
         row = cursor.fetchone()
-        conn.close()
         
         if row:
             logger.info(f"从缓存获取数据: {symbol}, {duration}, {bar_size}")
-            return {
+            cached = {
                 'success': True,
-                'indicators': json.loads(row[0]),
-                'signals': json.loads(row[1]),
-                'candles': json.loads(row[2]),
+                'indicators': _loads(row[0]),
+                'signals': _loads(row[1]),
+                'candles': _loads(row[2]),
                 'ai_analysis': row[3],
                 'model': row[4],
                 'ai_available': bool(row[5])
             }
+            with _analysis_mem_lock:
+                _analysis_mem[mem_key] = cached
+            return dict(cached)
         else:
             return None
     except Exception as e:
@@ -159,75 +342,44 @@ def save_analysis_cache(symbol, duration, bar_size, result):
     保存分析结果到数据库（更新或插入）
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        today = date.today()
         
-        today = date.today().isoformat()
-        
-        # 使用自定义编码器序列化数据
-        indicators_json = json.dumps(result.get('indicators', {}), cls=JSONEncoder, ensure_ascii=False)
-        signals_json = json.dumps(result.get('signals', {}), cls=JSONEncoder, ensure_ascii=False)
-        candles_json = json.dumps(result.get('candles', []), cls=JSONEncoder, ensure_ascii=False)
-        
-        # 使用 INSERT OR REPLACE 来更新或插入数据
-        cursor.execute('''
-            INSERT OR REPLACE INTO analysis_cache 
-            (symbol, duration, bar_size, query_date, indicators, signals, candles, 
-             ai_analysis, model, ai_available)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        # 使用 orjson 序列化并压缩数据，以字节串直接绑定
+        params = (
             symbol.upper(),
             duration,
             bar_size,
-            today,
-            indicators_json,
-            signals_json,
-            candles_json,
+            today.isoformat(),
+            _pack(result.get('indicators', {})),
+            _pack(result.get('signals', {})),
+            _pack(result.get('candles', [])),
             result.get('ai_analysis'),
             result.get('model'),
             1 if result.get('ai_available') else 0
-        ))
+        )
         
-        conn.commit()
-        conn.close()
-        logger.info(f"分析结果已缓存: {symbol}, {duration}, {bar_size}")
-    except sqlite3.OperationalError as e:
-        # 如果表不存在，尝试初始化数据库后重试
-        if 'no such table' in str(e).lower():
+        try:
+            _connect().execute(_UPSERT_ANALYSIS, params)
+        except sqlite3.OperationalError as e:
+            # 如果表不存在，尝试初始化数据库后重试
+            if 'no such table' not in str(e).lower():
+                raise
             logger.warning(f"数据库表不存在，正在初始化数据库: {e}")
-            try:
-                init_database()
-                # 重试保存
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                today = date.today().isoformat()
-                indicators_json = json.dumps(result.get('indicators', {}), cls=JSONEncoder, ensure_ascii=False)
-                signals_json = json.dumps(result.get('signals', {}), cls=JSONEncoder, ensure_ascii=False)
-                candles_json = json.dumps(result.get('candles', []), cls=JSONEncoder, ensure_ascii=False)
-                cursor.execute('''
-                    INSERT OR REPLACE INTO analysis_cache 
-                    (symbol, duration, bar_size, query_date, indicators, signals, candles, 
-                     ai_analysis, model, ai_available)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    symbol.upper(),
-                    duration,
-                    bar_size,
-                    today,
-                    indicators_json,
-                    signals_json,
-                    candles_json,
-                    result.get('ai_analysis'),
-                    result.get('model'),
-                    1 if result.get('ai_available') else 0
-                ))
-                conn.commit()
-                conn.close()
-                logger.info(f"分析结果已缓存（重试成功）: {symbol}, {duration}, {bar_size}")
-            except Exception as retry_error:
-                logger.error(f"保存缓存失败（重试后）: {retry_error}")
-        else:
-            logger.error(f"保存缓存失败: {e}")
+            init_database()
+            _connect().execute(_UPSERT_ANALYSIS, params)
+        
+        with _analysis_mem_lock:
+            _analysis_mem[_analysis_mem_key(symbol, duration, bar_size, today)] = {
+                'success': True,
+                'indicators': result.get('indicators', {}),
+                'signals': result.get('signals', {}),
+                'candles': result.get('candles', []),
+                'ai_analysis': result.get('ai_analysis'),
+                'model': result.get('model'),
+                'ai_available': bool(result.get('ai_available'))
+            }
+        
+        logger.info(f"分析结果已缓存: {symbol}, {duration}, {bar_size}")
     except Exception as e:
         logger.error(f"保存缓存失败: {e}")
 
@@ -237,17 +389,7 @@ def save_stock_info(symbol, name):
     保存或更新股票信息（代码和全名）
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # 使用 INSERT OR REPLACE 来更新或插入
-        cursor.execute('''
-            INSERT OR REPLACE INTO stock_info (symbol, name, updated_at)
-            VALUES (?, ?, CURRENT_TIMESTAMP)
-        ''', (symbol.upper(), name))
-        
-        conn.commit()
-        conn.close()
+        _connect().execute(_UPSERT_STOCK_INFO, (symbol.upper(), name))
         logger.info(f"股票信息已保存: {symbol} - {name}")
     except Exception as e:
         logger.error(f"保存股票信息失败: {e}")
@@ -259,7 +401,7 @@ def get_stock_name(symbol):
     返回: 股票全名，如果不存在则返回None
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -267,7 +409,6 @@ def get_stock_name(symbol):
         ''', (symbol.upper(),))
         
         row = cursor.fetchone()
-        conn.close()
         
         if row:
             return row[0]
@@ -278,40 +419,46 @@ def get_stock_name(symbol):
         return None
 
 
+def get_kline_date_range(symbol: str, interval: str):
+    """
+    从K线元数据表获取缓存的 (最早日期, 最新日期)，无缓存时返回 None
+    """
+    try:
+        row = _connect().execute(
+            'SELECT first_date, last_date FROM kline_meta WHERE symbol = ? AND interval = ?',
+            (symbol, interval)
+        ).fetchone()
+        if row is None:
+            return None
+        return pd.Timestamp(row[0]), pd.Timestamp(row[1])
+    except Exception as e:
+        logger.error(f"获取K线缓存日期范围失败: {e}")
+        return None
+
+
 def get_kline_from_cache(symbol: str, interval: str, start_date: str = None):
     """
     从数据库获取K线数据
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
+        sql = '''
+            SELECT date AS Date, open AS Open, high AS High, low AS Low,
+                   close AS Close, volume AS Volume
+            FROM kline_data
+            WHERE symbol = ? AND interval = ?
+        '''
+        params = (symbol, interval)
         if start_date:
-            cursor.execute('''
-                SELECT date, open, high, low, close, volume
-                FROM kline_data
-                WHERE symbol = ? AND interval = ? AND date >= ?
-                ORDER BY date ASC
-            ''', (symbol, interval, start_date))
-        else:
-            cursor.execute('''
-                SELECT date, open, high, low, close, volume
-                FROM kline_data
-                WHERE symbol = ? AND interval = ?
-                ORDER BY date ASC
-            ''', (symbol, interval))
+            sql += ' AND date >= ?'
+            params += (start_date,)
+        sql += ' ORDER BY date ASC'
         
-        rows = cursor.fetchall()
-        conn.close()
+        # 直接读取为以日期为索引的DataFrame
+        df = pd.read_sql_query(sql, _connect(), params=params, index_col='Date', parse_dates=['Date'])
         
-        if not rows:
+        if df.empty:
             return None
         
-        # 转换为pandas DataFrame
-        df = pd.DataFrame(rows, columns=['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
-        df['Date'] = pd.to_datetime(df['Date'])
-        df.set_index('Date', inplace=True)
-        
         return df
     except Exception as e:
         logger.error(f"从缓存获取K线数据失败: {e}")
@@ -321,41 +468,34 @@ def get_kline_from_cache(symbol: str, interval: str, start_date: str = None):
 def save_kline_to_cache(symbol: str, interval: str, df: pd.DataFrame):
     """
     保存K线数据到数据库（增量更新）
+    按列取出数组后一次性 executemany 批量写入
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        conn = _connect()
         
+        dates = df.index.strftime('%Y-%m-%d').tolist()
         # 检查是否有 Volume 列，如果没有或为 NaN 则使用 0
-        has_volume = 'Volume' in df.columns
+        if 'Volume' in df.columns:
+            volumes = pd.to_numeric(df['Volume'], errors='coerce').to_numpy(dtype=np.float64)
+            volumes = np.nan_to_num(volumes, nan=0).astype(np.int64).tolist()
+        else:
+            volumes = [0] * len(df)
         
-        for date, row in df.iterrows():
-            date_str = date.strftime('%Y-%m-%d')
-            # 处理成交量数据：如果不存在或为 NaN，使用 0
-            volume = 0
-            if has_volume and pd.notna(row.get('Volume')):
-                try:
-                    volume = int(row['Volume'])
-                except (ValueError, TypeError):
-                    volume = 0
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO kline_data 
-                (symbol, interval, date, open, high, low, close, volume, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (
-                symbol,
-                interval,
-                date_str,
-                float(row['Open']),
-                float(row['High']),
-                float(row['Low']),
-                float(row['Close']),
-                volume
-            ))
+        rows = zip(
+            itertools.repeat(symbol),
+            itertools.repeat(interval),
+            dates,
+            df['Open'].to_numpy(dtype=np.float64).tolist(),
+            df['High'].to_numpy(dtype=np.float64).tolist(),
+            df['Low'].to_numpy(dtype=np.float64).tolist(),
+            df['Close'].to_numpy(dtype=np.float64).tolist(),
+            volumes
+        )
         
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute('BEGIN')
+            conn.executemany(_UPSERT_KLINE, rows)
+            conn.execute(_UPSERT_KLINE_META, (symbol, interval))
         logger.info(f"K线数据已缓存: {symbol}, {interval}, {len(df)}条")
     except Exception as e:
         logger.error(f"保存K线数据失败: {e}")
@@ -366,7 +506,7 @@ def get_hot_stocks(limit=20):
     获取热门股票代码列表（从SQLite数据库查询过的股票中获取）
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
         # 从数据库查询所有不同的股票代码，按查询次数和最近查询时间排序
@@ -385,7 +525,6 @@ def get_hot_stocks(limit=20):
         ''', (limit,))
         
         rows = cursor.fetchall()
-        conn.close()
         
         # 构建返回结果
         hot_stocks = []
@@ -5,7 +5,114 @@
 信号生成器模块 - 提取重复的信号生成逻辑
 """
 
+import bisect
 from typing import List, Dict, Optional
+import numpy as np
+from .indicators import SUPPORT_KEYS, RESISTANCE_KEYS
+
+
+# 布林带信号所需的指标键（dict.keys() 与 frozenset 做子集判断，一次 C 层集合运算）
+_BOLLINGER_KEYS = frozenset({'bb_upper', 'bb_lower', 'current_price'})
+
+# 阈值型信号规则：指标键 -> ((条件, 信号模板), ...)
+# 按顺序取第一个满足的条件（条件为 None 表示兜底），模板以指标值格式化
+_THRESHOLD_SIGNAL_RULES = {
+    'rsi': (
+        (lambda v: v < 30, '🟢 RSI=%(value).1f 超卖区域 - 可能反弹'),
+        (lambda v: v > 70, '🔴 RSI=%(value).1f 超买区域 - 可能回调'),
+        (None, '⚪ RSI=%(value).1f 中性区域'),
+    ),
+    'macd_histogram': (
+        (lambda v: v > 0, '📈 MACD柱状图为正 - 看涨'),
+        (None, '📉 MACD柱状图为负 - 看跌'),
+    ),
+    'volume_ratio': (
+        (lambda v: v > 1.5, '📊 成交量放大%(value).1f倍 - 趋势加强'),
+        (lambda v: v < 0.5, '📊 成交量萎缩 - 趋势减弱'),
+    ),
+    'adx': (
+        (lambda v: v > 40, '💪 ADX=%(value).1f - 强趋势，跟随趋势交易'),
+        (lambda v: v > 25, '⚡ ADX=%(value).1f - 中等趋势'),
+        (lambda v: v > 20, '🌤️ ADX=%(value).1f - 弱趋势'),
+        (None, '🌫️ ADX=%(value).1f - 无明显趋势，适合区间交易'),
+    ),
+}
+
+# 状态型信号规则：指标键 -> ({状态值: 信号模板}, 未匹配时的默认模板)
+_STATUS_SIGNAL_RULES = {
+    'price_volume_confirmation': ({
+        'bullish': '✅ 价涨量增 - 看涨确认，趋势健康',
+        'bearish': '❌ 价跌量增 - 看跌确认，下跌动能强',
+        'divergence': '⚠️ 价量背离 - 趋势可能反转，需谨慎',
+    }, None),
+    'volume_signal': ({
+        'high_volume': '🔥 高成交量信号 - 当前成交量是均量的%(value).1f倍',
+        'low_volume': '💤 低成交量信号 - 市场观望情绪浓厚',
+    }, None),
+    'sar_signal': ({
+        'bullish': '🔵 SAR看涨 - 止损位距离%(value).1f%%',
+        'bearish': '🔴 SAR看跌 - 止损位距离%(value).1f%%',
+    }, None),
+    'ichimoku_status': ({
+        'above_cloud': '☁️ 价格在云层上方 - 看涨',
+        'below_cloud': '☁️ 价格在云层下方 - 看跌',
+    }, '☁️ 价格在云层内 - 盘整'),
+    'supertrend_direction': ({
+        'up': '🟢 SuperTrend看涨信号',
+    }, '🔴 SuperTrend看跌信号'),
+    'stoch_rsi_status': ({
+        'oversold': '🟢 StochRSI超卖 - 短期可能反弹',
+        'overbought': '🔴 StochRSI超买 - 短期可能回调',
+    }, None),
+}
+
+
+# 趋势信号模板：(趋势方向, 强度是否超过70) -> 模板，未匹配的方向视为震荡
+_TREND_SIGNAL_TEMPLATES = {
+    ('up', True): '🚀 强劲上升趋势 - 趋势强度%(value).0f%%',
+    ('up', False): '📈 温和上升趋势 - 趋势强度%(value).0f%%',
+    ('down', True): '💥 强劲下降趋势 - 趋势强度%(value).0f%%',
+    ('down', False): '📉 温和下降趋势 - 趋势强度%(value).0f%%',
+}
+
+# 成交量分布信号模板：价值区域状态 -> 模板（价格在POC附近时优先输出平衡信号）
+_VOLUME_PROFILE_TEMPLATES = {
+    'above_va': '📈 价格在价值区域上方(POC $%(poc).2f) - 强势失衡',
+    'below_va': '📉 价格在价值区域下方(POC $%(poc).2f) - 弱势失衡',
+}
+
+# ML预测信号分档：(置信度下限, {趋势: 模板}, 未匹配时的默认模板)，按顺序取第一个满足的档位
+_ML_SIGNAL_TIERS = (
+    (50, {
+        'up': '🤖 ML预测: 看涨趋势(置信度%(confidence).1f%%, 预期涨幅%(prediction).2f%%) - AI看多',
+        'down': '🤖 ML预测: 看跌趋势(置信度%(confidence).1f%%, 预期跌幅%(prediction).2f%%) - AI看空',
+    }, '🤖 ML预测: 横盘整理(置信度%(confidence).1f%%) - AI中性'),
+    (30, {
+        'up': '🤖 ML预测: 轻微看涨(置信度%(confidence).1f%%) - 谨慎乐观',
+        'down': '🤖 ML预测: 轻微看跌(置信度%(confidence).1f%%) - 谨慎悲观',
+    }, None),
+)
+
+
+def _add_threshold_signal(signals_list: List[str], indicators: Dict, key: str):
+    """按阈值规则表添加信号"""
+    value = indicators.get(key)
+    if value is None:
+        return
+    for predicate, template in _THRESHOLD_SIGNAL_RULES[key]:
+        if predicate is None or predicate(value):
+            signals_list.append(template % {'value': value})
+            return
+
+
+def _add_status_signal(signals_list: List[str], indicators: Dict, key: str, fmt_value: float = 0):
+    """按状态规则表添加信号，fmt_value 用于填充模板中的数值"""
+    if key not in indicators:
+        return
+    table, default = _STATUS_SIGNAL_RULES[key]
+    template = table.get(indicators[key], default)
+    if template:
+        signals_list.append(template % {'value': fmt_value})
 
 
 def add_ma_signals(signals_list: List[str], indicators: Dict):
@@ -19,19 +126,12 @@ def add_ma_signals(signals_list: List[str], indicators: Dict):
 
 def add_rsi_signals(signals_list: List[str], indicators: Dict):
     """添加RSI超买超卖信号"""
-    if 'rsi' in indicators:
-        rsi = indicators['rsi']
-        if rsi < 30:
-            signals_list.append(f'🟢 RSI={rsi:.1f} 超卖区域 - 可能反弹')
-        elif rsi > 70:
-            signals_list.append(f'🔴 RSI={rsi:.1f} 超买区域 - 可能回调')
-        else:
-            signals_list.append(f'⚪ RSI={rsi:.1f} 中性区域')
+    _add_threshold_signal(signals_list, indicators, 'rsi')
 
 
 def add_bollinger_signals(signals_list: List[str], indicators: Dict):
     """添加布林带信号"""
-    if all(k in indicators for k in ['bb_upper', 'bb_lower', 'current_price']):
+    if indicators.keys() >= _BOLLINGER_KEYS:
         price = indicators['current_price']
         upper = indicators['bb_upper']
         lower = indicators['bb_lower']
@@ -44,112 +144,154 @@ def add_bollinger_signals(signals_list: List[str], indicators: Dict):
 
 def add_macd_signals(signals_list: List[str], indicators: Dict):
     """添加MACD信号"""
-    if 'macd_histogram' in indicators:
-        histogram = indicators['macd_histogram']
-        if histogram > 0:
-            signals_list.append('📈 MACD柱状图为正 - 看涨')
-        else:
-            signals_list.append('📉 MACD柱状图为负 - 看跌')
+    _add_threshold_signal(signals_list, indicators, 'macd_histogram')
 
 
 def add_volume_signals(signals_list: List[str], indicators: Dict):
     """添加成交量相关信号"""
     # 成交量比率
-    if 'volume_ratio' in indicators:
-        ratio = indicators['volume_ratio']
-        if ratio > 1.5:
-            signals_list.append(f'📊 成交量放大{ratio:.1f}倍 - 趋势加强')
-        elif ratio < 0.5:
-            signals_list.append(f'📊 成交量萎缩 - 趋势减弱')
+    _add_threshold_signal(signals_list, indicators, 'volume_ratio')
     
     # 价量配合
-    if 'price_volume_confirmation' in indicators:
-        confirmation = indicators['price_volume_confirmation']
-        if confirmation == 'bullish':
-            signals_list.append('✅ 价涨量增 - 看涨确认，趋势健康')
-        elif confirmation == 'bearish':
-            signals_list.append('❌ 价跌量增 - 看跌确认，下跌动能强')
-        elif confirmation == 'divergence':
-            signals_list.append('⚠️ 价量背离 - 趋势可能反转，需谨慎')
+    _add_status_signal(signals_list, indicators, 'price_volume_confirmation')
     
     # 成交量信号
-    if 'volume_signal' in indicators:
-        vol_signal = indicators['volume_signal']
-        if vol_signal == 'high_volume':
-            vol_ratio = indicators.get('volume_ratio', 1.0)
-            signals_list.append(f'🔥 高成交量信号 - 当前成交量是均量的{vol_ratio:.1f}倍')
-        elif vol_signal == 'low_volume':
-            signals_list.append('💤 低成交量信号 - 市场观望情绪浓厚')
+    _add_status_signal(signals_list, indicators, 'volume_signal',
+                       indicators.get('volume_ratio', 1.0))
 
 
 def add_trend_signals(signals_list: List[str], indicators: Dict):
     """添加趋势相关信号"""
     if 'trend_direction' in indicators:
-        direction = indicators['trend_direction']
         strength = indicators.get('trend_strength', 0)
-        
-        if direction == 'up':
-            if strength > 70:
-                signals_list.append(f'🚀 强劲上升趋势 - 趋势强度{strength:.0f}%')
-            else:
-                signals_list.append(f'📈 温和上升趋势 - 趋势强度{strength:.0f}%')
-        elif direction == 'down':
-            if strength > 70:
-                signals_list.append(f'💥 强劲下降趋势 - 趋势强度{strength:.0f}%')
-            else:
-                signals_list.append(f'📉 温和下降趋势 - 趋势强度{strength:.0f}%')
-        else:
-            signals_list.append(f'🔄 震荡行情 - 趋势强度{strength:.0f}%')
+        template = _TREND_SIGNAL_TEMPLATES.get((indicators['trend_direction'], strength > 70),
+                                               '🔄 震荡行情 - 趋势强度%(value).0f%%')
+        signals_list.append(template % {'value': strength})
 
 
 def add_advanced_indicator_signals(signals_list: List[str], indicators: Dict):
     """添加高级技术指标信号"""
     # ADX趋势强度
-    if 'adx' in indicators:
-        adx = indicators['adx']
-        if adx > 40:
-            signals_list.append(f'💪 ADX={adx:.1f} - 强趋势，跟随趋势交易')
-        elif adx > 25:
-            signals_list.append(f'⚡ ADX={adx:.1f} - 中等趋势')
-        elif adx > 20:
-            signals_list.append(f'🌤️ ADX={adx:.1f} - 弱趋势')
-        else:
-            signals_list.append(f'🌫️ ADX={adx:.1f} - 无明显趋势，适合区间交易')
+    _add_threshold_signal(signals_list, indicators, 'adx')
     
     # SAR抛物线
-    if 'sar_signal' in indicators:
-        sar_signal = indicators['sar_signal']
-        sar_distance = indicators.get('sar_distance_pct', 0)
-        if sar_signal == 'bullish':
-            signals_list.append(f'🔵 SAR看涨 - 止损位距离{abs(sar_distance):.1f}%')
-        elif sar_signal == 'bearish':
-            signals_list.append(f'🔴 SAR看跌 - 止损位距离{abs(sar_distance):.1f}%')
+    _add_status_signal(signals_list, indicators, 'sar_signal',
+                       abs(indicators.get('sar_distance_pct', 0)))
     
     # Ichimoku一目均衡表
-    if 'ichimoku_status' in indicators:
-        status = indicators['ichimoku_status']
-        if status == 'above_cloud':
-            signals_list.append('☁️ 价格在云层上方 - 看涨')
-        elif status == 'below_cloud':
-            signals_list.append('☁️ 价格在云层下方 - 看跌')
-        else:
-            signals_list.append('☁️ 价格在云层内 - 盘整')
+    _add_status_signal(signals_list, indicators, 'ichimoku_status')
     
     # SuperTrend
-    if 'supertrend_direction' in indicators:
-        st_dir = indicators['supertrend_direction']
-        if st_dir == 'up':
-            signals_list.append('🟢 SuperTrend看涨信号')
-        else:
-            signals_list.append('🔴 SuperTrend看跌信号')
+    _add_status_signal(signals_list, indicators, 'supertrend_direction')
     
     # StochRSI
-    if 'stoch_rsi_status' in indicators:
-        status = indicators['stoch_rsi_status']
-        if status == 'oversold':
-            signals_list.append('🟢 StochRSI超卖 - 短期可能反弹')
-        elif status == 'overbought':
-            signals_list.append('🔴 StochRSI超买 - 短期可能回调')
+    _add_status_signal(signals_list, indicators, 'stoch_rsi_status')
+
+
+def add_support_resistance_signals(signals_list: List[str], indicators: Dict):
+    """添加支撑位和压力位信号"""
+    current_price = indicators.get('current_price')
+    if not current_price:
+        return
+    
+    # 检查是否接近关键支撑位（键名已知，直接按键查找）
+    support_keys = [k for k in SUPPORT_KEYS if k in indicators]
+    resistance_keys = [k for k in RESISTANCE_KEYS if k in indicators]
+    
+    # 找最近的支撑位（低于现价的最大值）和压力位（高于现价的最小值），掩码过滤后取极值
+    supports = np.fromiter((indicators[k] for k in support_keys),
+                           dtype=np.float64, count=len(support_keys))
+    resistances = np.fromiter((indicators[k] for k in resistance_keys),
+                              dtype=np.float64, count=len(resistance_keys))
+    supports = supports[supports < current_price]
+    resistances = resistances[resistances > current_price]
+    
+    nearest_support = None
+    nearest_support_dist = float('inf')
+    if supports.size:
+        nearest_support = float(supports.max())
+        nearest_support_dist = ((current_price - nearest_support) / current_price) * 100
+    
+    nearest_resistance = None
+    nearest_resistance_dist = float('inf')
+    if resistances.size:
+        nearest_resistance = float(resistances.min())
+        nearest_resistance_dist = ((nearest_resistance - current_price) / current_price) * 100
+    
+    # 根据支撑压力位置给出信号
+    if nearest_support and nearest_support_dist < 2:
+        signals_list.append(f'🟢 接近支撑位${nearest_support:.2f} (距离{nearest_support_dist:.1f}%) - 可能反弹')
+    
+    if nearest_resistance and nearest_resistance_dist < 2:
+        signals_list.append(f'🔴 接近压力位${nearest_resistance:.2f} (距离{nearest_resistance_dist:.1f}%) - 可能回调')
+    
+    # 突破信号
+    if 'resistance_20d_high' in indicators:
+        high_20 = indicators['resistance_20d_high']
+        if current_price >= high_20 * 0.99:  # 接近或突破20日高点
+            signals_list.append(f'🚀 突破20日高点${high_20:.2f} - 强势信号')
+    
+    if 'support_20d_low' in indicators:
+        low_20 = indicators['support_20d_low']
+        if current_price <= low_20 * 1.01:  # 接近或跌破20日低点
+            signals_list.append(f'⚠️ 跌破20日低点${low_20:.2f} - 弱势信号')
+
+
+def add_volume_profile_signals(signals_list: List[str], indicators: Dict):
+    """添加成交量分布（Volume Profile）信号"""
+    if 'vp_poc' not in indicators:
+        return
+    poc = indicators['vp_poc']
+    dist_pct = (indicators.get('current_price', 0) - poc) / poc * 100
+    
+    if abs(dist_pct) < 0.5:
+        signals_list.append(f'⚖️ 价格在POC(${poc:.2f})附近 - 筹码密集区平衡')
+        return
+    template = _VOLUME_PROFILE_TEMPLATES.get(indicators.get('vp_status', 'inside_va'))
+    if template:
+        signals_list.append(template % {'poc': poc})
+
+
+def add_ml_signals(signals_list: List[str], indicators: Dict):
+    """添加ML预测信号"""
+    if 'ml_trend' not in indicators:
+        return
+    confidence = indicators.get('ml_confidence', 0)
+    for min_confidence, table, default in _ML_SIGNAL_TIERS:
+        if confidence > min_confidence:
+            template = table.get(indicators['ml_trend'], default)
+            if template:
+                signals_list.append(template % {
+                    'confidence': confidence,
+                    'prediction': indicators.get('ml_prediction', 0) * 100,
+                })
+            return
+
+
+# 信号生成器按输出顺序排列，generate_signals 依次调用
+SIGNAL_GENERATORS = (
+    add_ma_signals,
+    add_rsi_signals,
+    add_bollinger_signals,
+    add_macd_signals,
+    add_volume_signals,
+    add_trend_signals,
+    add_advanced_indicator_signals,
+    add_support_resistance_signals,
+    add_volume_profile_signals,
+    add_ml_signals,
+)
+
+
+# 风险等级阶梯：得分分界点与 (等级, 描述)，bisect_right 定位所在区间
+_RISK_LEVEL_BOUNDS = (1, 2, 4, 5)
+_RISK_LEVEL_LADDER = (
+    ('very_low', '很低风险 - 相对稳健'),
+    ('low', '低风险 - 可适当加仓'),
+    ('medium', '中等风险 - 正常仓位'),
+    ('high', '高风险 - 建议小仓位操作'),
+    ('very_high', '极高风险 - 建议谨慎或观望'),
+)
 
 
 def calculate_risk_level(indicators: Dict) -> Dict:
@@ -184,21 +326,7 @@ def calculate_risk_level(indicators: Dict) -> Dict:
         risk_score += 1
     
     # 确定风险等级
-    if risk_score >= 5:
-        level = 'very_high'
-        desc = '极高风险 - 建议谨慎或观望'
-    elif risk_score >= 4:
-        level = 'high'
-        desc = '高风险 - 建议小仓位操作'
-    elif risk_score >= 2:
-        level = 'medium'
-        desc = '中等风险 - 正常仓位'
-    elif risk_score >= 1:
-        level = 'low'
-        desc = '低风险 - 可适当加仓'
-    else:
-        level = 'very_low'
-        desc = '很低风险 - 相对稳健'
+    level, desc = _RISK_LEVEL_LADDER[bisect.bisect_right(_RISK_LEVEL_BOUNDS, risk_score)]
     
     return {
         'level': level,
@@ -5,11 +5,50 @@
 工具函数模块 - 通用辅助函数
 """
 
-from datetime import datetime
 from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
 from .settings import logger
 
 
+# K线日期格式：(输入格式, 输出格式)，依次对应纯日期和带时间的日期
+_CANDLE_TIME_FORMATS = (
+    ('%Y%m%d', '%Y-%m-%d'),
+    ('%Y%m%d %H:%M:%S', '%Y-%m-%d %H:%M:%S'),
+)
+
+
+def _format_candle_times(dates: List[str]) -> List[str]:
+    """
+    批量转换K线日期格式
+    
+    'YYYYMMDD' 转为 'YYYY-MM-DD'，'YYYYMMDD HH:MM:SS' 转为 'YYYY-MM-DD HH:MM:SS'，
+    按格式分组向量化解析，其余或解析失败的保留原字符串
+    
+    Args:
+        dates: 原始日期字符串列表
+        
+    Returns:
+        格式化后的日期字符串列表
+    """
+    times = np.array(dates, dtype=object)
+    series = pd.Series(times)
+    is_date = (series.str.len() == 8).to_numpy()
+    is_datetime = ~is_date & series.str.contains(' ', regex=False).to_numpy(dtype=bool, na_value=False)
+    
+    for mask, (in_fmt, out_fmt) in zip((is_date, is_datetime), _CANDLE_TIME_FORMATS):
+        if not mask.any():
+            continue
+        idx = np.flatnonzero(mask)
+        parsed = pd.to_datetime(series.iloc[idx], format=in_fmt, errors='coerce')
+        ok = parsed.notna().to_numpy()
+        times[idx[ok]] = parsed[ok].dt.strftime(out_fmt).to_numpy(dtype=object)
+        for date_str in times[idx[~ok]]:
+            logger.warning(f"日期解析失败: {date_str}")
+    
+    return times.tolist()
+
+
 def format_candle_data(hist_data: List[Dict]) -> List[Dict]:
     """
     格式化K线数据
@@ -20,36 +59,22 @@ def format_candle_data(hist_data: List[Dict]) -> List[Dict]:
     Returns:
         格式化后的K线数据列表
     """
-    formatted_candles = []
-    
     if not hist_data:
-        return formatted_candles
+        return []
     
-    for bar in hist_data:
-        date_str = bar.get('date', '')
-        try:
-            if len(date_str) == 8:
-                dt = datetime.strptime(date_str, '%Y%m%d')
-                time_str = dt.strftime('%Y-%m-%d')
-            elif ' ' in date_str:
-                dt = datetime.strptime(date_str, '%Y%m%d %H:%M:%S')
-                time_str = dt.strftime('%Y-%m-%d %H:%M:%S')
-            else:
-                time_str = date_str
-        except Exception as e:
-            logger.warning(f"日期解析失败: {date_str}, 错误: {e}")
-            time_str = date_str
-        
-        formatted_candles.append({
+    times = _format_candle_times([bar.get('date', '') for bar in hist_data])
+    
+    return [
+        {
             'time': time_str,
             'open': float(bar.get('open', 0)),
             'high': float(bar.get('high', 0)),
             'low': float(bar.get('low', 0)),
             'close': float(bar.get('close', 0)),
             'volume': int(bar.get('volume', 0)),
-        })
-    
-    return formatted_candles
+        }
+        for time_str, bar in zip(times, hist_data)
+    ]
 
 
 def extract_stock_name(stock_info) -> Optional[str]:
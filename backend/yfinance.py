@@ -9,10 +9,65 @@ YFinance数据获取模块 - 从yfinance获取股票数据
 import pandas as pd
 import numpy as np
 import pytz
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import yfinance as yf
+from cachetools import TTLCache
 from typing import Dict, List, Any, Optional, Tuple
-from .settings import logger, get_kline_from_cache, save_kline_to_cache
+from .settings import logger, get_kline_from_cache, get_kline_date_range, save_kline_to_cache
+
+
+def _create_session():
+    """
+    创建进程共享的 HTTP 会话（连接池 + keep-alive），所有 Ticker 复用同一组 TLS 连接
+    新版 yfinance 要求 curl_cffi 会话，旧版使用 requests 会话
+    """
+    try:
+        from curl_cffi import requests as curl_requests
+        return curl_requests.Session(impersonate='chrome')
+    except ImportError:
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+
+_YF_SESSION = _create_session()
+
+
+def _ticker(symbol: str):
+    """
+    创建使用共享会话的 Ticker
+    """
+    return yf.Ticker(symbol, session=_YF_SESSION)
+
+
+# Ticker 及其 info 的短期缓存：同一股票短时间内的信息查询复用同一次网络请求
+_ticker_info_cache = TTLCache(maxsize=1024, ttl=300)
+_ticker_info_lock = threading.Lock()
+
+
+def _get_ticker_info(symbol: str):
+    """
+    获取 (Ticker, info)，300 秒内命中缓存直接返回
+    同一 Ticker 对象也复用其已加载的财务报表等数据
+    """
+    with _ticker_info_lock:
+        cached = _ticker_info_cache.get(symbol)
+    if cached is not None:
+        return cached
+    
+    ticker = _ticker(symbol)
+    info = ticker.info
+    if info:
+        with _ticker_info_lock:
+            _ticker_info_cache[symbol] = (ticker, info)
+    return ticker, info
 
 
 def get_stock_info(symbol: str):
@@ -20,8 +75,7 @@ def get_stock_info(symbol: str):
     获取股票详细信息
     """
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        ticker, info = _get_ticker_info(symbol)
         
         if not info:
             return None
@@ -42,6 +96,19 @@ def get_stock_info(symbol: str):
         return None
 
 
+def _format_financial_value(value):
+    """
+    格式化财务报表单元格：NaN 转为 None，Timestamp 转为日期字符串，数值转为 float，其余转为字符串
+    """
+    if pd.notna(value):
+        if isinstance(value, pd.Timestamp):
+            return value.strftime('%Y-%m-%d')
+        if isinstance(value, (int, float, np.number)):
+            return float(value)
+        return str(value)
+    return None
+
+
 def _format_financial_dataframe(df):
     """
     格式化财务报表DataFrame为列表格式（字典列表）
@@ -50,47 +117,75 @@ def _format_financial_dataframe(df):
     if df is None or df.empty:
         return []
     
-    result = []
     # 转置DataFrame，使日期为键
     df_transposed = df.T
     
-    for date in df_transposed.index:
-        # 处理日期：转换为字符串
-        if hasattr(date, 'strftime'):
-            date_str = date.strftime('%Y-%m-%d')
-        elif isinstance(date, pd.Timestamp):
-            date_str = date.strftime('%Y-%m-%d')
-        else:
-            date_str = str(date)
-        
+    # 处理日期：转换为字符串
+    dates = [
+        date.strftime('%Y-%m-%d') if hasattr(date, 'strftime') else str(date)
+        for date in df_transposed.index
+    ]
+    columns = list(df_transposed.columns)
+    
+    if all(np.issubdtype(dtype, np.number) for dtype in df_transposed.dtypes):
+        # 纯数值报表（常见情况）：整体转为 float64，NaN 一次性替换为 None
+        values = df_transposed.to_numpy(dtype=np.float64)
+        rows = np.where(np.isnan(values), None, values.astype(object)).tolist()
+    else:
+        rows = [
+            [_format_financial_value(value) for value in row]
+            for row in df_transposed.itertuples(index=False, name=None)
+        ]
+    
+    result = []
+    for date_str, row in zip(dates, rows):
         record = {'index': date_str, 'Date': date_str}
-        for col in df_transposed.columns:
-            value = df_transposed.loc[date, col]
-            # 处理NaN值
-            if pd.notna(value):
-                # 处理 Timestamp 对象
-                if isinstance(value, pd.Timestamp):
-                    record[col] = value.strftime('%Y-%m-%d')
-                elif isinstance(value, (int, float, np.number)):
-                    record[col] = float(value)
-                else:
-                    record[col] = str(value)
-            else:
-                record[col] = None
-        
+        record.update(zip(columns, row))
         result.append(record)
     
     return result
 
 
+# 基本面数据中的财务报表：(结果键, Ticker 属性, 日志名称)
+_FINANCIAL_STATEMENTS = (
+    ('Financials', 'financials', '财务报表'),
+    ('QuarterlyFinancials', 'quarterly_financials', '季度财务报表'),
+    ('BalanceSheet', 'balance_sheet', '资产负债表'),
+    ('QuarterlyBalanceSheet', 'quarterly_balance_sheet', '季度资产负债表'),
+    ('Cashflow', 'cashflow', '现金流量表'),
+    ('QuarterlyCashflow', 'quarterly_cashflow', '季度现金流量表'),
+)
+
+
+# 基本面数据缓存：财报按季度更新，1 小时内同一股票直接复用，免去六张报表的网络请求
+_fundamental_cache = TTLCache(maxsize=4096, ttl=3600)
+_fundamental_lock = threading.Lock()
+
+
 def get_fundamental_data(symbol: str):
     """
     获取基本面数据（从yfinance）
     返回公司财务数据、估值指标、财务报表、资产负债表、现金流量表等
+    3600 秒内命中缓存直接返回，获取失败（None）不缓存
+    """
+    with _fundamental_lock:
+        cached = _fundamental_cache.get(symbol)
+    if cached is not None:
+        return cached
+    
+    fundamental = _fetch_fundamental_data(symbol)
+    if fundamental is not None:
+        with _fundamental_lock:
+            _fundamental_cache[symbol] = fundamental
+    return fundamental
+
+
+def _fetch_fundamental_data(symbol: str):
+    """
+    从 yfinance 拉取基本面数据（info 与六张财务报表）
     """
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        ticker, info = _get_ticker_info(symbol)
         
         if not info:
             return None
@@ -187,59 +282,21 @@ def get_fundamental_data(symbol: str):
             'FloatShares': info.get('floatShares', 0),
         }
         
-        try:
-            financials = ticker.financials
-            if financials is not None and not financials.empty:
-                fundamental['Financials'] = _format_financial_dataframe(financials)
-                logger.info(f"已获取财务报表数据: {symbol}")
-        except Exception as e:
-            logger.warning(f"获取财务报表失败: {symbol}, 错误: {e}")
-            fundamental['Financials'] = []
-        
-        try:
-            quarterly_financials = ticker.quarterly_financials
-            if quarterly_financials is not None and not quarterly_financials.empty:
-                fundamental['QuarterlyFinancials'] = _format_financial_dataframe(quarterly_financials)
-                logger.info(f"已获取季度财务报表数据: {symbol}")
-        except Exception as e:
-            logger.warning(f"获取季度财务报表失败: {symbol}, 错误: {e}")
-            fundamental['QuarterlyFinancials'] = []
-        
-        try:
-            balance_sheet = ticker.balance_sheet
-            if balance_sheet is not None and not balance_sheet.empty:
-                fundamental['BalanceSheet'] = _format_financial_dataframe(balance_sheet)
-                logger.info(f"已获取资产负债表数据: {symbol}")
-        except Exception as e:
-            logger.warning(f"获取资产负债表失败: {symbol}, 错误: {e}")
-            fundamental['BalanceSheet'] = []
-        
-        try:
-            quarterly_balance_sheet = ticker.quarterly_balance_sheet
-            if quarterly_balance_sheet is not None and not quarterly_balance_sheet.empty:
-                fundamental['QuarterlyBalanceSheet'] = _format_financial_dataframe(quarterly_balance_sheet)
-                logger.info(f"已获取季度资产负债表数据: {symbol}")
-        except Exception as e:
-            logger.warning(f"获取季度资产负债表失败: {symbol}, 错误: {e}")
-            fundamental['QuarterlyBalanceSheet'] = []
-        
-        try:
-            cashflow = ticker.cashflow
-            if cashflow is not None and not cashflow.empty:
-                fundamental['Cashflow'] = _format_financial_dataframe(cashflow)
-                logger.info(f"已获取现金流量表数据: {symbol}")
-        except Exception as e:
-            logger.warning(f"获取现金流量表失败: {symbol}, 错误: {e}")
-            fundamental['Cashflow'] = []
-        
-        try:
-            quarterly_cashflow = ticker.quarterly_cashflow
-            if quarterly_cashflow is not None and not quarterly_cashflow.empty:
-                fundamental['QuarterlyCashflow'] = _format_financial_dataframe(quarterly_cashflow)
-                logger.info(f"已获取季度现金流量表数据: {symbol}")
-        except Exception as e:
-            logger.warning(f"获取季度现金流量表失败: {symbol}, 错误: {e}")
-            fundamental['QuarterlyCashflow'] = []
+        # 六张财务报表各自一次网络请求，并发获取
+        with ThreadPoolExecutor(max_workers=len(_FINANCIAL_STATEMENTS)) as executor:
+            futures = [
+                (key, label, executor.submit(getattr, ticker, attr))
+                for key, attr, label in _FINANCIAL_STATEMENTS
+            ]
+            for key, label, future in futures:
+                try:
+                    statement = future.result(timeout=15)
+                    if statement is not None and not statement.empty:
+                        fundamental[key] = _format_financial_dataframe(statement)
+                        logger.info(f"已获取{label}数据: {symbol}")
+                except Exception as e:
+                    logger.warning(f"获取{label}失败: {symbol}, 错误: {e}")
+                    fundamental[key] = []
         
         return fundamental
         
@@ -251,36 +308,83 @@ def get_fundamental_data(symbol: str):
 def _format_historical_data(df: pd.DataFrame):
     """
     格式化历史数据
+    按列取出数组后一次性构建结果，避免逐行 iterrows
     """
-    result = []
+    # 日期统一带时间部分（与逐行格式化时的输出一致）
+    dates = df.index.strftime('%Y%m%d %H:%M:%S').tolist()
+    opens = df['Open'].to_numpy(dtype=np.float64)
+    highs = df['High'].to_numpy(dtype=np.float64)
+    lows = df['Low'].to_numpy(dtype=np.float64)
+    closes = df['Close'].to_numpy(dtype=np.float64)
+    averages = (highs + lows + closes) / 3
+    
     # 检查是否有 Volume 列，如果没有或为 NaN 则使用 0
-    has_volume = 'Volume' in df.columns
+    if 'Volume' in df.columns:
+        volumes = pd.to_numeric(df['Volume'], errors='coerce').to_numpy(dtype=np.float64)
+        volumes = np.nan_to_num(volumes, nan=0).astype(np.int64).tolist()
+    else:
+        volumes = [0] * len(df)
     
-    for date, row in df.iterrows():
-        date_str = date.strftime('%Y%m%d')
-        if pd.notna(date.hour):  # 如果有时间
-            date_str = date.strftime('%Y%m%d %H:%M:%S')
-        
-        # 处理成交量数据：如果不存在或为 NaN，使用 0
-        volume = 0
-        if has_volume and pd.notna(row.get('Volume')):
-            try:
-                volume = int(row['Volume'])
-            except (ValueError, TypeError):
-                volume = 0
-        
-        result.append({
+    return [
+        {
             'date': date_str,
-            'open': float(row['Open']),
-            'high': float(row['High']),
-            'low': float(row['Low']),
-            'close': float(row['Close']),
+            'open': open_,
+            'high': high,
+            'low': low,
+            'close': close,
             'volume': volume,
-            'average': float((row['High'] + row['Low'] + row['Close']) / 3),
+            'average': average,
             'barCount': 1
-        })
+        }
+        for date_str, open_, high, low, close, volume, average in zip(
+            dates, opens.tolist(), highs.tolist(), lows.tolist(), closes.tolist(), volumes, averages.tolist()
+        )
+    ]
+
+
+# bar_size 到 yfinance interval 的映射
+_YF_INTERVALS = {
+    '1 min': '1m',
+    '2 mins': '2m',
+    '5 mins': '5m',
+    '15 mins': '15m',
+    '30 mins': '30m',
+    '1 hour': '1h',
+    '1 day': '1d',
+    '1 week': '1wk',
+    '1 month': '1mo'
+}
+
+# 美东时区与预期最新交易日缓存：(分钟序号, 预期最新日期)，同一分钟内所有股票共用
+_ET_TZ = pytz.timezone('US/Eastern')
+_expected_date_cache = (None, None)
+
+
+def _expected_latest_date():
+    """
+    计算缓存应包含的最新交易日（按分钟缓存）
+    美股收盘（16:00 ET）前为前一日，周末回退到周五
+    """
+    global _expected_date_cache
+    minute_key = int(time.time() // 60)
+    cached_key, cached_date = _expected_date_cache
+    if cached_key == minute_key:
+        return cached_date
     
-    return result
+    now_et = datetime.now(_ET_TZ)
+    
+    # 美股交易时间：09:30-16:00 ET
+    if now_et.hour < 16 or (now_et.hour == 16 and now_et.minute == 0):
+        expected_date = now_et.date() - timedelta(days=1)
+    else:
+        expected_date = now_et.date()
+    
+    # 考虑周末：如果是周六/周日，往前推到周五
+    while expected_date.weekday() >= 5:  # 5=周六, 6=周日
+        expected_date -= timedelta(days=1)
+    
+    _expected_date_cache = (minute_key, expected_date)
+    return expected_date
 
 
 def get_historical_data(symbol: str, duration: str = '1 D', 
@@ -294,53 +398,22 @@ def get_historical_data(symbol: str, duration: str = '1 D',
     """
     try:
         # 转换bar_size为yfinance格式
-        interval_map = {
-            '1 min': '1m',
-            '2 mins': '2m',
-            '5 mins': '5m',
-            '15 mins': '15m',
-            '30 mins': '30m',
-            '1 hour': '1h',
-            '1 day': '1d',
-            '1 week': '1wk',
-            '1 month': '1mo'
-        }
+        yf_interval = _YF_INTERVALS.get(bar_size, '1d')
         
-        yf_interval = interval_map.get(bar_size, '1d')
-        
-        # 尝试从缓存获取数据
-        cached_df = get_kline_from_cache(symbol, yf_interval)
-        
-        # 统一时区处理
-        now_local = pd.Timestamp.now()
-        et_tz = pytz.timezone('US/Eastern')
-        now_et = now_local.tz_localize('UTC').astimezone(et_tz) if now_local.tzinfo is None else now_local.astimezone(et_tz)
-        
-        # 美股交易时间：09:30-16:00 ET
-        if now_et.hour < 16 or (now_et.hour == 16 and now_et.minute == 0):
-            expected_latest_date = (now_et.date() - timedelta(days=1))
-        else:
-            expected_latest_date = now_et.date()
-        
-        # 考虑周末：如果是周六/周日，往前推到周五
-        while expected_latest_date.weekday() >= 5:  # 5=周六, 6=周日
-            expected_latest_date -= timedelta(days=1)
-        
-        today = pd.Timestamp.now().normalize().tz_localize(None)
+        expected_latest_date = _expected_latest_date()
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         one_year_ago = today - timedelta(days=365)
         
-        # 检查缓存数据的完整性
+        # 先用元数据表判断缓存完整性，需要全量刷新时不读取缓存K线
+        cached_df = None
         need_full_refresh = False
+        date_range = get_kline_date_range(symbol, yf_interval)
         
-        if cached_df is None or cached_df.empty:
+        if date_range is None:
             need_full_refresh = True
             logger.info(f"无缓存数据，需要全量获取: {symbol}, {yf_interval}")
         else:
-            if cached_df.index.tzinfo is not None:
-                cached_df.index = cached_df.index.tz_localize(None)
-            
-            first_date = cached_df.index[0]
-            last_date = cached_df.index[-1]
+            first_date, last_date = date_range
             
             if first_date > one_year_ago:
                 logger.info(f"缓存数据不足1年（最早: {first_date}），需要全量刷新")
@@ -348,10 +421,19 @@ def get_historical_data(symbol: str, duration: str = '1 D',
             elif last_date.date() < (today - timedelta(days=7)).date():
                 logger.info(f"缓存数据过旧（最新: {last_date}），需要全量刷新")
                 need_full_refresh = True
+            else:
+                cached_df = get_kline_from_cache(symbol, yf_interval)
+                if cached_df is None or cached_df.empty:
+                    need_full_refresh = True
+                    logger.info(f"无缓存数据，需要全量获取: {symbol}, {yf_interval}")
+                elif last_date.date() >= expected_latest_date:
+                    # 快速路径：缓存满一年且已是最新，直接返回
+                    logger.info(f"缓存已是最新数据: {symbol}, 缓存日期={last_date.date()}, 预期最新={expected_latest_date}")
+                    return _format_historical_data(cached_df), None
         
         if need_full_refresh:
             logger.info(f"从 yfinance 获取全量数据: {symbol}, 2y, {yf_interval}")
-            ticker = yf.Ticker(symbol)
+            ticker = _ticker(symbol)
             df = ticker.history(period='2y', interval=yf_interval)
             
             if df.empty:
@@ -377,12 +459,8 @@ def get_historical_data(symbol: str, duration: str = '1 D',
         last_cached_date = cached_df.index[-1]
         logger.info(f"使用缓存数据并增量更新: {symbol}, {yf_interval}, 最新: {last_cached_date.date()}")
         
-        if last_cached_date.date() >= expected_latest_date:
-            logger.info(f"缓存已是最新数据: {symbol}, 缓存日期={last_cached_date.date()}, 预期最新={expected_latest_date}")
-            return _format_historical_data(cached_df), None
-        
         try:
-            ticker = yf.Ticker(symbol)
+            ticker = _ticker(symbol)
             new_data = ticker.history(period='10d', interval=yf_interval)
             
             if not new_data.empty:
@@ -392,9 +470,11 @@ def get_historical_data(symbol: str, duration: str = '1 D',
                 new_data_filtered = new_data[new_data.index > last_cached_date]
                 
                 if not new_data_filtered.empty:
-                    combined_df = pd.concat([cached_df, new_data])
-                    combined_df = combined_df[~combined_df.index.duplicated(keep='last')]
-                    combined_df = combined_df.sort_index()
+                    # 缓存数据已按日期升序，只需对与新数据重叠的尾部去重排序
+                    split = cached_df.index.searchsorted(new_data.index.min())
+                    tail_df = pd.concat([cached_df.iloc[split:], new_data])
+                    tail_df = tail_df[~tail_df.index.duplicated(keep='last')].sort_index()
+                    combined_df = pd.concat([cached_df.iloc[:split], tail_df])
                     
                     save_kline_to_cache(symbol, yf_interval, new_data)
                     
@@ -422,7 +502,7 @@ def get_dividends(symbol: str) -> Optional[List[Dict[str, Any]]]:
     获取股票分红历史
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         dividends = ticker.dividends
         
         if dividends is None or dividends.empty:
@@ -448,7 +528,7 @@ def get_splits(symbol: str) -> Optional[List[Dict[str, Any]]]:
     获取股票拆分历史
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         splits = ticker.splits
         
         if splits is None or splits.empty:
@@ -474,7 +554,7 @@ def get_actions(symbol: str) -> Optional[Dict[str, List[Dict[str, Any]]]]:
     获取公司行动（分红+拆分）
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         actions = ticker.actions
         
         if actions is None or actions.empty:
@@ -510,7 +590,7 @@ def get_institutional_holders(symbol: str) -> Optional[List[Dict[str, Any]]]:
     获取机构持股信息
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         holders = ticker.institutional_holders
         
         if holders is None or holders.empty:
@@ -545,7 +625,7 @@ def get_major_holders(symbol: str) -> Optional[Dict[str, Any]]:
     获取主要持股人摘要
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         holders = ticker.major_holders
         
         if holders is None or holders.empty:
@@ -570,7 +650,7 @@ def get_mutualfund_holders(symbol: str) -> Optional[List[Dict[str, Any]]]:
     获取共同基金持股信息
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         holders = ticker.mutualfund_holders
         
         if holders is None or holders.empty:
@@ -605,7 +685,7 @@ def get_insider_transactions(symbol: str) -> Optional[List[Dict[str, Any]]]:
     获取内部交易信息
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         transactions = ticker.insider_transactions
         
         if transactions is None or transactions.empty:
@@ -640,7 +720,7 @@ def get_insider_purchases(symbol: str) -> Optional[List[Dict[str, Any]]]:
     获取内部人员购买信息
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         purchases = ticker.insider_purchases
         
         if purchases is None or purchases.empty:
@@ -675,7 +755,7 @@ def get_insider_roster_holders(symbol: str) -> Optional[List[Dict[str, Any]]]:
     获取内部人员名单
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         roster = ticker.insider_roster_holders
         
         if roster is None or roster.empty:
@@ -710,7 +790,7 @@ def get_recommendations(symbol: str) -> Optional[List[Dict[str, Any]]]:
     获取分析师推荐历史
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         recommendations = ticker.recommendations
         
         if recommendations is None or recommendations.empty:
@@ -745,7 +825,7 @@ def get_recommendations_summary(symbol: str) -> Optional[Dict[str, Any]]:
     获取分析师推荐摘要
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         summary = ticker.recommendations_summary
         
         if summary is None or summary.empty:
@@ -771,7 +851,7 @@ def get_upgrades_downgrades(symbol: str) -> Optional[List[Dict[str, Any]]]:
     获取评级升降级历史
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         upgrades = ticker.upgrades_downgrades
         
         if upgrades is None or upgrades.empty:
@@ -806,7 +886,7 @@ def get_earnings(symbol: str) -> Optional[Dict[str, List[Dict[str, Any]]]]:
     获取收益数据（年度和季度）
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         
         result = {'yearly': [], 'quarterly': []}
         
@@ -855,7 +935,7 @@ def get_earnings_dates(symbol: str, limit: int = 12) -> Optional[List[Dict[str,
     获取收益日期（过去和未来的财报日期）
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         earnings_dates = ticker.earnings_dates
         
         if earnings_dates is None or earnings_dates.empty:
@@ -890,7 +970,7 @@ def get_earnings_history(symbol: str) -> Optional[List[Dict[str, Any]]]:
     获取历史收益（实际vs预期）
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         history = ticker.earnings_history
         
         if history is None or history.empty:
@@ -925,7 +1005,7 @@ def get_calendar(symbol: str) -> Optional[Dict[str, Any]]:
     获取公司日历（收益日期等）
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         calendar = ticker.calendar
         
         if calendar is None or calendar.empty:
@@ -960,7 +1040,7 @@ def get_sustainability(symbol: str) -> Optional[Dict[str, Any]]:
     获取ESG（环境、社会、治理）可持续性评分
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         sustainability = ticker.sustainability
         
         if sustainability is None or sustainability.empty:
@@ -990,7 +1070,7 @@ def get_analyst_price_target(symbol: str) -> Optional[Dict[str, Any]]:
     获取分析师价格目标
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         target = ticker.analyst_price_target
         
         if target is None or target.empty:
@@ -1020,7 +1100,7 @@ def get_revenue_forecasts(symbol: str) -> Optional[List[Dict[str, Any]]]:
     获取收入预测
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         forecasts = ticker.revenue_forecasts
         
         if forecasts is None or forecasts.empty:
@@ -1055,7 +1135,7 @@ def get_options(symbol: str) -> Optional[Dict[str, Any]]:
     获取期权数据（所有到期日的期权链）
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         
         # 获取所有期权到期日
         expiration_dates = ticker.options
@@ -1132,7 +1212,7 @@ def get_news(symbol: str, limit: int = 10) -> Optional[List[Dict[str, Any]]]:
     获取股票相关新闻
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         news = ticker.news
         
         if not news:
@@ -1168,7 +1248,7 @@ def get_fast_info(symbol: str) -> Optional[Dict[str, Any]]:
     使用fast_info属性获取更快的实时数据
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         fast_info = ticker.fast_info
         
         if not fast_info:
@@ -1201,7 +1281,7 @@ def get_history_metadata(symbol: str) -> Optional[Dict[str, Any]]:
     获取历史数据元信息
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _ticker(symbol)
         metadata = ticker.history_metadata
         
         if not metadata:
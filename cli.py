@@ -7,8 +7,10 @@ IB Trading Gateway 交互式命令行客户端
 """
 
 # 标准库导入
+import os
 import re
 import shlex
+import time
 import urllib.parse
 from typing import Optional
 
@@ -192,7 +194,6 @@ class TradingCLI:
             print(f"✅ 买单已提交: #{order_id} - {symbol.upper()} x{quantity}{price_str} ({order_type})")
             
             # 等待并查看订单状态
-            import time
             time.sleep(1.5)
             order_detail = self._request('GET', f'/api/order/{order_id}')
             if order_detail and order_detail.get('success'):
@@ -229,7 +230,6 @@ class TradingCLI:
             print(f"✅ 卖单已提交: #{order_id} - {symbol.upper()} x{quantity}{price_str} ({order_type})")
             
             # 等待并查看订单状态
-            import time
             time.sleep(1.5)
             order_detail = self._request('GET', f'/api/order/{order_id}')
             if order_detail and order_detail.get('success'):
@@ -253,7 +253,6 @@ class TradingCLI:
             print(f"✅ {result.get('message')}")
             
             # 等待并查看订单状态
-            import time
             time.sleep(0.5)
             order_detail = self._request('GET', f'/api/order/{order_id}')
             if order_detail and order_detail.get('success'):
@@ -1547,7 +1546,6 @@ def main():
                 cli.help()
                 
             elif cmd in ['clear', 'cls']:
-                import os
                 os.system('clear' if os.name != 'nt' else 'cls')
                 
             elif cmd in ['exit', 'quit', 'q']: